@@ -1,15 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Dict, Optional, Any, Literal
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uuid
+import asyncio
 from datetime import datetime
 
 from codebase_rag.services.sql import sql_analyzer, parse_sql_schema_smart
-from codebase_rag.services.code import graph_service, get_code_ingestor, pack_builder
+from codebase_rag.services.code import graph_service, get_code_ingestor, pack_builder, BlobStore
 from codebase_rag.services.knowledge import Neo4jKnowledgeService
-from codebase_rag.services.tasks import task_queue
-from codebase_rag.services.utils import git_utils, ranker, metrics_service
+from codebase_rag.services.tasks import task_queue, submit_repo_ingestion_task
+from codebase_rag.services.utils import ranker, metrics_service, query_cache
+from codebase_rag.services.utils.cypher_stream import to_json_line
+from codebase_rag.api.sse_routes import stream_events
 from codebase_rag.config import settings
 from loguru import logger
 
@@ -32,6 +35,11 @@ class SQLParseRequest(BaseModel):
 class GraphQueryRequest(BaseModel):
     cypher: str
     parameters: Optional[Dict[str, Any]] = None
+    page_size: int = Field(100, ge=1, le=10000)
+    cursor: Optional[str] = None
+    # unique scalar columns to keyset-page on; otherwise the query must end with ORDER BY
+    order_by: Optional[List[str]] = None
+    stream: bool = False
 
 class DocumentAddRequest(BaseModel):
     content: str
@@ -52,6 +60,8 @@ class QueryRequest(BaseModel):
     top_k: Optional[int] = None
     graph_depth: Optional[int] = None
     tool_kwargs: Optional[Dict[str, Any]] = None
+    retrieve_only: bool = False  # return ranked source nodes without LLM synthesis
+    stream: bool = False  # SSE: sources first, then answer tokens
 
 class SearchRequest(BaseModel):
     query: str
@@ -71,15 +81,19 @@ class IngestRepoRequest(BaseModel):
     include_globs: list[str] = ["**/*.py", "**/*.ts", "**/*.tsx", "**/*.java", "**/*.php", "**/*.go"]
     exclude_globs: list[str] = ["**/node_modules/**", "**/.git/**", "**/__pycache__/**", "**/.venv/**", "**/vendor/**", "**/target/**"]
     since_commit: Optional[str] = None  # For incremental mode: compare against this commit
+    force: bool = False  # Full mode: rewrite files even if their content hash is unchanged
+    wait: bool = False  # Run inline and return the final result instead of queueing a background task
 
 class IngestRepoResponse(BaseModel):
     """Repository ingestion response"""
     task_id: str
-    status: str  # queued, running, done, error
+    status: str  # queued, running, done, partial, error
     message: Optional[str] = None
     files_processed: Optional[int] = None
     mode: Optional[str] = None  # full | incremental
     changed_files_count: Optional[int] = None  # For incremental mode
+    files_skipped: Optional[int] = None  # Unchanged files (same content hash) left untouched
+    files_deleted: Optional[int] = None  # Files removed from the graph because they no longer exist
 
 # Related files models
 class NodeSummary(BaseModel):
@@ -182,9 +196,20 @@ async def get_metrics():
 
 # knowledge query interface
 @router.post("/knowledge/query")
-async def query_knowledge(query_request: QueryRequest):
+async def query_knowledge(query_request: QueryRequest, request: Request):
     """Query knowledge base using Neo4j GraphRAG"""
     try:
+        if query_request.stream and not query_request.retrieve_only:
+            events = knowledge_service.stream_query(
+                question=query_request.question,
+                mode=query_request.mode,
+                use_graph=query_request.use_graph,
+                use_vector=query_request.use_vector,
+                top_k=query_request.top_k,
+                graph_depth=query_request.graph_depth,
+            )
+            return stream_events(request, f"query_{uuid.uuid4().hex[:8]}", events)
+
         result = await knowledge_service.query(
             question=query_request.question,
             mode=query_request.mode,
@@ -194,6 +219,7 @@ async def query_knowledge(query_request: QueryRequest):
             top_k=query_request.top_k,
             graph_depth=query_request.graph_depth,
             tool_kwargs=query_request.tool_kwargs,
+            retrieve_only=query_request.retrieve_only,
         )
         
         if result.get("success"):
@@ -398,7 +424,8 @@ async def get_system_config():
 async def ingest_repo(request: IngestRepoRequest):
     """
     Ingest a repository into the knowledge graph
-    Scans files matching patterns and creates File/Repo nodes in Neo4j
+    Scans files matching patterns and creates File/Repo nodes in Neo4j.
+    Runs as a resumable background task unless `wait` is set.
     """
     try:
         # Validate request
@@ -408,149 +435,49 @@ async def ingest_repo(request: IngestRepoRequest):
                 detail="Either repo_url or local_path must be provided"
             )
         
-        # Generate task ID
-        task_id = f"ing-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        params = request.dict(exclude={"wait"})
         
-        # Determine repository path and ID
-        repo_path = None
-        repo_id = None
-        cleanup_needed = False
-        
-        if request.local_path:
-            repo_path = request.local_path
-            repo_id = git_utils.get_repo_id_from_path(repo_path)
-        else:
-            # Clone repository
-            logger.info(f"Cloning repository: {request.repo_url}")
-            clone_result = git_utils.clone_repo(
-                request.repo_url,
-                branch=request.branch
+        if not request.wait:
+            source = request.local_path or request.repo_url
+            task_id = await submit_repo_ingestion_task(
+                task_name=f"Ingest repository: {source}",
+                **params
             )
-            
-            if not clone_result.get("success"):
-                return IngestRepoResponse(
-                    task_id=task_id,
-                    status="error",
-                    message=clone_result.get("error", "Failed to clone repository")
-                )
-            
-            repo_path = clone_result["path"]
-            repo_id = git_utils.get_repo_id_from_url(request.repo_url)
-            cleanup_needed = True
-        
-        logger.info(f"Processing repository: {repo_id} at {repo_path} (mode={request.mode})")
-
-        # Get code ingestor
-        code_ingestor = get_code_ingestor(graph_service)
-
-        # Handle incremental mode
-        files_to_process = []
-        changed_files_count = 0
-
-        if request.mode == "incremental":
-            # Check if it's a git repository
-            if not git_utils.is_git_repo(repo_path):
-                logger.warning(f"Incremental mode requested but {repo_path} is not a git repo, falling back to full mode")
-                request.mode = "full"
-            else:
-                # Get changed files
-                changed_result = git_utils.get_changed_files(
-                    repo_path=repo_path,
-                    since_commit=request.since_commit,
-                    include_untracked=True
-                )
-
-                if not changed_result.get("success"):
-                    logger.warning(f"Failed to get changed files: {changed_result.get('error')}, falling back to full mode")
-                    request.mode = "full"
-                else:
-                    changed_files = changed_result.get("changed_files", [])
-                    changed_files_count = len(changed_files)
-
-                    if changed_files_count == 0:
-                        logger.info("No files changed, skipping ingestion")
-                        return IngestRepoResponse(
-                            task_id=task_id,
-                            status="done",
-                            message="No files changed since last ingestion",
-                            files_processed=0,
-                            mode="incremental",
-                            changed_files_count=0
-                        )
-
-                    # Filter changed files by glob patterns
-                    logger.info(f"Found {changed_files_count} changed files, filtering by patterns...")
-
-                    # Scan only the changed files
-                    all_files = code_ingestor.scan_files(
-                        repo_path=repo_path,
-                        include_globs=request.include_globs,
-                        exclude_globs=request.exclude_globs
-                    )
-
-                    # Create a set of changed file paths for quick lookup
-                    changed_paths = {cf['path'] for cf in changed_files}
-
-                    # Filter to only include files that are in both lists
-                    files_to_process = [
-                        f for f in all_files
-                        if f['path'] in changed_paths
-                    ]
-
-                    logger.info(f"Filtered to {len(files_to_process)} files matching patterns")
-
-        # Full mode or fallback
-        if request.mode == "full":
-            # Scan all files
-            files_to_process = code_ingestor.scan_files(
-                repo_path=repo_path,
-                include_globs=request.include_globs,
-                exclude_globs=request.exclude_globs
-            )
-
-        if not files_to_process:
-            message = "No files found matching the specified patterns" if request.mode == "full" else "No changed files match the patterns"
-            logger.warning(message)
+            logger.info(f"Repository ingestion task {task_id} queued for {source}")
             return IngestRepoResponse(
                 task_id=task_id,
-                status="done",
-                message=message,
+                status="queued",
+                message=f"Repository ingestion queued, follow progress at /tasks/{task_id}",
                 files_processed=0,
-                mode=request.mode,
-                changed_files_count=changed_files_count if request.mode == "incremental" else None
-            )
-
-        # Ingest files into Neo4j
-        result = code_ingestor.ingest_files(
-            repo_id=repo_id,
-            files=files_to_process
-        )
-
-        # Cleanup if needed
-        if cleanup_needed:
-            git_utils.cleanup_temp_repo(repo_path)
-
-        if result.get("success"):
-            message = f"Successfully ingested {result['files_processed']} files"
-            if request.mode == "incremental":
-                message += f" (out of {changed_files_count} changed)"
-
-            return IngestRepoResponse(
-                task_id=task_id,
-                status="done",
-                message=message,
-                files_processed=result["files_processed"],
-                mode=request.mode,
-                changed_files_count=changed_files_count if request.mode == "incremental" else None
+                mode=request.mode
             )
-        else:
+        
+        # Synchronous ingestion keeps the request open until the graph is written
+        task_id = f"ing-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        code_ingestor = get_code_ingestor(graph_service)
+        result = await asyncio.to_thread(code_ingestor.ingest_repository, **params)
+        
+        if not result.get("success"):
             return IngestRepoResponse(
                 task_id=task_id,
                 status="error",
                 message=result.get("error", "Failed to ingest files"),
-                mode=request.mode
+                mode=result.get("mode", request.mode)
             )
         
+        return IngestRepoResponse(
+            task_id=task_id,
+            status=result.get("status", "done"),
+            message=result.get("message"),
+            files_processed=result.get("files_processed", 0),
+            mode=result.get("mode"),
+            changed_files_count=result.get("changed_files_count"),
+            files_skipped=result.get("files_skipped"),
+            files_deleted=result.get("files_deleted")
+        )
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ingest failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -567,8 +494,16 @@ async def get_related(
     Returns file summaries with ref:// handles for MCP integration
     """
     try:
+        cache_key = query_cache.make_key("related", repoId, {
+            "query": query_cache.normalize_query(query),
+            "limit": limit
+        })
+        cached = query_cache.get("related", cache_key)
+        if cached is not None:
+            return RelatedResponse(**{**cached, "query": query})
+        
         # Perform fulltext search
-        search_results = graph_service.fulltext_search(
+        search_results = await graph_service.fulltext_search_async(
             query_text=query,
             repo_id=repoId,
             limit=limit * 2  # Get more for ranking
@@ -613,11 +548,13 @@ async def get_related(
         
         logger.info(f"Found {len(nodes)} related files for query: {query}")
         
-        return RelatedResponse(
+        response = RelatedResponse(
             nodes=nodes,
             query=query,
             repo_id=repoId
         )
+        query_cache.set(cache_key, response.dict())
+        return response
         
     except Exception as e:
         logger.error(f"Related query failed: {e}")
@@ -644,8 +581,18 @@ async def get_context_pack(
         # Create search query from keywords
         search_query = ' '.join(keyword_list) if keyword_list else '*'
         
+        cache_key = query_cache.make_key("context_pack", repoId, {
+            "query": query_cache.normalize_query(search_query),
+            "stage": stage,
+            "budget": budget,
+            "focus": focus_paths
+        })
+        cached = query_cache.get("context_pack", cache_key)
+        if cached is not None:
+            return ContextPack(**cached)
+        
         # Search for relevant files
-        search_results = graph_service.fulltext_search(
+        search_results = await graph_service.fulltext_search_async(
             query_text=search_query,
             repo_id=repoId,
             limit=50
@@ -685,6 +632,7 @@ async def get_context_pack(
                 "path": file["path"],
                 "lang": file["lang"],
                 "score": file["score"],
+                "centrality": file.get("centrality"),
                 "summary": summary,
                 "ref": ref
             })
@@ -701,6 +649,7 @@ async def get_context_pack(
         
         logger.info(f"Built context pack with {len(context_pack['items'])} items")
 
+        query_cache.set(cache_key, context_pack)
         return ContextPack(**context_pack)
 
     except Exception as e:
@@ -754,7 +703,7 @@ async def get_impact_analysis(
     """
     try:
         # Perform impact analysis
-        impact_results = graph_service.impact_analysis(
+        impact_results = await graph_service.impact_analysis_async(
             repo_id=repoId,
             file_path=file,
             depth=depth,
@@ -814,3 +763,103 @@ async def get_impact_analysis(
     except Exception as e:
         logger.error(f"Impact analysis failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+# Ref handle resolution endpoint
+class RefContentResponse(BaseModel):
+    """Content of a ref:// handle"""
+    ref: str
+    repo_id: str
+    path: str
+    start_line: int
+    end_line: Optional[int] = None
+    content: str
+
+@router.get("/graph/ref", response_model=RefContentResponse)
+async def resolve_ref(
+    repoId: str = Query(..., description="Repository ID"),
+    ref: str = Query(..., description="ref://file/<path>#L<start>-L<end> handle")
+):
+    """
+    Resolve a ref:// handle to the referenced lines of an ingested file.
+    Reads from File.content or, when file bodies live in the blob store, from the blob.
+    """
+    parsed = BlobStore.parse_ref(ref)
+    if not parsed:
+        raise HTTPException(status_code=400, detail=f"Invalid ref handle: {ref}")
+
+    try:
+        content = await graph_service.get_file_lines_async(
+            repo_id=repoId,
+            path=parsed["path"],
+            start_line=parsed["start_line"],
+            end_line=parsed["end_line"]
+        )
+    except Exception as e:
+        logger.error(f"Ref resolution failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Content not found for {ref}")
+
+    return RefContentResponse(ref=ref, repo_id=repoId, content=content, **parsed)
+
+# Read-only Cypher endpoint
+class GraphQueryPage(BaseModel):
+    """One page of Cypher results"""
+    rows: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+@router.post("/graph/query", response_model=GraphQueryPage)
+async def query_graph(request: GraphQueryRequest):
+    """
+    Run a read-only Cypher query.
+
+    Results are paged on the server: pass `next_cursor` of a response as
+    `cursor` to get the next page. Paging needs a stable order, either
+    `order_by` key columns or a query ending with ORDER BY.
+
+    With `stream=true` all rows are sent as NDJSON while they are fetched,
+    without buffering the result. A failure after the first row ends the
+    stream with an `{"error": ...}` line.
+    """
+    if not graph_service._connected:
+        raise HTTPException(status_code=503, detail="Not connected to Neo4j")
+
+    if request.stream:
+        rows = graph_service.stream_cypher(
+            request.cypher,
+            request.parameters,
+            fetch_size=request.page_size,
+            read_only=True,
+            timeout=settings.neo4j_query_timeout
+        )
+
+        async def ndjson():
+            try:
+                async for row in rows:
+                    yield to_json_line(row)
+            except Exception as e:
+                # the 200 header is already sent; a terminal line tells clients the stream is incomplete
+                logger.error(f"Streamed graph query failed: {e}")
+                yield to_json_line({"error": str(e)})
+            finally:
+                await rows.aclose()
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    try:
+        page = await graph_service.execute_cypher_page_async(
+            request.cypher,
+            request.parameters,
+            page_size=request.page_size,
+            cursor=request.cursor,
+            order_by=request.order_by,
+            timeout=settings.neo4j_query_timeout
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Graph query failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return GraphQueryPage(**page)
@@ -1,10 +1,10 @@
 """
-Server-Sent Events (SSE) routes for real-time task monitoring
+Server-Sent Events (SSE) routes for real-time task monitoring and query streaming
 """
 
 import asyncio
 import json
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 from loguru import logger
@@ -249,4 +249,44 @@ async def get_sse_stats():
             "status_filter": conn_info.get("status_filter")
         })
     
-    return stats
\ No newline at end of file
+    return stats
+
+def stream_events(request: Request, connection_id: str, events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """
+    Serve an async iterator of event dicts as an SSE stream
+
+    Args:
+        request: Incoming request, polled for client disconnects
+        connection_id: Key under which the stream shows up in /sse/stats
+        events: Events to send, each as one `data:` line
+    """
+
+    async def event_generator():
+        active_connections[connection_id] = {
+            "task_id": None,
+            "request": request,
+            "start_time": asyncio.get_event_loop().time()
+        }
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    logger.info(f"Client disconnected from SSE stream {connection_id}")
+                    break
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+        except Exception as e:
+            logger.error(f"Error in SSE stream {connection_id}: {e}")
+            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+        finally:
+            await events.aclose()
+            active_connections.pop(connection_id, None)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "Cache-Control"
+        }
+    )
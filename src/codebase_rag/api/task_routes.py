@@ -56,7 +56,7 @@ async def create_task(request: CreateTaskRequest):
     """create new task"""
     try:
         # validate task type
-        valid_task_types = ["document_processing", "schema_parsing", "knowledge_graph_construction", "batch_processing"]
+        valid_task_types = ["document_processing", "schema_parsing", "knowledge_graph_construction", "batch_processing", "repo_ingestion"]
         if request.task_type not in valid_task_types:
             raise HTTPException(
                 status_code=400, 
@@ -33,6 +33,10 @@ class Settings(BaseSettings):
     neo4j_username: str = Field(default="neo4j", description="Neo4j username", alias="NEO4J_USER")
     neo4j_password: str = Field(default="password", description="Neo4j password", alias="NEO4J_PASSWORD")
     neo4j_database: str = Field(default="neo4j", description="Neo4j database name")
+    neo4j_max_connection_pool_size: int = Field(default=50, description="Maximum Neo4j driver connections; also bounds the graph query worker threads", alias="NEO4J_MAX_POOL_SIZE")
+    neo4j_connection_acquisition_timeout: float = Field(default=30.0, description="Seconds to wait for a free Neo4j connection before failing", alias="NEO4J_ACQUISITION_TIMEOUT")
+    neo4j_fetch_size: int = Field(default=1000, description="Records fetched per round trip when streaming Neo4j results", alias="NEO4J_FETCH_SIZE")
+    neo4j_query_timeout: float = Field(default=60.0, description="Seconds a client Cypher query from /graph/query may run before Neo4j aborts it", alias="NEO4J_QUERY_TIMEOUT")
 
     # LLM Provider Configuration
     llm_provider: Literal["ollama", "openai", "gemini", "openrouter"] = Field(
@@ -61,7 +65,7 @@ class Settings(BaseSettings):
     openrouter_max_tokens: int = Field(default=2048, description="OpenRouter max tokens for completion", alias="OPENROUTER_MAX_TOKENS")
 
     # Embedding Provider Configuration
-    embedding_provider: Literal["ollama", "openai", "gemini", "openrouter"] = Field(
+    embedding_provider: Literal["ollama", "openai", "gemini", "openrouter", "local"] = Field(
         default="ollama",
         description="Embedding provider to use",
         alias="EMBEDDING_PROVIDER"
@@ -79,6 +83,9 @@ class Settings(BaseSettings):
     # OpenRouter Embedding
     openrouter_embedding_model: str = Field(default="text-embedding-ada-002", description="OpenRouter embedding model", alias="OPENROUTER_EMBEDDING_MODEL")
 
+    # Local Embedding (hashed n-grams, no external service)
+    local_embedding_model: str = Field(default="hashed-ngram", description="Name reported for the local hashed n-gram embedding model", alias="LOCAL_EMBEDDING_MODEL")
+
     # Model Parameters
     temperature: float = Field(default=0.1, description="LLM temperature")
     max_tokens: int = Field(default=2048, description="Maximum tokens for LLM response")
@@ -87,6 +94,9 @@ class Settings(BaseSettings):
     chunk_size: int = Field(default=512, description="Text chunk size for processing")
     chunk_overlap: int = Field(default=50, description="Chunk overlap size")
     top_k: int = Field(default=5, description="Top K results for retrieval")
+    graph_retrieval_timeout: float = Field(default=30.0, description="Seconds graph retrieval may take before a query continues without it")
+    vector_retrieval_timeout: float = Field(default=10.0, description="Seconds vector retrieval may take before a query continues without it")
+    retrieval_max_workers: int = Field(default=8, description="Threads shared by concurrent retrieval stages")
 
     # Timeout Settings
     connection_timeout: int = Field(default=30, description="Connection timeout in seconds")
@@ -100,6 +110,43 @@ class Settings(BaseSettings):
         default_factory=dict,
         description="Optional ingestion pipeline overrides",
     )
+    knowledge_ingest_window: int = Field(default=64, description="Documents held in memory at a time during knowledge ingestion")
+    knowledge_ingest_workers: int = Field(default=4, description="Worker processes that parse documents into nodes (0 or 1 parses in-process)")
+    knowledge_write_batch_size: int = Field(default=256, description="Nodes written to the knowledge graph per batch")
+    knowledge_document_timeout: float = Field(default=120.0, description="Seconds one document may take to parse before it is skipped")
+    code_parse_workers: int = Field(default=4, description="Worker processes that parse source code for the knowledge pipeline (0 parses in a thread)")
+    code_parse_chunk_size: int = Field(default=16, description="Most source files sent to a code parse worker in one task")
+
+    # Embedding Generation Settings
+    embedding_batch_size: int = Field(default=64, description="Maximum texts per embedding request")
+    embedding_max_concurrency: int = Field(default=4, description="Maximum embedding requests in flight")
+    embedding_cache_enabled: bool = Field(default=True, description="Cache embeddings on disk keyed by model and text hash")
+    embedding_cache_path: str = Field(default="data/embeddings.db", description="SQLite file of the embedding cache")
+
+    # Local ANN Index Settings
+    ann_index_enabled: bool = Field(default=False, description="Keep an in-process IVF index of knowledge embeddings and use it as the first-stage vector retriever")
+    ann_index_path: str = Field(default="data/ann", description="Directory of the memory-mapped ANN index")
+    ann_nprobe: int = Field(default=16, description="IVF clusters scanned per ANN query (higher is slower but more accurate)")
+
+    # Code Ingestion Settings
+    ingest_batch_size: int = Field(default=1000, description="Number of File rows written per UNWIND transaction during repository ingestion")
+    ingest_batch_max_retries: int = Field(default=3, description="Retries for a failed ingestion batch before it is reported as failed")
+    ingest_scan_workers: int = Field(default=8, description="Threads used to read and hash files while scanning a repository")
+    file_content_storage: Literal["graph", "blob"] = Field(default="graph", description="Where file bodies are stored: File.content in Neo4j, or a local content-addressed blob store")
+    blob_store_path: str = Field(default="data/blobs", description="Directory of the content-addressed blob store")
+    content_search_weight: float = Field(default=0.5, description="Weight of file content (BM25) matches relative to path matches in file search")
+
+    # Graph Query Settings
+    impact_max_nodes_per_level: int = Field(default=1000, description="Maximum dependents expanded per level of impact analysis")
+    centrality_enabled: bool = Field(default=True, description="Compute PageRank, degree and dependent counts of files and symbols after ingestion")
+    graph_snapshot_enabled: bool = Field(default=True, description="Serve impact, neighbourhood, degree and path queries from an in-memory graph snapshot")
+
+    # Query Cache Settings
+    query_cache_enabled: bool = Field(default=True, description="Cache /graph/related and /context/pack results")
+    query_cache_max_entries: int = Field(default=1024, description="Maximum cached query results (LRU)")
+    query_cache_ttl: int = Field(default=300, description="Seconds a cached query result stays valid")
+    knowledge_cache_enabled: bool = Field(default=True, description="Cache knowledge query answers until the knowledge base changes")
+    knowledge_cache_similarity: float = Field(default=1.0, description="Cosine similarity at which a cached answer is reused for a differently worded question; 1.0 (default) disables semantic matching, which costs one query embedding per cache miss")
 
     # API Settings
     cors_origins: list = Field(default=["*"], description="CORS allowed origins")
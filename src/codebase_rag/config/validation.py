@@ -112,7 +112,7 @@ def get_current_model_info() -> dict:
             "ollama": settings.ollama_embedding_model,
             "openai": settings.openai_embedding_model,
             "gemini": settings.gemini_embedding_model,
-            "huggingface": settings.huggingface_embedding_model,
+            "local": settings.local_embedding_model,
             "openrouter": settings.openrouter_embedding_model
         }.get(settings.embedding_provider)
     }
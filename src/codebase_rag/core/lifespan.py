@@ -9,6 +9,8 @@ from loguru import logger
 from codebase_rag.services.knowledge import neo4j_knowledge_service
 from codebase_rag.services.tasks import task_queue, processor_registry
 from codebase_rag.services.memory import memory_store
+from codebase_rag.services.pipeline.transformers import code_parse_pool
+from codebase_rag.services.pipeline.embeddings import close_default_embedding_generator
 
 
 @asynccontextmanager
@@ -72,6 +74,12 @@ async def cleanup_services():
         # close Neo4j service
         await neo4j_knowledge_service.close()
 
+        # stop code parse workers
+        code_parse_pool.close()
+
+        # close the embedding HTTP session
+        await close_default_embedding_generator()
+
         logger.info("Services shut down successfully")
     except Exception as e:
         logger.error(f"Error during shutdown: {e}") 
\ No newline at end of file
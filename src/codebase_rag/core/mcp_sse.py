@@ -11,7 +11,7 @@ from starlette.routing import Route, Mount
 from loguru import logger
 
 from mcp.server.sse import SseServerTransport
-from mcp_server import server as mcp_server, ensure_service_initialized
+from codebase_rag.mcp.server import server as mcp_server, ensure_service_initialized
 
 
 # Create SSE transport with /messages/ endpoint
@@ -9,29 +9,57 @@ This module contains handlers for knowledge base operations:
 - Add directories
 """
 
+import json
 from typing import Dict, Any
 from loguru import logger
 
 
-async def handle_query_knowledge(args: Dict, knowledge_service) -> Dict:
+async def handle_query_knowledge(args: Dict, knowledge_service, progress=None) -> Dict:
     """
     Query knowledge base using Neo4j GraphRAG.
 
     Args:
-        args: Arguments containing question and mode
+        args: Arguments containing question, mode, retrieve_only and stream
         knowledge_service: Neo4jKnowledgeService instance
+        progress: Optional async callback(progress, message) sending MCP progress
+            notifications; with stream set, sources and answer tokens go through it
 
     Returns:
-        Query result with answer and source nodes
+        Query result with answer and source nodes (no answer when retrieve_only)
     """
+    if args.get("stream") and progress is not None and not args.get("retrieve_only"):
+        return await _stream_query_knowledge(args, knowledge_service, progress)
+
     result = await knowledge_service.query(
         question=args["question"],
-        mode=args.get("mode", "hybrid")
+        mode=args.get("mode", "hybrid"),
+        retrieve_only=args.get("retrieve_only", False)
     )
     logger.info(f"Query: {args['question'][:50]}... (mode: {args.get('mode', 'hybrid')})")
     return result
 
 
+async def _stream_query_knowledge(args: Dict, knowledge_service, progress) -> Dict:
+    """Forward streamed query events as progress notifications and return the assembled result"""
+    result: Dict[str, Any] = {"success": True}
+    step = 0
+    async for event in knowledge_service.stream_query(
+        question=args["question"],
+        mode=args.get("mode", "hybrid")
+    ):
+        if event["type"] == "error":
+            return {"success": False, "error": event["error"]}
+        if event["type"] == "sources":
+            result.update(source_nodes=event["source_nodes"], pipeline_steps=event["pipeline_steps"])
+        elif event["type"] == "done":
+            result.update(answer=event["answer"], query_mode=event["query_mode"])
+            break
+        step += 1
+        await progress(step, json.dumps(event, default=str))
+    logger.info(f"Streamed query: {args['question'][:50]}... (mode: {args.get('mode', 'hybrid')})")
+    return result
+
+
 async def handle_search_similar_nodes(args: Dict, knowledge_service) -> Dict:
     """
     Search for similar nodes using vector similarity.
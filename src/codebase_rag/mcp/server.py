@@ -21,11 +21,11 @@ Usage:
 """
 
 import asyncio
-import sys
-from typing import Any, Dict, List, Sequence
+import functools
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
 from datetime import datetime
 
-from mcp.server import Server
+from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 from mcp.types import (
     Tool,
@@ -39,30 +39,29 @@ from mcp.types import (
 from loguru import logger
 
 # Import services
-from codebase_rag.services.neo4j_knowledge_service import Neo4jKnowledgeService
-from codebase_rag.services.memory_store import memory_store
-from codebase_rag.services.memory_extractor import memory_extractor
-from codebase_rag.services.task_queue import task_queue, TaskStatus, submit_document_processing_task, submit_directory_processing_task
-from codebase_rag.services.task_processors import processor_registry
-from codebase_rag.services.graph_service import graph_service
-from codebase_rag.services.code_ingestor import get_code_ingestor
-from codebase_rag.services.ranker import ranker
-from codebase_rag.services.pack_builder import pack_builder
-from codebase_rag.services.git_utils import git_utils
+from codebase_rag.services.knowledge import neo4j_knowledge_service
+from codebase_rag.services.memory import memory_store, memory_extractor
+from codebase_rag.services.tasks import task_queue, TaskStatus, processor_registry
+from codebase_rag.services.tasks.task_queue import submit_document_processing_task, submit_directory_processing_task
+from codebase_rag.services.code import graph_service, get_code_ingestor, pack_builder
+from codebase_rag.services.utils import ranker, git_utils
 from codebase_rag.config import settings, get_current_model_info
 
 # Import MCP tools modules
-from mcp_tools import (
-    # Handlers
+from codebase_rag.mcp.handlers.knowledge import (
     handle_query_knowledge,
     handle_search_similar_nodes,
     handle_add_document,
     handle_add_file,
     handle_add_directory,
+)
+from codebase_rag.mcp.handlers.code import (
     handle_code_graph_ingest_repo,
     handle_code_graph_related,
     handle_code_graph_impact,
     handle_context_pack,
+)
+from codebase_rag.mcp.handlers.memory import (
     handle_add_memory,
     handle_search_memories,
     handle_get_memory,
@@ -76,27 +75,24 @@ from mcp_tools import (
     handle_extract_from_code_comments,
     handle_suggest_memory_from_query,
     handle_batch_extract_from_repository,
-    # Task handlers
+)
+from codebase_rag.mcp.handlers.tasks import (
     handle_get_task_status,
     handle_watch_task,
     handle_watch_tasks,
     handle_list_tasks,
     handle_cancel_task,
     handle_get_queue_stats,
+)
+from codebase_rag.mcp.handlers.system import (
     handle_get_graph_schema,
     handle_get_statistics,
     handle_clear_knowledge_base,
-    # Tool definitions
-    get_tool_definitions,
-    # Utilities
-    format_result,
-    # Resources
-    get_resource_list,
-    read_resource_content,
-    # Prompts
-    get_prompt_list,
-    get_prompt_content,
 )
+from codebase_rag.mcp.tools import get_tool_definitions
+from codebase_rag.mcp.utils import format_result
+from codebase_rag.mcp.resources import get_resource_list, read_resource_content
+from codebase_rag.mcp.prompts import get_prompt_list, get_prompt_content
 
 
 # ============================================================================
@@ -106,7 +102,7 @@ from mcp_tools import (
 server = Server("codebase-rag-complete-v2")
 
 # Initialize services
-knowledge_service = Neo4jKnowledgeService()
+knowledge_service = neo4j_knowledge_service
 _service_initialized = False
 
 # Session tracking with thread-safe access
@@ -155,6 +151,19 @@ async def track_session_activity(session_id: str, tool: str, details: Dict[str,
         })
 
 
+def _progress_reporter():
+    """Progress notification sender for the current request, or None without a progress token"""
+    ctx = server.request_context
+    token = getattr(ctx.meta, "progressToken", None) if ctx.meta else None
+    if token is None:
+        return None
+
+    async def report(progress: float, message: str):
+        await ctx.session.send_progress_notification(token, progress, message=message)
+
+    return report
+
+
 # ============================================================================
 # Tool Definitions
 # ============================================================================
@@ -169,6 +178,48 @@ async def handle_list_tools() -> List[Tool]:
 # Tool Execution
 # ============================================================================
 
+# Tool name -> coroutine taking the tool arguments
+TOOL_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+    # Knowledge base
+    "query_knowledge": lambda args: handle_query_knowledge(args, knowledge_service, progress=_progress_reporter()),
+    "search_similar_nodes": lambda args: handle_search_similar_nodes(args, knowledge_service),
+    "add_document": lambda args: handle_add_document(args, knowledge_service, submit_document_processing_task),
+    "add_file": lambda args: handle_add_file(args, knowledge_service),
+    "add_directory": lambda args: handle_add_directory(
+        args, functools.partial(submit_directory_processing_task, knowledge_service.add_directory)
+    ),
+    # Code graph
+    "code_graph_ingest_repo": lambda args: handle_code_graph_ingest_repo(args, get_code_ingestor, git_utils),
+    "code_graph_related": lambda args: handle_code_graph_related(args, graph_service, ranker),
+    "code_graph_impact": lambda args: handle_code_graph_impact(args, graph_service),
+    "context_pack": lambda args: handle_context_pack(args, pack_builder),
+    # Memory store
+    "add_memory": lambda args: handle_add_memory(args, memory_store),
+    "search_memories": lambda args: handle_search_memories(args, memory_store),
+    "get_memory": lambda args: handle_get_memory(args, memory_store),
+    "update_memory": lambda args: handle_update_memory(args, memory_store),
+    "delete_memory": lambda args: handle_delete_memory(args, memory_store),
+    "supersede_memory": lambda args: handle_supersede_memory(args, memory_store),
+    "get_project_summary": lambda args: handle_get_project_summary(args, memory_store),
+    "extract_from_conversation": lambda args: handle_extract_from_conversation(args, memory_extractor),
+    "extract_from_git_commit": lambda args: handle_extract_from_git_commit(args, memory_extractor),
+    "extract_from_code_comments": lambda args: handle_extract_from_code_comments(args, memory_extractor),
+    "suggest_memory_from_query": lambda args: handle_suggest_memory_from_query(args, memory_extractor),
+    "batch_extract_from_repository": lambda args: handle_batch_extract_from_repository(args, memory_extractor),
+    # Task management
+    "get_task_status": lambda args: handle_get_task_status(args, task_queue, TaskStatus),
+    "watch_task": lambda args: handle_watch_task(args, task_queue, TaskStatus),
+    "watch_tasks": lambda args: handle_watch_tasks(args, task_queue, TaskStatus),
+    "list_tasks": lambda args: handle_list_tasks(args, task_queue),
+    "cancel_task": lambda args: handle_cancel_task(args, task_queue),
+    "get_queue_stats": lambda args: handle_get_queue_stats(args, task_queue),
+    # System
+    "get_graph_schema": lambda args: handle_get_graph_schema(args, knowledge_service),
+    "get_statistics": lambda args: handle_get_statistics(args, knowledge_service),
+    "clear_knowledge_base": lambda args: handle_clear_knowledge_base(args, knowledge_service),
+}
+
+
 @server.call_tool()
 async def handle_call_tool(
     name: str,
@@ -180,113 +231,11 @@ async def handle_call_tool(
     await ensure_service_initialized()
 
     try:
-        await ensure_service_initialized()
-
-        if not local_path and not repo_url:
-            return {
-                "success": False,
-                "error": "Either local_path or repo_url must be provided"
-            }
-
-        if ctx:
-            await ctx.info(f"Ingesting repository (mode: {mode})")
-
-        # Set defaults
-        if include_globs is None:
-            include_globs = ["**/*.py", "**/*.ts", "**/*.tsx", "**/*.java", "**/*.php", "**/*.go"]
-        if exclude_globs is None:
-            exclude_globs = ["**/node_modules/**", "**/.git/**", "**/__pycache__/**", "**/.venv/**", "**/vendor/**", "**/target/**"]
-
-        # Generate task ID
-        task_id = f"ing-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
-
-        # Determine repository path and ID
-        repo_path = None
-        repo_id = None
-        cleanup_needed = False
-
-        if local_path:
-            repo_path = local_path
-            repo_id = git_utils.get_repo_id_from_path(repo_path)
+        handler = TOOL_HANDLERS.get(name)
+        if handler is None:
+            result = {"success": False, "error": f"Unknown tool: {name}"}
         else:
-            # Clone repository
-            if ctx:
-                await ctx.info(f"Cloning repository: {repo_url}")
-
-            clone_result = git_utils.clone_repo(repo_url, branch=branch)
-
-            if not clone_result.get("success"):
-                return {
-                    "success": False,
-                    "task_id": task_id,
-                    "status": "error",
-                    "error": clone_result.get("error", "Failed to clone repository")
-                }
-
-            repo_path = clone_result["path"]
-            repo_id = git_utils.get_repo_id_from_url(repo_url)
-            cleanup_needed = True
-
-        # Get code ingestor
-        code_ingestor = get_code_ingestor(graph_service)
-
-        # Handle incremental mode
-        files_to_process = None
-        changed_files_count = 0
-
-        if mode == "incremental" and git_utils.is_git_repo(repo_path):
-            if ctx:
-                await ctx.info("Using incremental mode - detecting changed files")
-
-            changed_files_result = git_utils.get_changed_files(
-                repo_path,
-                since_commit=since_commit,
-                include_untracked=True
-            )
-            changed_files_count = changed_files_result.get("count", 0)
-
-            if changed_files_count == 0:
-                return {
-                    "success": True,
-                    "task_id": task_id,
-                    "status": "done",
-                    "message": "No changed files detected",
-                    "mode": "incremental",
-                    "files_processed": 0,
-                    "changed_files_count": 0
-                }
-
-            # Filter changed files by globs
-            files_to_process = [f["path"] for f in changed_files_result.get("changed_files", []) if f["action"] != "deleted"]
-
-            if ctx:
-                await ctx.info(f"Found {changed_files_count} changed files")
-
-        # Scan files
-        if ctx:
-            await ctx.info(f"Scanning repository: {repo_path}")
-
-        scanned_files = code_ingestor.scan_files(
-            repo_path=repo_path,
-            include_globs=include_globs,
-            exclude_globs=exclude_globs,
-            specific_files=files_to_process
-        )
-
-        if not scanned_files:
-            return {
-                "success": True,
-                "task_id": task_id,
-                "status": "done",
-                "message": "No files found matching criteria",
-                "mode": mode,
-                "files_processed": 0,
-                "changed_files_count": changed_files_count if mode == "incremental" else None
-            }
-
-        # Ingest files
-        if ctx:
-            await ctx.info(f"Ingesting {len(scanned_files)} files...")
+            result = await handler(arguments or {})
 
         # Format and return
         return [TextContent(type="text", text=format_result(result))]
@@ -363,142 +312,12 @@ async def main():
                 server_name="codebase-rag-complete-v2",
                 server_version="2.0.0",
                 capabilities=server.get_capabilities(
-                    notification_options=None,
+                    notification_options=NotificationOptions(),
                     experimental_capabilities={}
                 )
             )
         )
 
 
-# ===================================
-# MCP Resources
-# ===================================
-
-# MCP resource: knowledge base config
-@mcp.resource("knowledge://config")
-async def get_knowledge_config() -> Dict[str, Any]:
-    """Get knowledge base configuration and settings."""
-    model_info = get_current_model_info()
-    return {
-        "app_name": settings.app_name,
-        "version": settings.app_version,
-        "neo4j_uri": settings.neo4j_uri,
-        "neo4j_database": settings.neo4j_database,
-        "llm_provider": settings.llm_provider,
-        "embedding_provider": settings.embedding_provider,
-        "current_models": model_info,
-        "chunk_size": settings.chunk_size,
-        "chunk_overlap": settings.chunk_overlap,
-        "top_k": settings.top_k,
-        "vector_dimension": settings.vector_dimension,
-        "timeouts": {
-            "connection": settings.connection_timeout,
-            "operation": settings.operation_timeout,
-            "large_document": settings.large_document_timeout
-        }
-    }
-
-# MCP resource: system status
-@mcp.resource("knowledge://status")
-async def get_system_status() -> Dict[str, Any]:
-    """Get current system status and health."""
-    try:
-        await ensure_service_initialized()
-        stats = await knowledge_service.get_statistics()
-        model_info = get_current_model_info()
-        
-        return {
-            "status": "healthy" if stats.get("success") else "degraded",
-            "services": {
-                "neo4j_knowledge_service": _service_initialized,
-                "neo4j_connection": True,  # if initialized, connection is healthy
-            },
-            "current_models": model_info,
-            "statistics": stats
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e),
-            "services": {
-                "neo4j_knowledge_service": _service_initialized,
-                "neo4j_connection": False,
-            }
-        }
-
-# MCP resource: recent documents
-@mcp.resource("knowledge://recent-documents/{limit}")
-async def get_recent_documents(limit: int = 10) -> Dict[str, Any]:
-    """Get recently added documents."""
-    try:
-        await ensure_service_initialized()
-        # here can be extended to query recent documents from graph database
-        # currently return placeholder information
-        return {
-            "message": f"Recent {limit} documents endpoint",
-            "note": "This feature can be extended to query Neo4j for recently added documents",
-            "limit": limit,
-            "implementation_status": "placeholder"
-        }
-    except Exception as e:
-        return {
-            "error": str(e)
-        }
-
-# MCP prompt: generate query suggestions
-@mcp.prompt
-def suggest_queries(domain: str = "general") -> str:
-    """
-    Generate suggested queries for the Neo4j knowledge graph.
-    
-    Args:
-        domain: Domain to focus suggestions on (e.g., "code", "documentation", "sql", "architecture")
-    """
-    suggestions = {
-        "general": [
-            "What are the main components of this system?",
-            "How does the Neo4j knowledge pipeline work?",
-            "What databases and services are used in this project?",
-            "Show me the overall architecture of the system"
-        ],
-        "code": [
-            "Show me Python functions for data processing",
-            "Find code examples for Neo4j integration",
-            "What are the main classes in the pipeline module?",
-            "How is the knowledge service implemented?"
-        ],
-        "documentation": [
-            "What is the system architecture?",
-            "How to set up the development environment?",
-            "What are the API endpoints available?",
-            "How to configure different LLM providers?"
-        ],
-        "sql": [
-            "Show me table schemas for user management",
-            "What are the relationships between database tables?",
-            "Find SQL queries for reporting",
-            "How is the database schema structured?"
-        ],
-        "architecture": [
-            "What is the GraphRAG architecture?",
-            "How does the vector search work with Neo4j?",
-            "What are the different query modes available?",
-            "How are documents processed and stored?"
-        ]
-    }
-    
-    domain_suggestions = suggestions.get(domain, suggestions["general"])
-    
-    return f"""Here are some suggested queries for the {domain} domain in the Neo4j Knowledge Graph:
-
-{chr(10).join(f"• {suggestion}" for suggestion in domain_suggestions)}
-
-Available query modes:
-• hybrid: Combines graph traversal and vector search (recommended)
-• graph_only: Uses only graph relationships
-• vector_only: Uses only vector similarity search
-
-You can use the query_knowledge tool with any of these questions or create your own queries."""
-
 if __name__ == "__main__":
     asyncio.run(main())
@@ -34,7 +34,10 @@ Modes:
 - graph_only: Use only graph relationships
 - vector_only: Use only vector similarity
 
-Returns LLM-generated answer with source nodes.""",
+Returns LLM-generated answer with source nodes.
+Set retrieve_only to skip the LLM and get only the ranked source nodes.
+Set stream to receive the sources, then answer tokens, as progress notifications
+(requires a progress token on the request).""",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -47,6 +50,16 @@ Returns LLM-generated answer with source nodes.""",
                         "enum": ["hybrid", "graph_only", "vector_only"],
                         "default": "hybrid",
                         "description": "Query mode"
+                    },
+                    "retrieve_only": {
+                        "type": "boolean",
+                        "default": False,
+                        "description": "Return fused, ranked source nodes without generating an answer"
+                    },
+                    "stream": {
+                        "type": "boolean",
+                        "default": False,
+                        "description": "Send sources and answer tokens as progress notifications while the answer is generated"
                     }
                 },
                 "required": ["question"]
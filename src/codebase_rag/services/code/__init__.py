@@ -3,5 +3,7 @@
 from codebase_rag.services.code.code_ingestor import CodeIngestor, get_code_ingestor
 from codebase_rag.services.code.graph_service import Neo4jGraphService, graph_service
 from codebase_rag.services.code.pack_builder import PackBuilder, pack_builder
+from codebase_rag.services.code.blob_store import BlobStore, get_blob_store
+from codebase_rag.services.code.graph_snapshot import GraphSnapshot
 
-__all__ = ["CodeIngestor", "get_code_ingestor", "Neo4jGraphService", "PackBuilder", "graph_service", "pack_builder"]
+__all__ = ["CodeIngestor", "get_code_ingestor", "Neo4jGraphService", "PackBuilder", "graph_service", "pack_builder", "BlobStore", "get_blob_store", "GraphSnapshot"]
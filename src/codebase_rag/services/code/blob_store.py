@@ -0,0 +1,126 @@
+"""
+Content-addressed blob store for file bodies
+Keeps file contents on local disk keyed by their sha so Neo4j only stores the hash
+"""
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from codebase_rag.config import settings
+
+REF_PATTERN = re.compile(r'^ref://file/(?P<path>[^#]+)(?:#L(?P<start>\d+)(?:-L(?P<end>\d+))?)?$')
+
+
+class BlobStore:
+    """
+    Directory of blobs sharded by the first two hex digits of the sha.
+
+    Blobs are immutable and written atomically, so identical files across
+    repositories and branches are stored once and can be read concurrently.
+    Line ranges are served through mmap without loading the whole file.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.blob_store_path)
+
+    def _blob_path(self, sha: str) -> Path:
+        return self.root / sha[:2] / sha
+
+    def exists(self, sha: str) -> bool:
+        return self._blob_path(sha).exists()
+
+    def put(self, sha: str, data: bytes) -> bool:
+        """Store a blob; returns False when it was already present"""
+        target = self._blob_path(sha)
+        if target.exists():
+            return False
+        self._write_atomic(target, lambda f: f.write(data))
+        return True
+
+    def put_file(self, sha: str, file_path: str) -> bool:
+        """Store the contents of a file without reading it into memory"""
+        target = self._blob_path(sha)
+        if target.exists():
+            return False
+        with open(file_path, 'rb') as src:
+            self._write_atomic(target, lambda f: shutil.copyfileobj(src, f, 1 << 20))
+        return True
+
+    def _write_atomic(self, target: Path, write):
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp, target)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def read_lines(self, sha: str, start_line: int = 1, end_line: Optional[int] = None) -> Optional[str]:
+        """Read an inclusive, 1-based line range of a blob; None if the blob is missing"""
+        path = self._blob_path(sha)
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return ""
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return self._slice_lines(mm, start_line, end_line).decode('utf-8', errors='ignore')
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _slice_lines(buf, start_line: int, end_line: Optional[int]) -> bytes:
+        # Walk newlines with find() so only the pages up to end_line are touched
+        begin = 0
+        for _ in range(max(start_line, 1) - 1):
+            pos = buf.find(b'\n', begin)
+            if pos < 0:
+                return b''
+            begin = pos + 1
+
+        if end_line is None:
+            return buf[begin:]
+        end = begin
+        for _ in range(max(end_line - max(start_line, 1) + 1, 0)):
+            pos = buf.find(b'\n', end)
+            if pos < 0:
+                return buf[begin:]
+            end = pos + 1
+        return buf[begin:end]
+
+    @staticmethod
+    def parse_ref(ref: str) -> Optional[Dict[str, Any]]:
+        """Parse a ref://file/<path>#L<start>-L<end> handle"""
+        match = REF_PATTERN.match(ref)
+        if not match:
+            return None
+        start = int(match.group("start") or 1)
+        end = match.group("end")
+        return {
+            "path": match.group("path"),
+            "start_line": start,
+            "end_line": int(end) if end else None
+        }
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """Blob store used for file bodies, or None when contents live in the graph"""
+    global blob_store
+    if settings.file_content_storage != "blob":
+        return None
+    if blob_store is None:
+        blob_store = BlobStore()
+        logger.info(f"Storing file contents in blob store at {blob_store.root}")
+    return blob_store
+
+
+# Global instance
+blob_store = None
@@ -3,12 +3,22 @@ Code ingestor service for repository ingestion
 Handles file scanning, language detection, and Neo4j ingestion
 """
 import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Pattern, Callable
 from loguru import logger
 import hashlib
 import fnmatch
 
+from codebase_rag.config import settings
+from codebase_rag.services.utils.git_utils import git_utils
+from codebase_rag.services.utils.metrics import metrics_service
+from codebase_rag.services.utils.query_cache import query_cache
+from codebase_rag.services.utils.ranker import Ranker
+from codebase_rag.services.code.blob_store import get_blob_store
+
 
 class CodeIngestor:
     """Code file scanner and ingestor for repositories"""
@@ -38,6 +48,14 @@ class CodeIngestor:
     def __init__(self, neo4j_service):
         """Initialize code ingestor with Neo4j service"""
         self.neo4j_service = neo4j_service
+        # File bodies go to the blob store instead of File.content when enabled
+        self.blob_store = get_blob_store()
+    
+    DEFAULT_INCLUDE_GLOBS = ["**/*.py", "**/*.ts", "**/*.tsx", "**/*.java", "**/*.php", "**/*.go"]
+    DEFAULT_EXCLUDE_GLOBS = ["**/node_modules/**", "**/.git/**", "**/__pycache__/**", "**/.venv/**", "**/vendor/**", "**/target/**"]
+    
+    # Files at or above this size are hashed but their content is not kept
+    MAX_CONTENT_SIZE = 100_000
     
     def scan_files(
         self,
@@ -46,110 +64,304 @@ class CodeIngestor:
         exclude_globs: List[str]
     ) -> List[Dict[str, Any]]:
         """Scan files in repository matching patterns"""
-        files = []
+        files = list(self.iter_files(repo_path, include_globs, exclude_globs))
+        logger.info(f"Scanned {len(files)} files in {os.path.abspath(repo_path)}")
+        return files
+    
+    def iter_files(
+        self,
+        repo_path: str,
+        include_globs: List[str],
+        exclude_globs: List[str],
+        max_workers: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream file records for a repository.
+        
+        The tree is walked with os.scandir while files are read and hashed on a
+        thread pool. Records are yielded as soon as they are ready (in completion
+        order), and at most a small multiple of max_workers files are in flight,
+        so memory stays bounded regardless of repository size.
+        """
         repo_path = os.path.abspath(repo_path)
+        include = self._compile_globs(include_globs)
+        exclude = self._compile_globs(exclude_globs)
+        max_workers = max(1, max_workers or settings.ingest_scan_workers)
+        window = max_workers * 4
         
-        for root, dirs, filenames in os.walk(repo_path):
-            # Filter out excluded directories
-            dirs[:] = [
-                d for d in dirs
-                if not self._should_exclude(os.path.join(root, d), repo_path, exclude_globs)
-            ]
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scan") as pool:
+            pending = set()
+            for file_path, rel_path, size in self._walk(repo_path, include, exclude):
+                pending.add(pool.submit(self._safe_file_info, file_path, rel_path, size))
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        file_info = future.result()
+                        if file_info is not None:
+                            yield file_info
             
-            for filename in filenames:
-                file_path = os.path.join(root, filename)
-                rel_path = os.path.relpath(file_path, repo_path)
-                
-                # Check if file matches include patterns and not excluded
-                if self._should_include(rel_path, include_globs) and \
-                   not self._should_exclude(file_path, repo_path, exclude_globs):
-                    
-                    try:
-                        file_info = self._get_file_info(file_path, rel_path)
-                        files.append(file_info)
-                    except Exception as e:
-                        logger.warning(f"Failed to process {rel_path}: {e}")
+            for future in as_completed(pending):
+                file_info = future.result()
+                if file_info is not None:
+                    yield file_info
+    
+    def iter_paths(
+        self,
+        repo_path: str,
+        paths: Iterable[str],
+        include_globs: List[str],
+        exclude_globs: List[str],
+        max_workers: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream file records for an explicit set of repository-relative paths.
         
-        logger.info(f"Scanned {len(files)} files in {repo_path}")
-        return files
+        Used by incremental ingestion: only the given paths are matched against
+        the globs, stat'ed, read and hashed. Paths that no longer exist are skipped.
+        """
+        repo_path = os.path.abspath(repo_path)
+        include = self._compile_globs(include_globs)
+        exclude = self._compile_globs(exclude_globs)
+        max_workers = max(1, max_workers or settings.ingest_scan_workers)
+        
+        def candidates():
+            for rel_path in paths:
+                rel_path = rel_path.replace(os.sep, '/')
+                if not (include and include.match(rel_path)) or \
+                   (exclude and (exclude.match(rel_path) or self._has_excluded_parent(rel_path, exclude))):
+                    continue
+                file_path = os.path.join(repo_path, rel_path)
+                try:
+                    if os.path.isfile(file_path):
+                        yield file_path, rel_path, os.path.getsize(file_path)
+                except OSError as e:
+                    logger.warning(f"Failed to process {rel_path}: {e}")
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scan") as pool:
+            for file_info in pool.map(lambda args: self._safe_file_info(*args), candidates()):
+                if file_info is not None:
+                    yield file_info
     
-    def _should_include(self, rel_path: str, include_globs: List[str]) -> bool:
-        """Check if file matches include patterns"""
-        return any(fnmatch.fnmatch(rel_path, pattern) for pattern in include_globs)
+    @staticmethod
+    def _has_excluded_parent(rel_path: str, exclude: Pattern) -> bool:
+        """Check whether any parent directory of rel_path matches the exclude regex"""
+        parts = rel_path.split('/')[:-1]
+        return any(exclude.match('/'.join(parts[:i]) + '/') for i in range(1, len(parts) + 1))
     
-    def _should_exclude(self, file_path: str, repo_path: str, exclude_globs: List[str]) -> bool:
-        """Check if file/directory matches exclude patterns"""
-        rel_path = os.path.relpath(file_path, repo_path)
-        return any(fnmatch.fnmatch(rel_path, pattern.strip('*')) or 
-                  fnmatch.fnmatch(rel_path + '/', pattern) for pattern in exclude_globs)
+    def _walk(
+        self,
+        repo_path: str,
+        include: Optional[Pattern],
+        exclude: Optional[Pattern]
+    ) -> Iterator[Tuple[str, str, int]]:
+        """Walk the tree with os.scandir, yielding (path, rel_path, size) of matching files"""
+        stack = [repo_path]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        rel_path = os.path.relpath(entry.path, repo_path).replace(os.sep, '/')
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                # Prune excluded directories before descending
+                                if not (exclude and exclude.match(rel_path + '/')):
+                                    stack.append(entry.path)
+                            elif entry.is_file():
+                                if include and include.match(rel_path) and \
+                                   not (exclude and exclude.match(rel_path)):
+                                    yield entry.path, rel_path, entry.stat().st_size
+                        except OSError as e:
+                            logger.warning(f"Failed to process {rel_path}: {e}")
+            except OSError as e:
+                logger.warning(f"Could not scan {current}: {e}")
+    
+    @staticmethod
+    def _compile_globs(patterns: List[str]) -> Optional[Pattern]:
+        """Compile glob patterns into a single regex; '**/' prefixes also match at the root"""
+        regexes = []
+        for pattern in patterns:
+            regexes.append(fnmatch.translate(pattern))
+            if pattern.startswith('**/'):
+                regexes.append(fnmatch.translate(pattern[3:]))
+        return re.compile('|'.join(regexes)) if regexes else None
+    
+    def _safe_file_info(self, file_path: str, rel_path: str, size: int) -> Optional[Dict[str, Any]]:
+        """Wrapper around _get_file_info that logs and drops unreadable files"""
+        try:
+            return self._get_file_info(file_path, rel_path, size)
+        except Exception as e:
+            logger.warning(f"Failed to process {rel_path}: {e}")
+            return None
     
-    def _get_file_info(self, file_path: str, rel_path: str) -> Dict[str, Any]:
+    def _get_file_info(self, file_path: str, rel_path: str, size: Optional[int] = None) -> Dict[str, Any]:
         """Get file information including language, size, and content"""
         ext = Path(file_path).suffix.lower()
         lang = self.LANG_MAP.get(ext, 'unknown')
         
         # Get file size
-        size = os.path.getsize(file_path)
+        if size is None:
+            size = os.path.getsize(file_path)
         
-        # Read content for small files (for fulltext search)
+        # Read the file once for both content and SHA hash. Content is only kept
+        # for small files (for fulltext search); large files are hashed in chunks.
         content = None
-        if size < 100_000:  # Only read files < 100KB
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-            except Exception as e:
-                logger.warning(f"Could not read {rel_path}: {e}")
-        
-        # Calculate SHA hash
         sha = None
+        data = None
         try:
+            hasher = hashlib.sha256()
             with open(file_path, 'rb') as f:
-                sha = hashlib.sha256(f.read()).hexdigest()[:16]
+                if size < self.MAX_CONTENT_SIZE:
+                    data = f.read()
+                    hasher.update(data)
+                    content = data.decode('utf-8', errors='ignore')
+                else:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        hasher.update(block)
+            sha = hasher.hexdigest()[:16]
         except Exception as e:
-            logger.warning(f"Could not hash {rel_path}: {e}")
+            logger.warning(f"Could not read {rel_path}: {e}")
+        
+        # With a blob store the graph only keeps the sha; identical bodies are stored once
+        if self.blob_store and sha:
+            try:
+                if data is not None:
+                    self.blob_store.put(sha, data)
+                else:
+                    self.blob_store.put_file(sha, file_path)
+                content = None
+            except OSError as e:
+                logger.warning(f"Could not store blob for {rel_path}, keeping content in graph: {e}")
         
         return {
             "path": rel_path,
             "lang": lang,
             "size": size,
             "content": content,
-            "sha": sha
+            "sha": sha,
+            "path_tokens": Ranker.tokenize_path(rel_path)
         }
     
     def ingest_files(
         self,
         repo_id: str,
-        files: List[Dict[str, Any]]
+        files: Iterable[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        skip_unchanged: bool = False,
+        delete_missing: bool = False,
+        partial: bool = False,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        repo_path: Optional[str] = None,
+        include_globs: Optional[List[str]] = None,
+        exclude_globs: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """Ingest files into Neo4j"""
+        """
+        Ingest files into Neo4j using batched UNWIND transactions.
+        
+        `files` may be a list or a lazy iterator such as iter_files(), in which
+        case writing starts while the scan is still running.
+        
+        Args:
+            repo_id: Repository ID
+            files: File records from scan_files/iter_files
+            batch_size: Rows per write transaction
+            skip_unchanged: Skip files whose sha matches the one already stored
+            delete_missing: Remove File nodes of this repo that are not in `files`
+                (only meaningful when `files` is a full scan of the repository)
+            partial: `files` is only a change set, so the repo file_count is left as is
+            on_progress: Called after every committed batch with cumulative counters
+                (files_scanned, files_written, files_skipped, bytes_scanned, bytes_per_sec)
+            repo_path, include_globs, exclude_globs: The scan that produced `files`;
+                with delete_missing only paths it covers and that are gone from disk
+                are removed, so files ingested under other globs survive
+        """
         try:
+            # Existing (path, sha) map for the repo, fetched in one query
+            existing = {}
+            if skip_unchanged or delete_missing:
+                existing = self.neo4j_service.get_file_shas(repo_id)
+            
+            seen_paths = set()
+            skipped = []
+            progress = {
+                "files_scanned": 0,
+                "files_written": 0,
+                "files_skipped": 0,
+                "bytes_scanned": 0,
+                "batches_committed": 0,
+                "files_estimated": len(existing) or None
+            }
+            start_time = time.perf_counter()
+            
+            def changed_files():
+                for file_info in files:
+                    seen_paths.add(file_info["path"])
+                    progress["files_scanned"] += 1
+                    progress["bytes_scanned"] += file_info.get("size") or 0
+                    if skip_unchanged and file_info.get("sha") and \
+                       existing.get(file_info["path"]) == file_info["sha"]:
+                        skipped.append(file_info["path"])
+                        continue
+                    yield file_info
+            
+            def on_batch(batch_stats: Dict[str, Any]):
+                self._track_batch(batch_stats)
+                if batch_stats.get("success"):
+                    progress["files_written"] += batch_stats["written"]
+                    progress["batches_committed"] += 1
+                progress["files_skipped"] = len(skipped)
+                elapsed = max(time.perf_counter() - start_time, 1e-6)
+                progress["bytes_per_sec"] = round(progress["bytes_scanned"] / elapsed)
+                if on_progress:
+                    on_progress(dict(progress, last_batch=batch_stats["index"]))
+            
             # Create repository node
             self.neo4j_service.create_repo(repo_id, {
-                "created": "datetime()",
-                "file_count": len(files)
+                "created": "datetime()"
             })
             
-            # Create file nodes
-            success_count = 0
-            for file_info in files:
-                result = self.neo4j_service.create_file(
-                    repo_id=repo_id,
-                    path=file_info["path"],
-                    lang=file_info["lang"],
-                    size=file_info["size"],
-                    content=file_info.get("content"),
-                    sha=file_info.get("sha")
-                )
-                
-                if result.get("success"):
-                    success_count += 1
+            # Create file nodes in batches over a single session
+            result = self.neo4j_service.create_files_batch(
+                repo_id=repo_id,
+                files=changed_files(),
+                batch_size=batch_size,
+                on_batch=on_batch
+            )
+            
+            if not result.get("success"):
+                return result
             
-            logger.info(f"Ingested {success_count}/{len(files)} files for repo {repo_id}")
+            # Files that were ingested before but no longer exist
+            files_deleted = 0
+            if delete_missing:
+                missing = [path for path in existing if path not in seen_paths]
+                if repo_path is not None:
+                    missing = self._deletable_paths(missing, repo_path, include_globs, exclude_globs)
+                if missing:
+                    delete_result = self.neo4j_service.delete_files(repo_id, missing, batch_size)
+                    if delete_result.get("success"):
+                        files_deleted = len(missing)
+            
+            success_count = result["files_processed"]
+            total_files = len(seen_paths)
+            if not partial:
+                self.neo4j_service.create_repo(repo_id, {"file_count": total_files})
+            logger.info(
+                f"Ingested {success_count}/{total_files} files for repo {repo_id} "
+                f"in {len(result['batches'])} batches "
+                f"(skipped {len(skipped)} unchanged, deleted {files_deleted})"
+            )
             
             return {
                 "success": True,
                 "files_processed": success_count,
-                "total_files": len(files)
+                "files_skipped": len(skipped),
+                "files_deleted": files_deleted,
+                "total_files": total_files,
+                "bytes_scanned": progress["bytes_scanned"],
+                "duration_seconds": round(time.perf_counter() - start_time, 3),
+                "batches": result["batches"],
+                "failed_batches": result["failed_batches"]
             }
         except Exception as e:
             logger.error(f"Failed to ingest files: {e}")
@@ -157,6 +369,265 @@ class CodeIngestor:
                 "success": False,
                 "error": str(e)
             }
+        finally:
+            # Cached search results of this repo may now be stale
+            query_cache.bump_generation(repo_id)
+    
+    def _deletable_paths(
+        self,
+        paths: List[str],
+        repo_path: str,
+        include_globs: Optional[List[str]],
+        exclude_globs: Optional[List[str]]
+    ) -> List[str]:
+        """Paths the scan covers (matching include, not exclude) that no longer exist on disk"""
+        include = self._compile_globs(include_globs if include_globs is not None else self.DEFAULT_INCLUDE_GLOBS)
+        exclude = self._compile_globs(exclude_globs if exclude_globs is not None else self.DEFAULT_EXCLUDE_GLOBS)
+        return [
+            path for path in paths
+            if include and include.match(path)
+            and not (exclude and (exclude.match(path) or self._has_excluded_parent(path, exclude)))
+            and not os.path.exists(os.path.join(repo_path, path))
+        ]
+    
+    def ingest_changes(
+        self,
+        repo_id: str,
+        repo_path: str,
+        changed_files: List[Dict[str, Any]],
+        include_globs: List[str],
+        exclude_globs: List[str],
+        batch_size: Optional[int] = None,
+        skip_unchanged: bool = False,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Apply a git change set (from GitUtils.get_changed_files) to the graph.
+        
+        Deleted paths are removed, renamed paths are moved in place so their
+        relationships survive, and only added/modified/renamed paths are read
+        and hashed - the rest of the repository is never scanned.
+        """
+        deleted = []
+        renames = []
+        upserts = []
+        for change in changed_files:
+            status = change.get("status", "")
+            if status == "D":
+                deleted.append(change["path"])
+                continue
+            if status == "R" and change.get("old_path"):
+                renames.append({"old_path": change["old_path"], "path": change["path"]})
+            upserts.append(change["path"])
+        
+        files_deleted = 0
+        if deleted:
+            delete_result = self.neo4j_service.delete_files(repo_id, deleted, batch_size)
+            if delete_result.get("success"):
+                files_deleted = len(deleted)
+        
+        files_renamed = 0
+        if renames:
+            rename_result = self.neo4j_service.rename_files(repo_id, renames)
+            files_renamed = rename_result.get("renamed", 0)
+            # Renamed files whose old node could not be moved keep a stale node
+            self.neo4j_service.delete_files(repo_id, [r["old_path"] for r in renames], batch_size)
+        
+        result = self.ingest_files(
+            repo_id=repo_id,
+            files=self.iter_paths(repo_path, upserts, include_globs, exclude_globs),
+            batch_size=batch_size,
+            skip_unchanged=skip_unchanged,
+            partial=True,
+            on_progress=on_progress
+        )
+        if result.get("success"):
+            result["files_deleted"] = files_deleted
+            result["files_renamed"] = files_renamed
+        return result
+    
+    def ingest_repository(
+        self,
+        repo_url: Optional[str] = None,
+        local_path: Optional[str] = None,
+        branch: Optional[str] = "main",
+        mode: str = "full",
+        include_globs: Optional[List[str]] = None,
+        exclude_globs: Optional[List[str]] = None,
+        since_commit: Optional[str] = None,
+        force: bool = False,
+        resume: bool = False,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Clone (if needed), scan and ingest a repository end to end (synchronous).
+        
+        Full mode streams the whole tree, skipping files whose content hash is
+        unchanged and pruning files that no longer exist. Incremental mode
+        applies the git change set since `since_commit` or since the commit
+        recorded on the Repo node by the previous run.
+        
+        With `resume=True` (a restarted job) unchanged files are always skipped,
+        so batches committed before the interruption are not written again.
+        """
+        include_globs = include_globs if include_globs is not None else self.DEFAULT_INCLUDE_GLOBS
+        exclude_globs = exclude_globs if exclude_globs is not None else self.DEFAULT_EXCLUDE_GLOBS
+        
+        # Determine repository path and ID
+        cleanup_needed = False
+        if local_path:
+            repo_path = local_path
+            repo_id = git_utils.get_repo_id_from_path(repo_path)
+        else:
+            logger.info(f"Cloning repository: {repo_url}")
+            clone_result = git_utils.clone_repo(repo_url, branch=branch)
+            if not clone_result.get("success"):
+                return {
+                    "success": False,
+                    "status": "error",
+                    "error": clone_result.get("error", "Failed to clone repository"),
+                    "mode": mode
+                }
+            repo_path = clone_result["path"]
+            repo_id = git_utils.get_repo_id_from_url(repo_url)
+            cleanup_needed = True
+        
+        logger.info(f"Processing repository: {repo_id} at {repo_path} (mode={mode}, resume={resume})")
+        
+        try:
+            head_commit = git_utils.get_last_commit_hash(repo_path)
+            changed_files_count = None
+            result = None
+            
+            if mode == "incremental":
+                changed_result = None
+                if not git_utils.is_git_repo(repo_path):
+                    logger.warning(f"Incremental mode requested but {repo_path} is not a git repo, falling back to full mode")
+                else:
+                    # Diff from the caller's commit or from the last ingested one
+                    since_commit = since_commit or self.neo4j_service.get_repo_last_commit(repo_id)
+                    if not since_commit:
+                        # Without a base commit the diff would only cover uncommitted changes
+                        logger.info(f"No previous commit recorded for {repo_id}, falling back to full mode")
+                    else:
+                        changed_result = git_utils.get_changed_files(
+                            repo_path=repo_path,
+                            since_commit=since_commit,
+                            include_untracked=True
+                        )
+                        if not changed_result.get("success"):
+                            logger.warning(f"Failed to get changed files: {changed_result.get('error')}, falling back to full mode")
+                            changed_result = None
+                
+                if changed_result is None:
+                    mode = "full"
+                else:
+                    changed_files = changed_result.get("changed_files", [])
+                    changed_files_count = len(changed_files)
+                    
+                    if changed_files_count == 0:
+                        logger.info("No files changed, skipping ingestion")
+                        result = {"success": True, "files_processed": 0}
+                    else:
+                        logger.info(f"Found {changed_files_count} changed files since {since_commit}")
+                        # Apply deletes/renames and read only the changed paths
+                        result = self.ingest_changes(
+                            repo_id=repo_id,
+                            repo_path=repo_path,
+                            changed_files=changed_files,
+                            include_globs=include_globs,
+                            exclude_globs=exclude_globs,
+                            skip_unchanged=resume,
+                            on_progress=on_progress
+                        )
+            
+            if mode == "full":
+                # Stream all files so Neo4j writes start while the scan is still running.
+                # An empty scan still runs, so files that are all gone get pruned.
+                result = self.ingest_files(
+                    repo_id=repo_id,
+                    files=self.iter_files(repo_path, include_globs, exclude_globs),
+                    skip_unchanged=resume or not force,
+                    delete_missing=True,
+                    on_progress=on_progress,
+                    repo_path=repo_path,
+                    include_globs=include_globs,
+                    exclude_globs=exclude_globs
+                )
+            
+            if not result.get("success"):
+                return {
+                    "success": False,
+                    "status": "error",
+                    "repo_id": repo_id,
+                    "error": result.get("error", "Failed to ingest files"),
+                    "mode": mode
+                }
+            
+            # Remember the ingested commit so the next incremental run can diff from it.
+            # Files of a failed batch are not in any later diff, so a partial run keeps
+            # the previous commit and the next incremental run covers them again.
+            failed_batches = result.get("failed_batches") or []
+            if failed_batches:
+                logger.warning(
+                    f"{len(failed_batches)} batches failed for {repo_id}, "
+                    f"keeping the previous last_commit so they are retried"
+                )
+            elif head_commit:
+                self.neo4j_service.create_repo(repo_id, {"last_commit": head_commit})
+            
+            # Precompute importance scores used by search ranking and impact analysis;
+            # a run that wrote, deleted or renamed nothing leaves the scores valid
+            graph_changed = any(
+                result.get(key) for key in ("files_processed", "files_deleted", "files_renamed")
+            )
+            if settings.centrality_enabled and graph_changed:
+                centrality = self.neo4j_service.update_centrality(repo_id)
+                if not centrality.get("success"):
+                    logger.warning(f"Centrality update failed for {repo_id}: {centrality.get('error')}")
+            
+            # Load the in-memory graph now, so neighbourhood, degree and path
+            # queries are answered from it from the first request on
+            self.neo4j_service.get_snapshot(repo_id)
+            
+            if mode == "incremental" and changed_files_count == 0:
+                message = "No files changed since last ingestion"
+            elif mode == "full" and result["total_files"] == 0:
+                message = "No files found matching the specified patterns"
+                logger.warning(message)
+                if result["files_deleted"]:
+                    message += f" ({result['files_deleted']} deleted)"
+            else:
+                message = f"Successfully ingested {result['files_processed']} files"
+                if mode == "incremental":
+                    message += f" (out of {changed_files_count} changed"
+                    message += f", {result.get('files_deleted', 0)} deleted, {result.get('files_renamed', 0)} renamed)"
+                elif result.get("files_skipped") or result.get("files_deleted"):
+                    message += f" ({result['files_skipped']} unchanged skipped, {result['files_deleted']} deleted)"
+            
+            if failed_batches:
+                message += f"; {len(failed_batches)} batches failed and will be retried"
+            
+            return {
+                **result,
+                "status": "partial" if failed_batches else "done",
+                "repo_id": repo_id,
+                "message": message,
+                "mode": mode,
+                "changed_files_count": changed_files_count,
+                "last_commit": None if failed_batches else head_commit
+            }
+        finally:
+            if cleanup_needed:
+                git_utils.cleanup_temp_repo(repo_path)
+    
+    @staticmethod
+    def _track_batch(batch_stats: Dict[str, Any]):
+        """Record per-batch write timings"""
+        metrics_service.track_ingestion_batch(
+            status="success" if batch_stats.get("success") else "error",
+            duration=batch_stats["duration_ms"] / 1000
+        )
 
 
 # Global instance
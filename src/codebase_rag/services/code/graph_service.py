@@ -1,9 +1,23 @@
-from neo4j import GraphDatabase, basic_auth
-from typing import List, Dict, Optional, Any, Union
+from neo4j import GraphDatabase, Query, basic_auth, READ_ACCESS, WRITE_ACCESS
+from typing import List, Dict, Optional, Any, Union, Iterable, Iterator, AsyncIterator, Callable
 from pydantic import BaseModel
 from loguru import logger
 from codebase_rag.config import settings
+from codebase_rag.services.utils.metrics import metrics_service
+from codebase_rag.services.utils.ranker import Ranker
+from codebase_rag.services.utils.query_cache import query_cache
+from codebase_rag.services.utils.cypher_stream import (
+    iter_records, encode_cursor, decode_cursor, encode_keyset_cursor, decode_keyset_cursor
+)
+from codebase_rag.services.code.blob_store import BlobStore, get_blob_store
+from codebase_rag.services.code.graph_snapshot import GraphSnapshot, FILE, SYMBOL
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import asyncio
+import threading
 import json
+import re
+import time
 
 class GraphNode(BaseModel):
     """graph node model"""
@@ -18,6 +32,9 @@ class GraphRelationship(BaseModel):
     end_node: str
     type: str
     properties: Dict[str, Any] = {}
+    # endpoint labels, lets writes seek the id constraint instead of scanning
+    start_label: Optional[str] = None
+    end_label: Optional[str] = None
 
 class GraphQueryResult(BaseModel):
     """graph query result model"""
@@ -32,19 +49,25 @@ class Neo4jGraphService:
     def __init__(self):
         self.driver = None
         self._connected = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._running = 0
+        self._waiting = 0
+        self._snapshots: Dict[str, GraphSnapshot] = {}
+        self._snapshot_lock = threading.Lock()
     
     async def connect(self) -> bool:
         """connect to Neo4j database"""
         try:
             self.driver = GraphDatabase.driver(
                 settings.neo4j_uri,
-                auth=basic_auth(settings.neo4j_username, settings.neo4j_password)
+                auth=basic_auth(settings.neo4j_username, settings.neo4j_password),
+                max_connection_pool_size=settings.neo4j_max_connection_pool_size,
+                connection_acquisition_timeout=settings.neo4j_connection_acquisition_timeout
             )
             
             # test connection
-            with self.driver.session(database=settings.neo4j_database) as session:
-                result = session.run("RETURN 1 as test")
-                result.single()
+            await self._run("connect", self._verify_connectivity)
             
             self._connected = True
             logger.info(f"Successfully connected to Neo4j at {settings.neo4j_uri}")
@@ -57,10 +80,66 @@ class Neo4jGraphService:
             logger.error(f"Failed to connect to Neo4j: {e}")
             return False
     
+    def _verify_connectivity(self):
+        """run a trivial query to make sure the database is reachable"""
+        with self._session() as session:
+            session.run("RETURN 1 as test").single()
+    
+    def _session(self, fetch_size: Optional[int] = None, read_only: bool = False):
+        """open a session on the configured database"""
+        return self.driver.session(
+            database=settings.neo4j_database,
+            fetch_size=fetch_size or settings.neo4j_fetch_size,
+            default_access_mode=READ_ACCESS if read_only else WRITE_ACCESS
+        )
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """worker pool for blocking driver calls, one thread per pooled connection"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.neo4j_max_connection_pool_size,
+                thread_name_prefix="neo4j"
+            )
+        return self._executor
+    
+    def _update_pool(self, running: int = 0, waiting: int = 0):
+        with self._pool_lock:
+            self._running += running
+            self._waiting += waiting
+            metrics_service.update_neo4j_pool(self._running, self._waiting, settings.neo4j_max_connection_pool_size)
+    
+    async def _run(self, operation: str, fn: Callable, *args, **kwargs):
+        """
+        Run a blocking driver call on the bounded graph query pool so it never
+        blocks the event loop. Queries beyond the pool size wait for a worker
+        instead of piling up on the driver's connection acquisition.
+        """
+        def call():
+            self._update_pool(running=1, waiting=-1)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._update_pool(running=-1)
+        
+        self._update_pool(waiting=1)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), call)
+            status = "success"
+            return result
+        finally:
+            metrics_service.track_graph_query(operation, status)
+            metrics_service.track_graph_duration(operation, time.perf_counter() - start)
+    
     async def _setup_schema(self):
         """set database schema, indexes and constraints"""
+        await self._run("setup_schema", self._setup_schema_sync)
+    
+    def _setup_schema_sync(self):
+        """create constraints and indexes (synchronous)"""
         try:
-            with self.driver.session(database=settings.neo4j_database) as session:
+            with self._session() as session:
                 # Create unique constraints
                 constraints = [
                     # Repo: unique by id
@@ -77,6 +156,14 @@ class Neo4jGraphService:
                     "CREATE CONSTRAINT function_id IF NOT EXISTS FOR (n:Function) REQUIRE n.id IS UNIQUE",
                     "CREATE CONSTRAINT class_id IF NOT EXISTS FOR (n:Class) REQUIRE n.id IS UNIQUE",
                     "CREATE CONSTRAINT table_id IF NOT EXISTS FOR (n:Table) REQUIRE n.id IS UNIQUE",
+
+                    # Knowledge pipeline chunks (see pipeline.storers), merged on id
+                    "CREATE CONSTRAINT text_chunk_id IF NOT EXISTS FOR (n:TextChunk) REQUIRE n.id IS UNIQUE",
+                    "CREATE CONSTRAINT module_id IF NOT EXISTS FOR (n:Module) REQUIRE n.id IS UNIQUE",
+                    "CREATE CONSTRAINT schema_id IF NOT EXISTS FOR (n:Schema) REQUIRE n.id IS UNIQUE",
+                    "CREATE CONSTRAINT endpoint_id IF NOT EXISTS FOR (n:Endpoint) REQUIRE n.id IS UNIQUE",
+                    "CREATE CONSTRAINT section_id IF NOT EXISTS FOR (n:Section) REQUIRE n.id IS UNIQUE",
+                    "CREATE CONSTRAINT chunk_id IF NOT EXISTS FOR (n:Chunk) REQUIRE n.id IS UNIQUE",
                 ]
 
                 for constraint in constraints:
@@ -94,6 +181,15 @@ class Neo4jGraphService:
                     if "already exists" not in str(e).lower() and "equivalent" not in str(e).lower():
                         logger.warning(f"Failed to create fulltext index: {e}")
 
+                # Separate BM25 index over file bodies, so identifiers inside files are searchable
+                # without diluting path matches. Lucene keeps it in sync as File nodes change.
+                try:
+                    session.run("CREATE FULLTEXT INDEX file_content IF NOT EXISTS FOR (f:File) ON EACH [f.content]")
+                    logger.info("Fulltext index 'file_content' created/verified")
+                except Exception as e:
+                    if "already exists" not in str(e).lower() and "equivalent" not in str(e).lower():
+                        logger.warning(f"Failed to create content fulltext index: {e}")
+
                 # Create regular indexes for exact lookups
                 indexes = [
                     "CREATE INDEX file_path IF NOT EXISTS FOR (f:File) ON (f.path)",
@@ -122,8 +218,11 @@ class Neo4jGraphService:
         if not self._connected:
             raise Exception("Not connected to Neo4j")
         
+        return await self._run("create_node", self._create_node_sync, node)
+    
+    def _create_node_sync(self, node: GraphNode) -> Dict[str, Any]:
         try:
-            with self.driver.session(database=settings.neo4j_database) as session:
+            with self._session() as session:
                 # build Cypher query to create node
                 labels_str = ":".join(node.labels)
                 query = f"""
@@ -157,11 +256,16 @@ class Neo4jGraphService:
         if not self._connected:
             raise Exception("Not connected to Neo4j")
         
+        return await self._run("create_relationship", self._create_relationship_sync, relationship)
+    
+    def _create_relationship_sync(self, relationship: GraphRelationship) -> Dict[str, Any]:
         try:
-            with self.driver.session(database=settings.neo4j_database) as session:
+            with self._session() as session:
+                start = self._node_pattern("a", relationship.start_label, "$start_node")
+                end = self._node_pattern("b", relationship.end_label, "$end_node")
                 query = f"""
-                MATCH (a {{id: $start_node}}), (b {{id: $end_node}})
-                CREATE (a)-[r:{relationship.type}]->(b)
+                MATCH {start}, {end}
+                CREATE (a)-[r:{self._cypher_name(relationship.type)}]->(b)
                 SET r += $properties
                 RETURN r
                 """
@@ -188,15 +292,21 @@ class Neo4jGraphService:
                 "error": str(e)
             }
     
-    async def execute_cypher(self, query: str, parameters: Dict[str, Any] = None) -> GraphQueryResult:
-        """execute Cypher query"""
+    async def execute_cypher(
+        self,
+        query: str,
+        parameters: Dict[str, Any] = None,
+        raw_only: bool = False
+    ) -> GraphQueryResult:
+        """execute Cypher query; raw_only skips building node/relationship models"""
         if not self._connected:
             raise Exception("Not connected to Neo4j")
         
-        parameters = parameters or {}
-        
+        return await self._run("cypher", self._execute_cypher_sync, query, parameters or {}, raw_only)
+    
+    def _execute_cypher_sync(self, query: str, parameters: Dict[str, Any], raw_only: bool = False) -> GraphQueryResult:
         try:
-            with self.driver.session(database=settings.neo4j_database) as session:
+            with self._session() as session:
                 result = session.run(query, parameters)
                 
                 # process result
@@ -207,6 +317,8 @@ class Neo4jGraphService:
                 
                 for record in result:
                     raw_results.append(dict(record))
+                    if raw_only:
+                        continue
                     
                     # extract nodes
                     for key, value in record.items():
@@ -245,6 +357,172 @@ class Neo4jGraphService:
             logger.error(f"Failed to execute Cypher query: {e}")
             return GraphQueryResult(raw_result={"error": str(e)})
     
+    def iter_cypher(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        fetch_size: Optional[int] = None,
+        read_only: bool = False,
+        timeout: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream query results as plain dict rows. Records are pulled from the
+        server `fetch_size` at a time while the caller iterates, so memory
+        stays flat regardless of the result size. With `timeout` the server
+        aborts the transaction after that many seconds.
+        """
+        if not self._connected:
+            raise Exception("Not connected to Neo4j")
+
+        if timeout is not None:
+            query = Query(query, timeout=timeout)
+        with self._session(fetch_size=fetch_size, read_only=read_only) as session:
+            yield from iter_records(session, query, parameters)
+
+    async def stream_cypher(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        fetch_size: Optional[int] = None,
+        read_only: bool = False,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        iter_cypher for async consumers. The query runs on the bounded graph
+        query pool and holds its worker until the stream ends, so streams count
+        against the same concurrency limit as every other query. At most
+        `fetch_size` rows wait for the consumer; a slow consumer holds back
+        fetching, and one that stops iterating ends the query.
+        """
+        loop = asyncio.get_running_loop()
+        rows: asyncio.Queue = asyncio.Queue()
+        credit = threading.Semaphore(fetch_size or settings.neo4j_fetch_size)
+        stopped = threading.Event()
+        end = object()
+
+        def produce():
+            try:
+                for row in self.iter_cypher(query, parameters, fetch_size, read_only, timeout):
+                    while not credit.acquire(timeout=0.5):
+                        if stopped.is_set():
+                            return
+                    if stopped.is_set():
+                        return
+                    loop.call_soon_threadsafe(rows.put_nowait, row)
+            finally:
+                if not stopped.is_set():
+                    loop.call_soon_threadsafe(rows.put_nowait, end)
+
+        producer = asyncio.ensure_future(self._run("cypher_stream", produce))
+        try:
+            while True:
+                row = await rows.get()
+                if row is end:
+                    break
+                credit.release()
+                yield row
+            await producer  # raises if the query failed
+        finally:
+            stopped.set()
+
+    _RETURN = re.compile(r"\bRETURN\b", re.IGNORECASE)
+    _ORDER_BY = re.compile(r"\bORDER\s+BY\b", re.IGNORECASE)
+    _SKIP_OR_LIMIT = re.compile(r"\b(SKIP|OFFSET|LIMIT)\b", re.IGNORECASE)
+    _UNION = re.compile(r"\bUNION\b", re.IGNORECASE)
+
+    def execute_cypher_page(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        page_size: int = 100,
+        cursor: Optional[str] = None,
+        read_only: bool = True,
+        order_by: Optional[List[str]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        One page of query results as plain dict rows; `next_cursor` is None on
+        the last page. Neo4j has no stable row order of its own, so paging needs
+        one of:
+
+        - `order_by`: returned columns holding a unique scalar key. Pages are
+          keyset-paged on it, so each page only produces rows after the
+          previous one instead of skipping over them.
+        - a query ending with `RETURN ... ORDER BY ...`, which is paged with
+          SKIP/LIMIT. An ORDER BY on an earlier WITH does not fix the order of
+          the returned rows, and neither does one on a UNION branch.
+
+        Raises ValueError when neither is given, or on a cursor that does not
+        belong to this query. `timeout` bounds each page as in iter_cypher.
+        """
+        if order_by:
+            return self._execute_keyset_page(query, parameters, page_size, cursor, read_only, order_by, timeout)
+
+        returns = list(self._RETURN.finditer(query))
+        order = self._ORDER_BY.search(query, returns[-1].end()) if returns else None
+        if not order or "}" in query[order.end():] or self._UNION.search(query):
+            raise ValueError(
+                "Paged queries need a stable order: end the query with RETURN ... ORDER BY or pass order_by"
+            )
+        if self._SKIP_OR_LIMIT.search(query, order.end()):
+            raise ValueError("Paged queries must not end with SKIP/LIMIT, paging adds them")
+
+        offset = decode_cursor(cursor, query, parameters)
+        paged_query = f"{query.rstrip().rstrip(';')}\nSKIP $__skip LIMIT $__limit"
+        rows = list(self.iter_cypher(
+            paged_query,
+            {**(parameters or {}), "__skip": offset, "__limit": page_size + 1},
+            fetch_size=page_size + 1,
+            read_only=read_only,
+            timeout=timeout
+        ))
+
+        has_more = len(rows) > page_size
+        return {
+            "rows": rows[:page_size],
+            "next_cursor": encode_cursor(query, parameters, offset + page_size) if has_more else None
+        }
+
+    def _execute_keyset_page(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]],
+        page_size: int,
+        cursor: Optional[str],
+        read_only: bool,
+        order_by: List[str],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        digest_params = {**(parameters or {}), "__order_by": list(order_by)}
+        after = decode_keyset_cursor(cursor, query, digest_params)
+        columns = ", ".join(self._cypher_name(column) for column in order_by)
+        paged_query = (
+            f"CALL {{\n{query}\n}}\n"
+            f"WITH * WHERE $__after IS NULL OR [{columns}] > $__after\n"
+            f"RETURN * ORDER BY {columns} LIMIT $__limit"
+        )
+        rows = list(self.iter_cypher(
+            paged_query,
+            {**(parameters or {}), "__after": after, "__limit": page_size + 1},
+            fetch_size=page_size + 1,
+            read_only=read_only,
+            timeout=timeout
+        ))
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = None
+        if has_more:
+            last = [rows[-1].get(column) for column in order_by]
+            if any(isinstance(value, (dict, list)) for value in last):
+                raise ValueError("order_by columns must hold scalar values")
+            next_cursor = encode_keyset_cursor(query, digest_params, last)
+        return {"rows": rows, "next_cursor": next_cursor}
+
+    async def execute_cypher_page_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """Async wrapper for execute_cypher_page"""
+        return await self._run("cypher", self.execute_cypher_page, *args, **kwargs)
+
     async def find_nodes_by_label(self, label: str, limit: int = 100) -> List[GraphNode]:
         """find nodes by label"""
         query = f"MATCH (n:{label}) RETURN n LIMIT {limit}"
@@ -257,21 +535,77 @@ class Neo4jGraphService:
         result = await self.execute_cypher(query)
         return result.relationships
     
+    # Repository symbols are answered from the graph snapshot when one is loaded.
+    # With snapshots enabled, the Neo4j fallback keeps to the same subgraph - File
+    # nodes of the symbol's repository and Symbols defined in them - so both return
+    # the same result. With snapshots disabled the queries cover the whole graph.
+    _SNAPSHOT_SCOPE_PREFIX = """
+        OPTIONAL MATCH (start)-[:DEFINED_IN]->(home:File) WHERE start:Symbol
+        WITH start, head(collect(home.repoId)) AS repo
+    """
+
+    @staticmethod
+    def _snapshot_scope(var: str) -> str:
+        return (
+            f"(repo IS NULL OR ({var}:File AND {var}.repoId = repo) OR "
+            f"({var}:Symbol AND EXISTS {{ ({var})-[:DEFINED_IN]->(:File {{repoId: repo}}) }}))"
+        )
+
     async def find_connected_nodes(self, node_id: str, depth: int = 1) -> GraphQueryResult:
         """find connected nodes"""
-        query = f"""
-        MATCH (start {{id: $node_id}})-[*1..{depth}]-(connected)
-        RETURN start, connected, relationships()
-        """
+        found = self._find_in_snapshots(node_id)
+        if found:
+            snapshot, node = found
+            connected = snapshot.connected(node, depth)
+            return GraphQueryResult(
+                nodes=[GraphNode(**snapshot.to_node(n)) for n in [node] + connected],
+                raw_result=[{"start": snapshot.keys[node], "connected": snapshot.keys[n]} for n in connected]
+            )
+
+        if settings.graph_snapshot_enabled:
+            query = f"""
+            MATCH (start {{id: $node_id}})
+            {self._SNAPSHOT_SCOPE_PREFIX}
+            MATCH path = (start)-[*1..{int(depth)}]-(connected)
+            WHERE all(m IN nodes(path) WHERE {self._snapshot_scope('m')})
+            RETURN start, connected, relationships(path)
+            """
+        else:
+            query = f"""
+            MATCH path = (start {{id: $node_id}})-[*1..{int(depth)}]-(connected)
+            RETURN start, connected, relationships(path)
+            """
         return await self.execute_cypher(query, {"node_id": node_id})
     
     async def find_shortest_path(self, start_id: str, end_id: str) -> GraphQueryResult:
         """find shortest path"""
-        query = """
-        MATCH (start {id: $start_id}), (end {id: $end_id})
-        MATCH path = shortestPath((start)-[*]-(end))
-        RETURN path
-        """
+        found_start = self._find_in_snapshots(start_id)
+        found_end = self._find_in_snapshots(end_id)
+        if found_start and found_end and found_start[0] is found_end[0]:
+            snapshot = found_start[0]
+            path = snapshot.shortest_path(found_start[1], found_end[1])
+            if path is not None:
+                return GraphQueryResult(paths=[{
+                    "nodes": [snapshot.to_node(n)["properties"] for n in path],
+                    "relationships": [{"type": snapshot.edge_type(a, b)} for a, b in zip(path, path[1:])],
+                    "length": len(path) - 1
+                }])
+
+        if settings.graph_snapshot_enabled:
+            query = f"""
+            MATCH (start {{id: $start_id}})
+            {self._SNAPSHOT_SCOPE_PREFIX}
+            MATCH (end {{id: $end_id}})
+            MATCH path = shortestPath((start)-[*]-(end))
+            WHERE all(m IN nodes(path) WHERE {self._snapshot_scope('m')})
+            RETURN path
+            """
+        else:
+            query = """
+            MATCH (start {id: $start_id}), (end {id: $end_id})
+            MATCH path = shortestPath((start)-[*]-(end))
+            RETURN path
+            """
         return await self.execute_cypher(query, {
             "start_id": start_id,
             "end_id": end_id
@@ -279,13 +613,28 @@ class Neo4jGraphService:
     
     async def get_node_degree(self, node_id: str) -> Dict[str, int]:
         """get node degree"""
-        query = """
-        MATCH (n {id: $node_id})
-        OPTIONAL MATCH (n)-[out_rel]->()
-        OPTIONAL MATCH (n)<-[in_rel]-()
-        RETURN count(DISTINCT out_rel) as out_degree, 
-               count(DISTINCT in_rel) as in_degree
-        """
+        found = self._find_in_snapshots(node_id)
+        if found:
+            snapshot, node = found
+            return snapshot.degree(node)
+
+        if settings.graph_snapshot_enabled:
+            query = f"""
+            MATCH (start {{id: $node_id}})
+            {self._SNAPSHOT_SCOPE_PREFIX}
+            OPTIONAL MATCH (start)-[out_rel]->(out_node) WHERE {self._snapshot_scope('out_node')}
+            WITH start, repo, count(DISTINCT out_rel) as out_degree
+            OPTIONAL MATCH (start)<-[in_rel]-(in_node) WHERE {self._snapshot_scope('in_node')}
+            RETURN out_degree, count(DISTINCT in_rel) as in_degree
+            """
+        else:
+            query = """
+            MATCH (n {id: $node_id})
+            OPTIONAL MATCH (n)-[out_rel]->()
+            OPTIONAL MATCH (n)<-[in_rel]-()
+            RETURN count(DISTINCT out_rel) as out_degree,
+                   count(DISTINCT in_rel) as in_degree
+            """
         result = await self.execute_cypher(query, {"node_id": node_id})
         
         if result.raw_result and len(result.raw_result) > 0:
@@ -297,13 +646,55 @@ class Neo4jGraphService:
             }
         return {"out_degree": 0, "in_degree": 0, "total_degree": 0}
     
+    def get_snapshot(self, repo_id: str) -> Optional[GraphSnapshot]:
+        """
+        In-memory graph snapshot of a repository, or None to query Neo4j.
+        Snapshots are tagged with the repository's query cache generation, which
+        CodeIngestor bumps after every ingestion, and rebuilt when it changes.
+        """
+        if not settings.graph_snapshot_enabled or not self._connected:
+            return None
+
+        generation = query_cache.generation(repo_id)
+        snapshot = self._snapshots.get(repo_id)
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+
+        with self._snapshot_lock:
+            snapshot = self._snapshots.get(repo_id)
+            if snapshot is not None and snapshot.generation == generation:
+                return snapshot
+            try:
+                with self._session() as session:
+                    snapshot = GraphSnapshot.load(session, repo_id, generation)
+            except Exception as e:
+                logger.warning(f"Failed to build graph snapshot for {repo_id}, using Neo4j: {e}")
+                return None
+            self._snapshots[repo_id] = snapshot
+            return snapshot
+
+    def _find_in_snapshots(self, node_id: str) -> Optional[tuple]:
+        """(snapshot, node) of a symbol in an up-to-date snapshot, if any"""
+        if not settings.graph_snapshot_enabled:
+            return None
+        for repo_id, snapshot in list(self._snapshots.items()):
+            if snapshot.generation != query_cache.generation(repo_id):
+                continue
+            node = snapshot.node_id(SYMBOL, node_id)
+            if node is not None:
+                return snapshot, node
+        return None
+
     async def delete_node(self, node_id: str) -> Dict[str, Any]:
         """delete node and its relationships"""
         if not self._connected:
             raise Exception("Not connected to Neo4j")
         
+        return await self._run("delete_node", self._delete_node_sync, node_id)
+    
+    def _delete_node_sync(self, node_id: str) -> Dict[str, Any]:
         try:
-            with self.driver.session(database=settings.neo4j_database) as session:
+            with self._session() as session:
                 query = """
                 MATCH (n {id: $node_id})
                 DETACH DELETE n
@@ -349,61 +740,149 @@ class Neo4jGraphService:
             logger.error(f"Failed to get database stats: {e}")
             return {"error": str(e)}
     
+    # labels with a unique constraint on id, preferred as MERGE anchor
+    _ID_KEYED_LABELS = (
+        "Symbol", "Repo", "CodeEntity", "Function", "Class", "Table",
+        "TextChunk", "Module", "Schema", "Endpoint", "Section", "Chunk"
+    )
+
     async def batch_create_nodes(self, nodes: List[GraphNode]) -> Dict[str, Any]:
         """batch create nodes"""
+        return await self.batch_write(nodes=nodes)
+    
+    async def batch_create_relationships(self, relationships: List[GraphRelationship]) -> Dict[str, Any]:
+        """batch create relationships"""
+        return await self.batch_write(relationships=relationships)
+    
+    async def batch_write(
+        self,
+        nodes: Optional[List[GraphNode]] = None,
+        relationships: Optional[List[GraphRelationship]] = None
+    ) -> Dict[str, Any]:
+        """batch write nodes, then relationships between them"""
         if not self._connected:
             raise Exception("Not connected to Neo4j")
         
-        try:
-            with self.driver.session(database=settings.neo4j_database) as session:
-                # prepare batch data
-                node_data = []
-                for node in nodes:
-                    node_data.append({
-                        "id": node.id,
-                        "labels": node.labels,
-                        "properties": node.properties
-                    })
-                
-                query = """
-                UNWIND $nodes as nodeData
-                CALL apoc.create.node(nodeData.labels, {id: nodeData.id} + nodeData.properties) YIELD node
-                RETURN count(node) as created_count
-                """
-                
-                result = session.run(query, {"nodes": node_data})
-                summary = result.single()
-                
-                return {
-                    "success": True,
-                    "created_count": summary.get("created_count", len(nodes))
-                }
-        except Exception as e:
-            # if APOC is not available, use standard method
-            logger.warning(f"APOC not available, using standard method: {e}")
-            return await self._batch_create_nodes_standard(nodes)
+        return await self._run("batch_write", self._batch_write_sync, nodes or [], relationships or [])
     
-    async def _batch_create_nodes_standard(self, nodes: List[GraphNode]) -> Dict[str, Any]:
-        """use standard method to batch create nodes"""
+    def _batch_write_sync(
+        self,
+        nodes: List[GraphNode],
+        relationships: List[GraphRelationship],
+        batch_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Write nodes grouped by label set and relationships grouped by type and
+        endpoint labels, one parameterized UNWIND transaction per group and batch.
+        Nodes are merged on id under a label with a unique id constraint and
+        relationship endpoints are matched by label and id, so every lookup is
+        an index seek and the cost grows with the batch, not the graph.
+        """
+        batch_size = max(1, batch_size or settings.ingest_batch_size)
+
+        node_groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for node in nodes:
+            node_groups.setdefault(tuple(node.labels), []).append(
+                {"id": node.id, "properties": node.properties}
+            )
+        rel_groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for rel in relationships:
+            rel_groups.setdefault((rel.type, rel.start_label, rel.end_label), []).append(
+                {"start": rel.start_node, "end": rel.end_node, "properties": rel.properties}
+            )
+
         created_count = 0
+        relationships_created = 0
         errors = []
-        
-        for node in nodes:
-            result = await self.create_node(node)
-            if result.get("success"):
-                created_count += 1
-            else:
-                errors.append(result.get("error"))
-        
+        try:
+            with self._session() as session:
+                for labels, rows in node_groups.items():
+                    if not labels:
+                        errors.append(f"{len(rows)} nodes without labels skipped")
+                        continue
+                    query = self._node_batch_query(labels)
+                    for batch in self._iter_batches(rows, batch_size):
+                        try:
+                            created_count += session.execute_write(self._write_batch, query, batch)
+                        except Exception as e:
+                            logger.error(f"Failed to write {len(batch)} {':'.join(labels)} nodes: {e}")
+                            errors.append(str(e))
+
+                for (rel_type, start_label, end_label), rows in rel_groups.items():
+                    if not start_label or not end_label:
+                        logger.warning(
+                            f"{rel_type} relationships without endpoint labels match by id on all nodes"
+                        )
+                    query = self._relationship_batch_query(rel_type, start_label, end_label)
+                    for batch in self._iter_batches(rows, batch_size):
+                        try:
+                            relationships_created += session.execute_write(self._write_batch, query, batch)
+                        except Exception as e:
+                            logger.error(f"Failed to write {len(batch)} {rel_type} relationships: {e}")
+                            errors.append(str(e))
+        except Exception as e:
+            logger.error(f"Batch write failed: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "created_count": created_count,
+                "relationships_created": relationships_created
+            }
+
+        logger.info(f"Batch wrote {created_count} nodes and {relationships_created} relationships")
         return {
-            "success": True,
+            "success": not errors,
             "created_count": created_count,
+            "relationships_created": relationships_created,
             "errors": errors
         }
+
+    @staticmethod
+    def _cypher_name(name: str) -> str:
+        """Backtick-quote a label or relationship type"""
+        return "`" + name.replace("`", "``") + "`"
+
+    @classmethod
+    def _node_pattern(cls, var: str, label: Optional[str], id_param: str) -> str:
+        label_str = f":{cls._cypher_name(label)}" if label else ""
+        return f"({var}{label_str} {{id: {id_param}}})"
+
+    @classmethod
+    def _node_batch_query(cls, labels: tuple) -> str:
+        anchor = next((label for label in labels if label in cls._ID_KEYED_LABELS), labels[0])
+        extra = [label for label in labels if label != anchor]
+        set_labels = f"\n        SET n:{':'.join(cls._cypher_name(label) for label in extra)}" if extra else ""
+        return f"""
+        UNWIND $rows AS row
+        MERGE {cls._node_pattern('n', anchor, 'row.id')}
+        SET n += row.properties{set_labels}
+        RETURN count(n) as written
+        """
+
+    @classmethod
+    def _relationship_batch_query(cls, rel_type: str, start_label: Optional[str], end_label: Optional[str]) -> str:
+        return f"""
+        UNWIND $rows AS row
+        MATCH {cls._node_pattern('a', start_label, 'row.start')}
+        MATCH {cls._node_pattern('b', end_label, 'row.end')}
+        MERGE (a)-[r:{cls._cypher_name(rel_type)}]->(b)
+        SET r += row.properties
+        RETURN count(r) as written
+        """
+
+    @staticmethod
+    def _write_batch(tx, query: str, rows: List[Dict[str, Any]]) -> int:
+        """Run one UNWIND batch inside a managed transaction"""
+        record = tx.run(query, {"rows": rows}).single()
+        return record["written"] if record else 0
     
     async def close(self):
         """close database connection"""
         try:
+            if self._executor:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self._snapshots.clear()
             if self.driver:
                 self.driver.close()
                 self._connected = False
@@ -417,7 +896,7 @@ class Neo4jGraphService:
             return {"success": False, "error": "Not connected to Neo4j"}
         
         try:
-            with self.driver.session(database=settings.neo4j_database) as session:
+            with self._session() as session:
                 query = """
                 MERGE (r:Repo {id: $repo_id})
                 SET r += $metadata
@@ -446,7 +925,7 @@ class Neo4jGraphService:
             return {"success": False, "error": "Not connected to Neo4j"}
         
         try:
-            with self.driver.session(database=settings.neo4j_database) as session:
+            with self._session() as session:
                 query = """
                 MATCH (r:Repo {id: $repo_id})
                 MERGE (f:File {repoId: $repo_id, path: $path})
@@ -471,6 +950,298 @@ class Neo4jGraphService:
             logger.error(f"Failed to create file: {e}")
             return {"success": False, "error": str(e)}
     
+    def create_files_batch(
+        self,
+        repo_id: str,
+        files: Iterable[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        on_batch: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Bulk upsert File nodes with one UNWIND transaction per batch (synchronous).
+
+        All batches share a single session. A failed batch is retried on its own,
+        batches that already committed are never rewritten.
+
+        Args:
+            repo_id: Repository ID (the Repo node must already exist)
+            files: Iterable of file dicts as produced by CodeIngestor.scan_files
+            batch_size: Rows per transaction (default: settings.ingest_batch_size)
+            max_retries: Retries per failed batch (default: settings.ingest_batch_max_retries)
+            on_batch: Optional callback invoked with the stats dict of each batch
+
+        Returns:
+            Dict with success, files_processed, per-batch timings and failed batches
+        """
+        if not self._connected:
+            return {"success": False, "error": "Not connected to Neo4j"}
+
+        batch_size = max(1, batch_size or settings.ingest_batch_size)
+        if max_retries is None:
+            max_retries = settings.ingest_batch_max_retries
+
+        files_processed = 0
+        batches = []
+        failed_batches = []
+
+        try:
+            with self._session() as session:
+                for index, rows in enumerate(self._iter_batches(files, batch_size)):
+                    batch_stats = {"index": index, "size": len(rows), "attempts": 0}
+                    start_time = time.perf_counter()
+
+                    while True:
+                        batch_stats["attempts"] += 1
+                        try:
+                            written = session.execute_write(
+                                self._write_file_batch, repo_id, rows
+                            )
+                            batch_stats["success"] = True
+                            batch_stats["written"] = written
+                            files_processed += written
+                            break
+                        except Exception as e:
+                            if batch_stats["attempts"] > max_retries:
+                                logger.error(
+                                    f"File batch {index} for repo {repo_id} failed after "
+                                    f"{batch_stats['attempts']} attempts: {e}"
+                                )
+                                batch_stats["success"] = False
+                                batch_stats["error"] = str(e)
+                                failed_batches.append(index)
+                                break
+                            logger.warning(f"File batch {index} for repo {repo_id} failed, retrying: {e}")
+                            time.sleep(min(0.5 * 2 ** (batch_stats["attempts"] - 1), 5.0))
+
+                    batch_stats["duration_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+                    batches.append(batch_stats)
+                    logger.debug(
+                        f"File batch {index}: {batch_stats['size']} rows in "
+                        f"{batch_stats['duration_ms']}ms (attempts={batch_stats['attempts']})"
+                    )
+
+                    if on_batch:
+                        on_batch(batch_stats)
+        except Exception as e:
+            logger.error(f"Failed to create files batch: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "files_processed": files_processed,
+                "batches": batches,
+                "failed_batches": failed_batches
+            }
+
+        return {
+            "success": True,
+            "files_processed": files_processed,
+            "batches": batches,
+            "failed_batches": failed_batches
+        }
+
+    @staticmethod
+    def _iter_batches(items: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """Split an iterable into lists of at most batch_size items"""
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    @staticmethod
+    def _write_file_batch(tx, repo_id: str, files: List[Dict[str, Any]]) -> int:
+        """Write one batch of File rows inside a managed transaction"""
+        rows = [
+            {
+                "path": f["path"],
+                "lang": f["lang"],
+                "size": f["size"],
+                "content": f.get("content"),
+                "sha": f.get("sha"),
+                "path_tokens": f.get("path_tokens")
+            }
+            for f in files
+        ]
+        query = """
+        MATCH (r:Repo {id: $repo_id})
+        UNWIND $rows AS row
+        MERGE (f:File {repoId: $repo_id, path: row.path})
+        SET f.lang = row.lang,
+            f.size = row.size,
+            f.content = row.content,
+            f.sha = row.sha,
+            f.pathTokens = row.path_tokens,
+            f.updated = datetime()
+        MERGE (f)-[:IN_REPO]->(r)
+        RETURN count(f) as written
+        """
+        record = tx.run(query, {"repo_id": repo_id, "rows": rows}).single()
+        return record["written"] if record else 0
+
+    def get_file_shas(self, repo_id: str) -> Dict[str, Optional[str]]:
+        """Fetch the {path: sha} map of all File nodes in a repository (synchronous)"""
+        if not self._connected:
+            return {}
+
+        try:
+            with self._session() as session:
+                query = """
+                MATCH (f:File {repoId: $repo_id})
+                RETURN f.path as path, f.sha as sha
+                """
+                result = session.run(query, {"repo_id": repo_id})
+                return {record["path"]: record["sha"] for record in result}
+        except Exception as e:
+            logger.error(f"Failed to fetch file hashes: {e}")
+            return {}
+
+    def delete_files(
+        self,
+        repo_id: str,
+        paths: Iterable[str],
+        batch_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Delete File nodes (and symbols defined in them) by path (synchronous)"""
+        if not self._connected:
+            return {"success": False, "error": "Not connected to Neo4j"}
+
+        batch_size = max(1, batch_size or settings.ingest_batch_size)
+        files_deleted = 0
+
+        try:
+            with self._session() as session:
+                query = """
+                UNWIND $paths AS path
+                MATCH (f:File {repoId: $repo_id, path: path})
+                OPTIONAL MATCH (f)<-[:DEFINED_IN]-(s:Symbol)
+                DETACH DELETE s, f
+                """
+                for batch in self._iter_batches(paths, batch_size):
+                    summary = session.execute_write(
+                        lambda tx, rows: tx.run(query, {"repo_id": repo_id, "paths": rows}).consume(),
+                        batch
+                    )
+                    files_deleted += summary.counters.nodes_deleted
+
+            return {"success": True, "nodes_deleted": files_deleted}
+        except Exception as e:
+            logger.error(f"Failed to delete files: {e}")
+            return {"success": False, "error": str(e), "nodes_deleted": files_deleted}
+
+    def rename_files(self, repo_id: str, renames: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Move File nodes to new paths, keeping their relationships (synchronous).
+
+        Args:
+            repo_id: Repository ID
+            renames: List of {"old_path": ..., "path": ...} dicts
+
+        Renames onto a path that already has a File node are skipped; the caller
+        is expected to upsert the new path afterwards.
+        """
+        if not self._connected:
+            return {"success": False, "error": "Not connected to Neo4j"}
+
+        try:
+            with self._session() as session:
+                query = """
+                UNWIND $renames AS row
+                MATCH (f:File {repoId: $repo_id, path: row.old_path})
+                WHERE NOT EXISTS { MATCH (:File {repoId: $repo_id, path: row.path}) }
+                SET f.path = row.path,
+                    f.pathTokens = row.path_tokens,
+                    f.updated = datetime()
+                RETURN count(f) as renamed
+                """
+                rows = [{**r, "path_tokens": Ranker.tokenize_path(r["path"])} for r in renames]
+                record = session.execute_write(
+                    lambda tx: tx.run(query, {"repo_id": repo_id, "renames": rows}).single()
+                )
+                return {"success": True, "renamed": record["renamed"] if record else 0}
+        except Exception as e:
+            logger.error(f"Failed to rename files: {e}")
+            return {"success": False, "error": str(e)}
+
+    def get_repo_last_commit(self, repo_id: str) -> Optional[str]:
+        """Get the last ingested commit recorded on a Repo node (synchronous)"""
+        if not self._connected:
+            return None
+
+        try:
+            with self._session() as session:
+                record = session.run(
+                    "MATCH (r:Repo {id: $repo_id}) RETURN r.last_commit as last_commit",
+                    {"repo_id": repo_id}
+                ).single()
+                return record["last_commit"] if record else None
+        except Exception as e:
+            logger.error(f"Failed to get last commit for repo {repo_id}: {e}")
+            return None
+
+    def get_file_lines(
+        self,
+        repo_id: str,
+        path: str,
+        start_line: int = 1,
+        end_line: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Read a line range of an ingested file (synchronous).
+        Uses File.content when present, otherwise the blob stored under File.sha.
+        """
+        if not self._connected:
+            return None
+
+        try:
+            with self._session() as session:
+                record = session.run(
+                    "MATCH (f:File {repoId: $repo_id, path: $path}) RETURN f.sha as sha, f.content as content",
+                    {"repo_id": repo_id, "path": path}
+                ).single()
+        except Exception as e:
+            logger.error(f"Failed to get file {path}: {e}")
+            return None
+
+        if record is None:
+            return None
+        if record["content"] is not None:
+            lines = record["content"].splitlines(keepends=True)
+            return "".join(lines[max(start_line, 1) - 1:end_line])
+        if record["sha"]:
+            return (get_blob_store() or BlobStore()).read_lines(record["sha"], start_line, end_line)
+        return None
+
+    async def get_file_lines_async(
+        self,
+        repo_id: str,
+        path: str,
+        start_line: int = 1,
+        end_line: Optional[int] = None
+    ) -> Optional[str]:
+        """Read a file line range on the graph query pool (for async callers)"""
+        return await self._run("file_lines", self.get_file_lines, repo_id, path, start_line, end_line)
+
+    async def fulltext_search_async(
+        self,
+        query_text: str,
+        repo_id: Optional[str] = None,
+        limit: int = 30
+    ) -> List[Dict[str, Any]]:
+        """Fulltext search on the graph query pool (for async callers)"""
+        return await self._run("search", self.fulltext_search, query_text, repo_id, limit)
+
+    async def impact_analysis_async(
+        self,
+        repo_id: str,
+        file_path: str,
+        depth: int = 2,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Impact analysis on the graph query pool (for async callers)"""
+        return await self._run("impact", self.impact_analysis, repo_id, file_path, depth, limit)
+
     def fulltext_search(
         self,
         query_text: str,
@@ -482,18 +1253,29 @@ class Neo4jGraphService:
             return []
 
         try:
-            with self.driver.session(database=settings.neo4j_database) as session:
-                # Use Neo4j fulltext index for efficient search
-                # This provides relevance scoring and fuzzy matching
+            with self._session() as session:
+                # Use Neo4j fulltext indexes for efficient search: path/lang matches
+                # plus BM25-scored content matches, merged per file
                 query = """
-                CALL db.index.fulltext.queryNodes('file_text', $query_text)
-                YIELD node, score
+                CALL {
+                    CALL db.index.fulltext.queryNodes('file_text', $query_text)
+                    YIELD node, score
+                    RETURN node, score as path_score, 0.0 as content_score
+                    UNION ALL
+                    CALL db.index.fulltext.queryNodes('file_content', $query_text)
+                    YIELD node, score
+                    RETURN node, 0.0 as path_score, score as content_score
+                }
+                WITH node, max(path_score) as path_score, max(content_score) as content_score
                 WHERE $repo_id IS NULL OR node.repoId = $repo_id
                 RETURN node.path as path,
                        node.lang as lang,
                        node.size as size,
                        node.repoId as repoId,
-                       score
+                       node.pathTokens as path_tokens,
+                       node.centrality as centrality,
+                       content_score,
+                       path_score + $content_weight * content_score as score
                 ORDER BY score DESC
                 LIMIT $limit
                 """
@@ -501,7 +1283,8 @@ class Neo4jGraphService:
                 result = session.run(query, {
                     "query_text": query_text,
                     "repo_id": repo_id,
-                    "limit": limit
+                    "limit": limit,
+                    "content_weight": settings.content_search_weight
                 })
 
                 return [dict(record) for record in result]
@@ -518,7 +1301,7 @@ class Neo4jGraphService:
     ) -> List[Dict[str, Any]]:
         """Fallback search using CONTAINS when fulltext index is not available"""
         try:
-            with self.driver.session(database=settings.neo4j_database) as session:
+            with self._session() as session:
                 query = """
                 MATCH (f:File)
                 WHERE ($repo_id IS NULL OR f.repoId = $repo_id)
@@ -528,6 +1311,8 @@ class Neo4jGraphService:
                        f.lang as lang,
                        f.size as size,
                        f.repoId as repoId,
+                       f.pathTokens as path_tokens,
+                       f.centrality as centrality,
                        1.0 as score
                 LIMIT $limit
                 """
@@ -543,6 +1328,24 @@ class Neo4jGraphService:
             logger.error(f"Fallback search failed: {e}")
             return []
 
+    # One BFS level: direct callers of the frontier symbols, with their files
+    _IMPACT_CALLERS_QUERY = """
+    MATCH (s:Symbol) WHERE s.id IN $ids
+    MATCH (s)<-[:CALLS]-(caller:Symbol)
+    WITH DISTINCT caller LIMIT $cap
+    OPTIONAL MATCH (caller)-[:DEFINED_IN]->(f:File)
+    RETURN caller.id as id, f.path as path, f.lang as lang, f.repoId as repoId, f.centrality as centrality
+    """
+
+    # One BFS level: direct importers of the frontier files
+    _IMPACT_IMPORTERS_QUERY = """
+    MATCH (t:File {repoId: $repo_id}) WHERE t.path IN $paths
+    MATCH (t)<-[:IMPORTS]-(importer:File)
+    WITH DISTINCT importer LIMIT $cap
+    RETURN importer.path as path, importer.lang as lang, importer.repoId as repoId,
+           importer.centrality as centrality
+    """
+
     def impact_analysis(
         self,
         repo_id: str,
@@ -552,7 +1355,12 @@ class Neo4jGraphService:
     ) -> List[Dict[str, Any]]:
         """
         Analyze the impact of a file by finding reverse dependencies.
-        Returns files/symbols that CALL or IMPORT the specified file.
+        Returns files that CALL symbols of, or IMPORT, the specified file.
+
+        The graph is walked breadth-first, one query per level and relationship,
+        so every dependent is reported at its shortest depth, visited nodes are
+        never expanded twice and each level expands at most
+        `settings.impact_max_nodes_per_level` nodes.
 
         Args:
             repo_id: Repository ID
@@ -566,80 +1374,181 @@ class Neo4jGraphService:
         if not self._connected:
             return []
 
-        try:
-            with self.driver.session(database=settings.neo4j_database) as session:
-                # Find reverse dependencies through CALLS and IMPORTS relationships
-                query = """
-                MATCH (target:File {repoId: $repo_id, path: $file_path})
-
-                // Find symbols defined in the target file
-                OPTIONAL MATCH (target)<-[:DEFINED_IN]-(targetSymbol:Symbol)
-
-                // Find reverse CALLS (who calls symbols in this file)
-                OPTIONAL MATCH (targetSymbol)<-[:CALLS*1..$depth]-(callerSymbol:Symbol)
-                OPTIONAL MATCH (callerSymbol)-[:DEFINED_IN]->(callerFile:File)
-
-                // Find reverse IMPORTS (who imports this file)
-                OPTIONAL MATCH (target)<-[:IMPORTS*1..$depth]-(importerFile:File)
-
-                // Aggregate results
-                WITH target,
-                     collect(DISTINCT {
-                         type: 'file',
-                         path: callerFile.path,
-                         lang: callerFile.lang,
-                         repoId: callerFile.repoId,
-                         relationship: 'CALLS',
-                         depth: length((targetSymbol)<-[:CALLS*1..$depth]-(callerSymbol))
-                     }) as callers,
-                     collect(DISTINCT {
-                         type: 'file',
-                         path: importerFile.path,
-                         lang: importerFile.lang,
-                         repoId: importerFile.repoId,
-                         relationship: 'IMPORTS',
-                         depth: length((target)<-[:IMPORTS*1..$depth]-(importerFile))
-                     }) as importers
-
-                // Combine and score results
-                UNWIND (callers + importers) as impact
-                WITH DISTINCT impact
-                WHERE impact.path IS NOT NULL
-
-                // Score: prefer direct dependencies (depth=1) and CALLS over IMPORTS
-                WITH impact,
-                     CASE
-                         WHEN impact.depth = 1 AND impact.relationship = 'CALLS' THEN 1.0
-                         WHEN impact.depth = 1 AND impact.relationship = 'IMPORTS' THEN 0.9
-                         WHEN impact.depth = 2 AND impact.relationship = 'CALLS' THEN 0.7
-                         WHEN impact.depth = 2 AND impact.relationship = 'IMPORTS' THEN 0.6
-                         ELSE 0.5 / impact.depth
-                     END as score
-
-                RETURN impact.type as type,
-                       impact.path as path,
-                       impact.lang as lang,
-                       impact.repoId as repoId,
-                       impact.relationship as relationship,
-                       impact.depth as depth,
-                       score
-                ORDER BY score DESC, impact.path
-                LIMIT $limit
-                """
+        # Best (shortest, CALLS over IMPORTS) hit per dependent file
+        impacted: Dict[str, Dict[str, Any]] = {}
 
-                result = session.run(query, {
-                    "repo_id": repo_id,
-                    "file_path": file_path,
-                    "depth": depth,
-                    "limit": limit
-                })
+        def record(row: Dict[str, Any], relationship: str, level: int):
+            path = row.get("path")
+            if not path or path == file_path:
+                return
+            score = self._impact_score(relationship, level, row.get("centrality") or 0.0)
+            if path not in impacted or score > impacted[path]["score"]:
+                impacted[path] = {
+                    "type": "file",
+                    "path": path,
+                    "lang": row.get("lang"),
+                    "repoId": row.get("repoId") or repo_id,
+                    "relationship": relationship,
+                    "depth": level,
+                    "score": score
+                }
 
-                return [dict(record) for record in result]
+        cap = settings.impact_max_nodes_per_level
+        snapshot = self.get_snapshot(repo_id)
+        if snapshot is not None:
+            for row, relationship, level in snapshot.impact(file_path, depth, cap):
+                record(row, relationship, level)
+            return sorted(impacted.values(), key=lambda r: (-r["score"], r["path"]))[:limit]
+
+        try:
+            with self._session() as session:
+                for row, relationship, level in self._impact_walk(session, repo_id, file_path, depth, cap):
+                    record(row, relationship, level)
+                return sorted(impacted.values(), key=lambda r: (-r["score"], r["path"]))[:limit]
 
         except Exception as e:
             logger.error(f"Impact analysis failed: {e}")
             # If the query fails (e.g., relationships don't exist yet), return empty
             return []
 
+    def _impact_walk(
+        self,
+        session,
+        repo_id: str,
+        file_path: str,
+        depth: int,
+        cap: int
+    ) -> Iterator[tuple]:
+        """Breadth-first reverse dependency walk in Neo4j, yields (row, relationship, level)"""
+        symbol_frontier = [
+            r["id"] for r in session.run(
+                """
+                MATCH (:File {repoId: $repo_id, path: $file_path})<-[:DEFINED_IN]-(s:Symbol)
+                RETURN s.id as id
+                """,
+                {"repo_id": repo_id, "file_path": file_path}
+            )
+        ]
+        visited_symbols = set(symbol_frontier)
+        file_frontier = [file_path]
+        visited_files = {file_path}
+
+        for level in range(1, depth + 1):
+            if not symbol_frontier and not file_frontier:
+                break
+
+            next_symbols = []
+            if symbol_frontier:
+                for row in session.run(self._IMPACT_CALLERS_QUERY, {"ids": symbol_frontier, "cap": cap}):
+                    if row["id"] in visited_symbols:
+                        continue
+                    visited_symbols.add(row["id"])
+                    next_symbols.append(row["id"])
+                    yield dict(row), "CALLS", level
+
+            next_files = []
+            if file_frontier:
+                for row in session.run(
+                    self._IMPACT_IMPORTERS_QUERY,
+                    {"repo_id": repo_id, "paths": file_frontier, "cap": cap}
+                ):
+                    if row["path"] in visited_files:
+                        continue
+                    visited_files.add(row["path"])
+                    next_files.append(row["path"])
+                    yield dict(row), "IMPORTS", level
+
+            if len(next_symbols) >= cap or len(next_files) >= cap:
+                logger.warning(
+                    f"Impact analysis of {file_path} capped at {cap} nodes on level {level}"
+                )
+            symbol_frontier, file_frontier = next_symbols, next_files
+
+    @staticmethod
+    def _impact_score(relationship: str, depth: int, centrality: float = 0.0) -> float:
+        """
+        Prefer direct dependencies (depth=1) and CALLS over IMPORTS, boosted
+        by the dependent's precomputed centrality so widely used files rank first
+        """
+        if depth == 1:
+            base = 1.0 if relationship == "CALLS" else 0.9
+        elif depth == 2:
+            base = 0.7 if relationship == "CALLS" else 0.6
+        else:
+            base = 0.5 / depth
+        return base * (1.0 + 0.2 * centrality)
+
+    def update_centrality(self, repo_id: str) -> Dict[str, Any]:
+        """
+        Compute PageRank, degrees and transitive dependent counts of every
+        File and Symbol of a repository from its graph snapshot, and write them
+        back as node properties (pagerank, centrality, inDegree, outDegree,
+        dependents) in batched UNWIND updates.
+        """
+        if not self._connected:
+            return {"success": False, "error": "Not connected to Neo4j"}
+
+        try:
+            snapshot = self.get_snapshot(repo_id)
+            if snapshot is None:
+                with self._session() as session:
+                    snapshot = GraphSnapshot.load(session, repo_id, query_cache.generation(repo_id))
+
+            start = time.time()
+            scores = snapshot.compute_centrality()
+            rows = {FILE: [], SYMBOL: []}
+            for node in range(snapshot.node_count):
+                rows[snapshot.kinds[node]].append({
+                    "key": snapshot.keys[node],
+                    "props": {
+                        "pagerank": float(scores["pagerank"][node]),
+                        "centrality": float(scores["centrality"][node]),
+                        "inDegree": int(scores["in_degree"][node]),
+                        "outDegree": int(scores["out_degree"][node]),
+                        "dependents": int(scores["dependents"][node])
+                    }
+                })
+
+            with self._session() as session:
+                for batch in self._iter_batches(rows[FILE], settings.ingest_batch_size):
+                    session.run(
+                        """
+                        UNWIND $rows AS row
+                        MATCH (f:File {repoId: $repo_id, path: row.key})
+                        SET f += row.props
+                        """,
+                        {"repo_id": repo_id, "rows": batch}
+                    ).consume()
+                for batch in self._iter_batches(rows[SYMBOL], settings.ingest_batch_size):
+                    session.run(
+                        """
+                        UNWIND $rows AS row
+                        MATCH (s:Symbol {id: row.key})
+                        SET s += row.props
+                        """,
+                        {"rows": batch}
+                    ).consume()
+
+            # scores changed, not the graph: keep the snapshot under the new generation
+            query_cache.bump_generation(repo_id)
+            snapshot.generation = query_cache.generation(repo_id)
+            with self._snapshot_lock:
+                self._snapshots[repo_id] = snapshot
+
+            duration_ms = (time.time() - start) * 1000
+            logger.info(
+                f"Updated centrality of {len(rows[FILE])} files and {len(rows[SYMBOL])} symbols "
+                f"in {repo_id} ({duration_ms:.0f}ms)"
+            )
+            return {
+                "success": True,
+                "files_updated": len(rows[FILE]),
+                "symbols_updated": len(rows[SYMBOL]),
+                "duration_ms": duration_ms
+            }
+        except Exception as e:
+            logger.error(f"Failed to update centrality for {repo_id}: {e}")
+            return {"success": False, "error": str(e)}
+
 # global graph service instance
 graph_service = Neo4jGraphService() 
\ No newline at end of file
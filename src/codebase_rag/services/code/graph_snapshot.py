@@ -0,0 +1,460 @@
+"""
+In-memory dependency graph snapshot
+Compact CSR adjacency of one repository's File/Symbol graph for hot graph queries
+"""
+from array import array
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+FILE = 0
+SYMBOL = 1
+
+
+class GraphSnapshot:
+    """
+    Read-only CSR snapshot of a repository's File and Symbol nodes.
+
+    Nodes get dense int ids; outgoing and incoming edges are stored as
+    offset/target/type arrays so neighbourhood, degree, reverse-dependency
+    and shortest-path queries never touch Neo4j. Only relationships whose
+    both ends belong to the repository are included.
+    """
+
+    def __init__(
+        self,
+        repo_id: str,
+        files: Iterable[Dict[str, Any]],
+        symbols: Iterable[Dict[str, Any]],
+        edges: Iterable[Tuple[Tuple[int, str], str, Tuple[int, str]]],
+        generation: int = 0
+    ):
+        self.repo_id = repo_id
+        self.generation = generation
+
+        # node attributes, indexed by node id
+        self.kinds = array('b')
+        self.keys: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.paths: List[Optional[str]] = []
+        self.langs: List[Optional[str]] = []
+        self.file_index: Dict[str, int] = {}
+        self.symbol_index: Dict[str, int] = {}
+        # precomputed importance in [0, 1], see compute_centrality()
+        self.centrality = array('d')
+
+        for f in files:
+            self.file_index[f["path"]] = self._add_node(FILE, f["path"], f["path"], f["path"], f.get("lang"))
+            self.centrality.append(f.get("centrality") or 0.0)
+        for s in symbols:
+            file_path = s.get("path")
+            self.symbol_index[s["id"]] = self._add_node(
+                SYMBOL, s["id"], s.get("name"), file_path, self.langs[self.file_index[file_path]]
+                if file_path in self.file_index else None
+            )
+            self.centrality.append(s.get("centrality") or 0.0)
+
+        self.rel_types: List[str] = []
+        rel_type_ids: Dict[str, int] = {}
+        sources, targets, types = array('i'), array('i'), array('h')
+        for start, rel_type, end in edges:
+            a, b = self.node_id(*start), self.node_id(*end)
+            if a is None or b is None:
+                continue
+            if rel_type not in rel_type_ids:
+                rel_type_ids[rel_type] = len(self.rel_types)
+                self.rel_types.append(rel_type)
+            sources.append(a)
+            targets.append(b)
+            types.append(rel_type_ids[rel_type])
+
+        self.out_offsets, self.out_targets, self.out_types = self._build_csr(sources, targets, types)
+        self.in_offsets, self.in_sources, self.in_types = self._build_csr(targets, sources, types)
+
+    def _add_node(self, kind: int, key: str, name: Optional[str], path: Optional[str], lang: Optional[str]) -> int:
+        self.kinds.append(kind)
+        self.keys.append(key)
+        self.names.append(name)
+        self.paths.append(path)
+        self.langs.append(lang)
+        return len(self.keys) - 1
+
+    def _build_csr(self, rows: array, cols: array, types: array) -> Tuple[array, array, array]:
+        """Counting sort of edges by row into offset/column/type arrays"""
+        n = len(self.keys)
+        offsets = array('i', [0]) * (n + 1)
+        for r in rows:
+            offsets[r + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        cursor = array('i', offsets[:n])
+        out_cols = array('i', [0]) * len(cols)
+        out_types = array('h', [0]) * len(types)
+        for r, c, t in zip(rows, cols, types):
+            pos = cursor[r]
+            out_cols[pos] = c
+            out_types[pos] = t
+            cursor[r] += 1
+        return offsets, out_cols, out_types
+
+    @property
+    def node_count(self) -> int:
+        return len(self.keys)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.out_targets)
+
+    def node_id(self, kind: int, key: str) -> Optional[int]:
+        index = self.file_index if kind == FILE else self.symbol_index
+        return index.get(key)
+
+    def _rel_type_id(self, rel_type: str) -> int:
+        return self.rel_types.index(rel_type) if rel_type in self.rel_types else -1
+
+    def out_edges(self, node: int, rel_type: Optional[int] = None) -> Iterable[int]:
+        for pos in range(self.out_offsets[node], self.out_offsets[node + 1]):
+            if rel_type is None or self.out_types[pos] == rel_type:
+                yield self.out_targets[pos]
+
+    def in_edges(self, node: int, rel_type: Optional[int] = None) -> Iterable[int]:
+        for pos in range(self.in_offsets[node], self.in_offsets[node + 1]):
+            if rel_type is None or self.in_types[pos] == rel_type:
+                yield self.in_sources[pos]
+
+    def edge_type(self, a: int, b: int) -> Optional[str]:
+        """Type of an edge between two adjacent nodes, in either direction"""
+        for pos in range(self.out_offsets[a], self.out_offsets[a + 1]):
+            if self.out_targets[pos] == b:
+                return self.rel_types[self.out_types[pos]]
+        for pos in range(self.in_offsets[a], self.in_offsets[a + 1]):
+            if self.in_sources[pos] == b:
+                return self.rel_types[self.in_types[pos]]
+        return None
+
+    def neighbors(self, node: int) -> Iterable[int]:
+        """Neighbours ignoring edge direction"""
+        yield from self.out_edges(node)
+        yield from self.in_edges(node)
+
+    def degree(self, node: int) -> Dict[str, int]:
+        out_degree = self.out_offsets[node + 1] - self.out_offsets[node]
+        in_degree = self.in_offsets[node + 1] - self.in_offsets[node]
+        return {"out_degree": out_degree, "in_degree": in_degree, "total_degree": out_degree + in_degree}
+
+    def connected(self, node: int, depth: int = 1) -> List[int]:
+        """Nodes within `depth` hops of `node` (undirected), nearest first"""
+        seen = {node}
+        frontier = [node]
+        result = []
+        for _ in range(depth):
+            next_frontier = []
+            for current in frontier:
+                for neighbor in self.neighbors(current):
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        next_frontier.append(neighbor)
+            result.extend(next_frontier)
+            frontier = next_frontier
+            if not frontier:
+                break
+        return result
+
+    def shortest_path(self, start: int, end: int) -> Optional[List[int]]:
+        """Unweighted, undirected shortest path as a list of node ids"""
+        if start == end:
+            return [start]
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            for neighbor in self.neighbors(current):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = current
+                if neighbor == end:
+                    path = [end]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    return path[::-1]
+                queue.append(neighbor)
+        return None
+
+    def impact(
+        self,
+        file_path: str,
+        depth: int = 2,
+        max_per_level: int = 1000
+    ) -> Iterator[Tuple[Dict[str, Any], str, int]]:
+        """
+        Walk reverse dependencies of a file breadth-first, yielding
+        (row, relationship, level) for every caller and importer found;
+        mirrors Neo4jGraphService.impact_analysis.
+        """
+        target = self.file_index.get(file_path)
+        if target is None:
+            return
+
+        calls = self._rel_type_id("CALLS")
+        imports = self._rel_type_id("IMPORTS")
+        defined_in = self._rel_type_id("DEFINED_IN")
+
+        symbol_frontier = list(self.in_edges(target, defined_in))
+        visited_symbols = set(symbol_frontier)
+        file_frontier = [target]
+        visited_files = {target}
+
+        for level in range(1, depth + 1):
+            if not symbol_frontier and not file_frontier:
+                break
+
+            next_symbols = []
+            for symbol in symbol_frontier:
+                for caller in self.in_edges(symbol, calls):
+                    if caller in visited_symbols or len(next_symbols) >= max_per_level:
+                        continue
+                    visited_symbols.add(caller)
+                    next_symbols.append(caller)
+                    for caller_file in self.out_edges(caller, defined_in):
+                        yield self._file_row(caller_file), "CALLS", level
+
+            next_files = []
+            for file in file_frontier:
+                for importer in self.in_edges(file, imports):
+                    if importer in visited_files or len(next_files) >= max_per_level:
+                        continue
+                    visited_files.add(importer)
+                    next_files.append(importer)
+                    yield self._file_row(importer), "IMPORTS", level
+
+            if len(next_symbols) >= max_per_level or len(next_files) >= max_per_level:
+                logger.warning(f"Impact analysis of {file_path} capped at {max_per_level} nodes on level {level}")
+            symbol_frontier, file_frontier = next_symbols, next_files
+
+    def _file_row(self, node: int) -> Dict[str, Any]:
+        return {
+            "path": self.paths[node],
+            "lang": self.langs[node],
+            "repoId": self.repo_id,
+            "centrality": self.centrality[node]
+        }
+
+    def dependency_edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Deduplicated (source, target) arrays of "source depends on target":
+        IMPORTS between files, CALLS between symbols, and CALLS lifted to
+        the files defining caller and callee.
+        """
+        n = self.node_count
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(np.frombuffer(self.out_offsets, dtype=np.int32)))
+        targets = np.frombuffer(self.out_targets, dtype=np.int32).astype(np.int64)
+        types = np.frombuffer(self.out_types, dtype=np.int16)
+
+        calls = types == self._rel_type_id("CALLS")
+        imports = types == self._rel_type_id("IMPORTS")
+        defined_in = types == self._rel_type_id("DEFINED_IN")
+
+        defining_file = np.full(n, -1, dtype=np.int64)
+        defining_file[sources[defined_in]] = targets[defined_in]
+        lifted_sources = defining_file[sources[calls]]
+        lifted_targets = defining_file[targets[calls]]
+        lifted = (lifted_sources >= 0) & (lifted_targets >= 0) & (lifted_sources != lifted_targets)
+
+        all_sources = np.concatenate([sources[calls | imports], lifted_sources[lifted]])
+        all_targets = np.concatenate([targets[calls | imports], lifted_targets[lifted]])
+        keys = np.unique(all_sources * n + all_targets)
+        return keys // max(n, 1), keys % max(n, 1)
+
+    def compute_centrality(
+        self,
+        damping: float = 0.85,
+        max_iterations: int = 100,
+        tolerance: float = 1e-8
+    ) -> Dict[str, np.ndarray]:
+        """
+        PageRank, degrees and transitive dependent counts of every node over
+        the dependency edges. Rank flows from dependents to their dependencies,
+        so widely used files and symbols score highest. `centrality` is the
+        PageRank scaled to [0, 1] within files and within symbols.
+        """
+        n = self.node_count
+        if n == 0:
+            empty = np.zeros(0)
+            return {key: empty for key in ("pagerank", "centrality", "in_degree", "out_degree", "dependents")}
+        sources, targets = self.dependency_edges()
+        out_degree = np.bincount(sources, minlength=n)
+        in_degree = np.bincount(targets, minlength=n)
+
+        pagerank = np.full(n, 1.0 / max(n, 1))
+        dangling = out_degree == 0
+        weights = 1.0 / np.maximum(out_degree, 1)
+        for _ in range(max_iterations):
+            spread = np.bincount(targets, weights=(pagerank * weights)[sources], minlength=n)
+            updated = (1.0 - damping) / n + damping * (spread + pagerank[dangling].sum() / n)
+            converged = np.abs(updated - pagerank).sum() < tolerance
+            pagerank = updated
+            if converged:
+                break
+
+        centrality = np.zeros(n)
+        kinds = np.frombuffer(self.kinds, dtype=np.int8)
+        for kind in (FILE, SYMBOL):
+            mask = kinds == kind
+            if mask.any():
+                centrality[mask] = pagerank[mask] / pagerank[mask].max()
+        self.centrality = array('d', centrality.tolist())
+
+        return {
+            "pagerank": pagerank,
+            "centrality": centrality,
+            "in_degree": in_degree,
+            "out_degree": out_degree,
+            "dependents": self._count_dependents(n, sources, targets)
+        }
+
+    @staticmethod
+    def _count_dependents(n: int, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """
+        Number of nodes that transitively depend on each node. Strongly
+        connected components of the reverse graph are found with an iterative
+        Tarjan; components come out dependents-last, so each one's dependent
+        set is the bitset union of its successors'. A bitset is dropped as
+        soon as its last consumer has read it.
+        """
+        order = np.argsort(targets, kind='stable')
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=n), out=offsets[1:])
+        # reverse adjacency: node -> direct dependents
+        dependents_of = sources[order].tolist()
+        offsets = offsets.tolist()
+
+        index = [-1] * n
+        low = [0] * n
+        on_stack = [False] * n
+        component = [-1] * n
+        stack: List[int] = []
+        components: List[List[int]] = []
+        counter = 0
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, offsets[root])]
+            while work:
+                v, pos = work[-1]
+                if pos < offsets[v + 1]:
+                    work[-1] = (v, pos + 1)
+                    w = dependents_of[pos]
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, offsets[w]))
+                    elif on_stack[w]:
+                        low[v] = min(low[v], index[w])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+                if low[v] == index[v]:
+                    members = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component[w] = len(components)
+                        members.append(w)
+                        if w == v:
+                            break
+                    components.append(members)
+
+        successors = [
+            {component[dependents_of[pos]] for m in members for pos in range(offsets[m], offsets[m + 1])} - {c}
+            for c, members in enumerate(components)
+        ]
+        consumers = [0] * len(components)
+        for succ in successors:
+            for d in succ:
+                consumers[d] += 1
+
+        counts = np.zeros(n, dtype=np.int64)
+        bits: Dict[int, int] = {}
+        for c, members in enumerate(components):
+            reach = 0
+            for m in members:
+                reach |= 1 << m
+            for d in successors[c]:
+                reach |= bits[d]
+                consumers[d] -= 1
+                if consumers[d] == 0:
+                    del bits[d]
+            counts[members] = reach.bit_count() - 1
+            if consumers[c]:
+                bits[c] = reach
+        return counts
+
+    def to_node(self, node: int) -> Dict[str, Any]:
+        """Node in the shape of GraphNode"""
+        if self.kinds[node] == FILE:
+            return {
+                "id": self.keys[node],
+                "labels": ["File"],
+                "properties": {"path": self.paths[node], "lang": self.langs[node], "repoId": self.repo_id}
+            }
+        return {
+            "id": self.keys[node],
+            "labels": ["Symbol"],
+            "properties": {"id": self.keys[node], "name": self.names[node], "path": self.paths[node]}
+        }
+
+    @classmethod
+    def load(cls, session, repo_id: str, generation: int = 0) -> "GraphSnapshot":
+        """Read a repository's File/Symbol graph from Neo4j"""
+        files = [dict(r) for r in session.run(
+            "MATCH (f:File {repoId: $repo_id}) RETURN f.path as path, f.lang as lang, f.centrality as centrality",
+            {"repo_id": repo_id}
+        )]
+        symbols = [dict(r) for r in session.run(
+            """
+            MATCH (s:Symbol)-[:DEFINED_IN]->(f:File {repoId: $repo_id})
+            RETURN s.id as id, s.name as name, f.path as path, s.centrality as centrality
+            """,
+            {"repo_id": repo_id}
+        )]
+
+        def edges():
+            for r in session.run(
+                """
+                MATCH (a:File {repoId: $repo_id})-[rel]->(b)
+                WHERE b:Symbol OR (b:File AND b.repoId = $repo_id)
+                RETURN a.path as start, type(rel) as type,
+                       CASE WHEN b:File THEN b.path ELSE b.id END as end,
+                       b:File as end_is_file
+                """,
+                {"repo_id": repo_id}
+            ):
+                yield (FILE, r["start"]), r["type"], (FILE if r["end_is_file"] else SYMBOL, r["end"])
+            for r in session.run(
+                """
+                MATCH (:File {repoId: $repo_id})<-[:DEFINED_IN]-(a:Symbol)-[rel]->(b)
+                WHERE b:Symbol OR (b:File AND b.repoId = $repo_id)
+                RETURN a.id as start, type(rel) as type,
+                       CASE WHEN b:File THEN b.path ELSE b.id END as end,
+                       b:File as end_is_file
+                """,
+                {"repo_id": repo_id}
+            ):
+                yield (SYMBOL, r["start"]), r["type"], (FILE if r["end_is_file"] else SYMBOL, r["end"])
+
+        snapshot = cls(repo_id, files, symbols, edges(), generation)
+        logger.info(
+            f"Built graph snapshot for {repo_id}: {snapshot.node_count} nodes, {snapshot.edge_count} edges"
+        )
+        return snapshot
@@ -47,8 +47,12 @@ class PackBuilder:
             nodes = PackBuilder._deduplicate_nodes(nodes)
             logger.debug(f"After deduplication: {len(nodes)} unique nodes")
 
-        # Step 2: Sort nodes by score
-        sorted_nodes = sorted(nodes, key=lambda x: x.get("score", 0), reverse=True)
+        # Step 2: Sort nodes by score, more central nodes first on ties
+        sorted_nodes = sorted(
+            nodes,
+            key=lambda x: (x.get("score", 0), x.get("centrality") or 0),
+            reverse=True,
+        )
 
         # Step 3: Prioritize focus paths if provided
         if focus_paths:
@@ -42,16 +42,16 @@ FOR (n:Table) REQUIRE n.id IS UNIQUE;
 // INDEXES (Performance Optimization)
 // ============================================================================
 
-// Fulltext Index: File search by path, language, and content
+// Fulltext Index: File search by path and language
 // This is the PRIMARY search index for file discovery
 // Supports fuzzy matching and relevance scoring
 CREATE FULLTEXT INDEX file_text IF NOT EXISTS
 FOR (f:File) ON EACH [f.path, f.lang];
 
-// Note: If you want to include content in fulltext search (can be large),
-// uncomment the line below and comment out the one above:
-// CREATE FULLTEXT INDEX file_text IF NOT EXISTS
-// FOR (f:File) ON EACH [f.path, f.lang, f.content];
+// Fulltext Index: BM25 search over file contents (kept separate so content
+// matches can be weighted against path matches)
+CREATE FULLTEXT INDEX file_content IF NOT EXISTS
+FOR (f:File) ON EACH [f.content];
 
 // Regular indexes for exact lookups
 CREATE INDEX file_path IF NOT EXISTS
@@ -0,0 +1,254 @@
+"""Streaming ingestion executor for knowledge pipelines.
+
+Documents are pulled from a connector in windows, parsed into nodes in a
+process pool and handed to the writer in bounded batches, so memory use
+is bounded by the window and a slow document only costs its own timeout.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import signal
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from llama_index.core.ingestion.pipeline import run_transformations
+from llama_index.core.schema import BaseNode, Document, TransformComponent
+from loguru import logger
+
+from codebase_rag.services.utils.worker_processes import get_worker_context
+
+# Transformations of the current worker process, set once by _init_worker
+_worker_transformations: Optional[Sequence[TransformComponent]] = None
+
+
+def _init_worker(transformations: Sequence[TransformComponent], worker_pids: Any) -> None:
+    global _worker_transformations
+    _worker_transformations = transformations
+    # tell the parent which process to kill if one of its documents hangs
+    worker_pids.put(os.getpid())
+
+
+def _parse_document(document: Document) -> List[BaseNode]:
+    return run_transformations([document], _worker_transformations)
+
+
+def _describe(document: Document) -> str:
+    metadata = document.metadata or {}
+    return str(metadata.get("file_path") or metadata.get("file_name") or metadata.get("title") or document.doc_id)
+
+
+@dataclass
+class IngestionStats:
+    """Counters of a streaming ingestion run."""
+
+    documents: int = 0
+    nodes: int = 0
+    chars: int = 0
+    batches: int = 0
+    failed: List[Dict[str, str]] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "documents_count": self.documents,
+            "nodes_count": self.nodes,
+            "total_chars": self.chars,
+            "write_batches": self.batches,
+            "failed_documents": self.failed,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "documents_per_second": round(self.documents_per_second, 2),
+        }
+
+
+class StreamingIngestionExecutor:
+    """Parse documents window by window in worker processes and write nodes in batches.
+
+    A document that kills its worker breaks every unfinished document of the
+    window; those are parsed again one at a time on a restarted pool, so only
+    a document that breaks the pool on its own is counted as failed.
+    """
+
+    def __init__(
+        self,
+        transformations: Sequence[TransformComponent],
+        write: Callable[[List[BaseNode]], None],
+        *,
+        window_size: int = 64,
+        max_workers: int = 4,
+        write_batch_size: int = 256,
+        document_timeout: Optional[float] = None,
+        progress_callback: Optional[Callable[[Optional[float], str], None]] = None,
+    ) -> None:
+        self.transformations = list(transformations)
+        self.write = write
+        self.window_size = max(1, window_size)
+        self.max_workers = max_workers
+        self.write_batch_size = max(1, write_batch_size)
+        self.document_timeout = document_timeout
+        self.progress_callback = progress_callback
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_tainted = False
+        self._pool_broken = False
+        # worker processes of the current pool report their pid here on start
+        self._worker_pids: Any = None
+
+    # ------------------------------------------------------------------ pool
+
+    def _start_pool(self) -> Optional[ProcessPoolExecutor]:
+        try:
+            pickle.dumps(self.transformations)
+        except Exception as exc:
+            logger.warning(f"Transformations cannot be sent to worker processes, parsing in-process: {exc}")
+            self.max_workers = 0
+            return None
+        context = get_worker_context()
+        self._worker_pids = context.SimpleQueue()
+        self._pool_tainted = self._pool_broken = False
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.transformations, self._worker_pids),
+        )
+        # wait for a first worker, so starting the fork server does not count
+        # against the timeout of the first documents
+        self._pool.submit(os.getpid).result()
+        return self._pool
+
+    def _stop_pool(self, kill: bool = False) -> None:
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        if kill:
+            # a timed-out document may still hold a worker; don't wait for it
+            while not self._worker_pids.empty():
+                try:
+                    os.kill(self._worker_pids.get(), signal.SIGTERM)
+                except OSError:
+                    pass  # already exited
+        pool.shutdown(wait=not kill, cancel_futures=True)
+
+    # --------------------------------------------------------------- parsing
+
+    def _parse_in_process(self, window: List[Document]) -> Iterator[Tuple[Document, Optional[List[BaseNode]], Optional[str]]]:
+        for document in window:
+            try:
+                yield document, run_transformations([document], self.transformations), None
+            except Exception as exc:
+                yield document, None, str(exc)
+
+    def _parse_in_pool(self, window: List[Document]) -> Iterator[Tuple[Document, Optional[List[BaseNode]], Optional[str]]]:
+        futures: List[Tuple[Document, Future]] = [(doc, self._pool.submit(_parse_document, doc)) for doc in window]
+        # documents that were unfinished when a worker died, not necessarily the culprit
+        suspects: List[Document] = []
+        for document, future in futures:
+            try:
+                yield document, future.result(timeout=self.document_timeout), None
+            except FutureTimeoutError:
+                future.cancel()
+                self._pool_tainted = True
+                yield document, None, f"Parsing timed out after {self.document_timeout}s"
+            except BrokenProcessPool:
+                self._pool_broken = True
+                suspects.append(document)
+            except Exception as exc:
+                yield document, None, str(exc)
+
+        if suspects:
+            logger.warning(f"Worker process died, re-parsing {len(suspects)} documents one at a time")
+            for document in suspects:
+                yield (document, *self._parse_alone(document))
+
+    def _parse_alone(self, document: Document) -> Tuple[Optional[List[BaseNode]], Optional[str]]:
+        """Parse one document on its own, on a fresh pool if the current one is broken."""
+        if self._pool_broken:
+            self._stop_pool(kill=True)
+            self._start_pool()
+        future = self._pool.submit(_parse_document, document)
+        try:
+            return future.result(timeout=self.document_timeout), None
+        except FutureTimeoutError:
+            future.cancel()
+            self._pool_tainted = True
+            return None, f"Parsing timed out after {self.document_timeout}s"
+        except BrokenProcessPool as exc:
+            self._pool_broken = True
+            return None, f"Worker process died: {exc}"
+        except Exception as exc:
+            return None, str(exc)
+
+    # ------------------------------------------------------------------- run
+
+    def _flush(self, pending: List[BaseNode], stats: IngestionStats, force: bool = False) -> None:
+        while pending and (force or len(pending) >= self.write_batch_size):
+            batch = pending[:self.write_batch_size]
+            del pending[:self.write_batch_size]
+            self.write(batch)
+            stats.nodes += len(batch)
+            stats.batches += 1
+
+    def _report(self, stats: IngestionStats, document: Document, expected: Optional[int]) -> None:
+        if self.progress_callback is None:
+            return
+        progress = min(100.0, stats.documents * 100.0 / expected) if expected else None
+        message = (
+            f"Processed {stats.documents}{f'/{expected}' if expected else ''} documents "
+            f"({stats.documents_per_second:.1f} docs/s): {_describe(document)}"
+        )
+        try:
+            self.progress_callback(progress, message)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning(f"Ingestion progress callback failed: {exc}")
+
+    def run(self, documents: Iterable[Document], expected_documents: Optional[int] = None) -> IngestionStats:
+        """Ingest documents; runs synchronously, call it from a worker thread."""
+        stats = IngestionStats()
+        pending: List[BaseNode] = []
+        iterator = iter(documents)
+        try:
+            while True:
+                window = list(islice(iterator, self.window_size))
+                if not window:
+                    break
+                # a lone document is not worth starting worker processes for
+                if self._pool is None and self.max_workers > 1 and (len(window) > 1 or stats.documents):
+                    self._start_pool()
+
+                self._pool_tainted = False
+                results = self._parse_in_pool(window) if self._pool else self._parse_in_process(window)
+                for document, nodes, error in results:
+                    stats.documents += 1
+                    stats.chars += len(document.text or "")
+                    if error is not None:
+                        logger.warning(f"Skipping document {_describe(document)}: {error}")
+                        stats.failed.append({"document": _describe(document), "error": error})
+                    else:
+                        pending.extend(nodes)
+                        self._flush(pending, stats)
+                    self._report(stats, document, expected_documents)
+
+                if self._pool_tainted or self._pool_broken:
+                    self._stop_pool(kill=True)
+                logger.info(
+                    f"Ingested {stats.documents} documents, {stats.nodes + len(pending)} nodes "
+                    f"({stats.documents_per_second:.1f} docs/s)"
+                )
+
+            self._flush(pending, stats, force=True)
+            return stats
+        finally:
+            self._stop_pool()
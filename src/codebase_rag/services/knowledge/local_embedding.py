@@ -0,0 +1,36 @@
+"""
+LlamaIndex embedding model backed by the local hashed n-gram embedder
+"""
+from typing import List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import Field, PrivateAttr
+
+from codebase_rag.services.utils.hashed_embedding import HashedNgramEmbedder
+
+
+class LocalHashEmbedding(BaseEmbedding):
+    """Deterministic offline embeddings for Settings.embed_model"""
+
+    dimension: int = Field(default=384, description="Vector dimension")
+    _embedder: HashedNgramEmbedder = PrivateAttr()
+
+    def __init__(self, dimension: int = 384, model_name: str = "hashed-ngram", **kwargs):
+        super().__init__(dimension=dimension, model_name=model_name, **kwargs)
+        self._embedder = HashedNgramEmbedder(dimension)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalHashEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embedder.embed_one(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._embedder.embed_one(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embedder.embed_one(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embedder.embed(texts).tolist()
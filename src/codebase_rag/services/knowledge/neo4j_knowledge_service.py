@@ -5,11 +5,14 @@ uses LlamaIndex's KnowledgeGraphIndex and Neo4j's native vector search functiona
 supports multiple LLM and embedding model providers
 """
 
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional, Union
+from typing import AsyncIterator, Callable, Iterator, List, Dict, Any, Optional, Tuple, Union
 from pathlib import Path
 import asyncio
 from loguru import logger
+import re
+import threading
 import time
 
 from llama_index.core import (
@@ -21,7 +24,7 @@ from llama_index.core import (
 from llama_index.core.indices.knowledge_graph import KnowledgeGraphRAGRetriever
 from llama_index.core.retrievers import VectorIndexRetriever
 from llama_index.core.response_synthesizers import get_response_synthesizer
-from llama_index.core.schema import QueryBundle, NodeWithScore
+from llama_index.core.schema import QueryBundle, NodeWithScore, TextNode
 
 # LLM Providers
 from llama_index.llms.ollama import Ollama
@@ -36,6 +39,7 @@ from llama_index.embeddings.gemini import GeminiEmbedding
 
 # Graph Store
 from llama_index.graph_stores.neo4j import Neo4jGraphStore
+from neo4j import READ_ACCESS
 
 # Tools / workflow
 from llama_index.core.tools import FunctionTool
@@ -45,9 +49,16 @@ except Exception:  # pragma: no cover - optional runtime dependency
     ToolNode = None  # type: ignore
 
 from codebase_rag.config import settings
+from codebase_rag.services.utils.cypher_stream import iter_records, to_json_line
+from codebase_rag.services.utils.ann_index import AnnIndex
+from codebase_rag.services.utils.query_cache import query_cache
+from codebase_rag.services.utils.semantic_cache import SemanticQueryCache
+from codebase_rag.services.knowledge.local_embedding import LocalHashEmbedding
+from codebase_rag.services.knowledge.ingestion_executor import StreamingIngestionExecutor
 from codebase_rag.services.knowledge.pipeline_components import (
     PipelineBundle,
     build_pipeline_bundle,
+    iter_connector_documents,
     merge_pipeline_configs,
 )
 
@@ -66,6 +77,78 @@ class PipelineConfig:
     top_k: int = 5
     graph_depth: int = 2
     tool_kwargs: Dict[str, Any] = field(default_factory=dict)
+    graph_timeout: Optional[float] = None
+    vector_timeout: Optional[float] = None
+    retrieve_only: bool = False
+
+
+_QUERY_STOPWORDS = {
+    "the", "and", "for", "with", "what", "which", "who", "how", "why", "when", "where",
+    "does", "did", "are", "was", "were", "is", "that", "this", "from", "into", "about",
+    "can", "could", "should", "would", "have", "has", "there", "their", "them",
+}
+
+
+def _extract_query_keywords(question: str) -> List[str]:
+    """LLM-free entity extraction: query words with the casings graph entities commonly use."""
+    keywords: List[str] = []
+    for word in re.findall(r"\w+", question):
+        if len(word) < 3 or word.lower() in _QUERY_STOPWORDS:
+            continue
+        for variant in (word, word.lower(), word.capitalize()):
+            if variant not in keywords:
+                keywords.append(variant)
+    return keywords
+
+
+class _KeywordGraphRetriever(KnowledgeGraphRAGRetriever):
+    """Graph retriever for retrieve-only queries: entities are the query keywords, never LLM output.
+
+    The base retriever always falls back to its default LLM prompts for entity
+    extraction and synonym expansion, so both steps are replaced here.
+    """
+
+    def _get_entities(self, query_str: str) -> List[str]:
+        return _extract_query_keywords(query_str)
+
+    async def _aget_entities(self, query_str: str) -> List[str]:
+        return _extract_query_keywords(query_str)
+
+    def _expand_synonyms(self, keywords: List[str]) -> List[str]:
+        return []
+
+    async def _aexpand_synonyms(self, keywords: List[str]) -> List[str]:
+        return []
+
+
+# Shared by all pipelines so rebuilding a pipeline does not leak threads
+_retrieval_executor = ThreadPoolExecutor(
+    max_workers=settings.retrieval_max_workers,
+    thread_name_prefix="rag-retrieval",
+)
+
+# A timed-out stage keeps its executor thread until it returns (threads cannot
+# be cancelled). Cap how many such overrunning calls one stage may hold; past
+# the cap the stage is skipped, so a hung backend cannot starve the pool.
+_MAX_OVERRUNNING_PER_STAGE = max(1, settings.retrieval_max_workers // 4)
+_overrunning: Dict[str, int] = {}
+_overrunning_lock = threading.Lock()
+
+
+def _track_overrun(name: str, future) -> None:
+    with _overrunning_lock:
+        _overrunning[name] = _overrunning.get(name, 0) + 1
+
+    def release(_):
+        with _overrunning_lock:
+            _overrunning[name] -= 1
+
+    future.add_done_callback(release)
+
+
+def _stage_saturated(name: str) -> bool:
+    with _overrunning_lock:
+        return _overrunning.get(name, 0) >= _MAX_OVERRUNNING_PER_STAGE
 
 
 class Neo4jRAGPipeline:
@@ -82,6 +165,7 @@ class Neo4jRAGPipeline:
         max_knowledge_sequence: int = 30,
         verbose: bool = False,
         vector_index: Optional[VectorStoreIndex] = None,
+        ann_index: Optional[AnnIndex] = None,
         function_tools: Optional[List[FunctionTool]] = None,
         tool_node: Optional["ToolNode"] = None,
     ) -> None:
@@ -93,6 +177,7 @@ class Neo4jRAGPipeline:
         self.max_knowledge_sequence = max_knowledge_sequence
         self.verbose = verbose
         self.vector_index = vector_index
+        self.ann_index = ann_index
         self.function_tools = function_tools or []
         self.tool_node = tool_node
 
@@ -131,53 +216,171 @@ class Neo4jRAGPipeline:
             )
         return summaries
 
-    def run(self, question: str, config: PipelineConfig) -> Dict[str, Any]:
-        """Execute the pipeline synchronously."""
+    def _ann_retrieve(self, question: str, top_k: int) -> List[NodeWithScore]:
+        """First-stage vector retrieval from the local ANN index."""
+        query_embedding = Settings.embed_model.get_query_embedding(question)
+        return [
+            NodeWithScore(
+                node=TextNode(id_=hit["id"], text=hit["text"] or "", metadata=hit["metadata"] or {}),
+                score=hit["score"],
+            )
+            for hit in self.ann_index.query(query_embedding, top_k, settings.ann_nprobe)
+        ]
+
+    @staticmethod
+    def _timed(fn: Callable[[], Any]) -> Tuple[Any, float]:
+        started = time.perf_counter()
+        return fn(), time.perf_counter() - started
+
+    def _graph_retrieve(
+        self, query_bundle: QueryBundle, config: PipelineConfig
+    ) -> Tuple[List[NodeWithScore], Dict[str, Any]]:
+        retriever_kwargs: Dict[str, Any] = {}
+        if config.retrieve_only:
+            retriever_kwargs = {"entity_extract_fn": _extract_query_keywords, "synonym_expand_fn": lambda _: []}
+        retriever_class = _KeywordGraphRetriever if config.retrieve_only else KnowledgeGraphRAGRetriever
+        graph_retriever = retriever_class(
+            storage_context=self.storage_context,
+            llm=self.llm,
+            graph_traversal_depth=config.graph_depth or self.default_graph_depth,
+            max_knowledge_sequence=self.max_knowledge_sequence,
+            verbose=self.verbose,
+            **retriever_kwargs,
+        )
+        return graph_retriever.retrieve(query_bundle), {
+            "graph_traversal_depth": config.graph_depth or self.default_graph_depth,
+            "max_knowledge_sequence": self.max_knowledge_sequence,
+        }
+
+    def _vector_retrieve(
+        self, question: str, query_bundle: QueryBundle, config: PipelineConfig
+    ) -> Tuple[List[NodeWithScore], Dict[str, Any]]:
+        top_k = config.top_k or self.default_top_k
+        # until the ANN index holds the whole corpus, the vector store stays authoritative
+        if self.ann_index is not None and self.ann_index.complete:
+            return self._ann_retrieve(question, top_k), {"top_k": top_k, "source": "ann_index"}
+        if self.vector_index is None:
+            return [], {"top_k": top_k, "source": "none"}
+        vector_retriever = VectorIndexRetriever(self.vector_index, similarity_top_k=top_k)
+        return vector_retriever.retrieve(query_bundle), {"top_k": top_k, "source": "vector_store"}
+
+    @staticmethod
+    def _fuse_nodes(
+        ranked_lists: List[List[NodeWithScore]], limit: int, k: int = 60
+    ) -> List[NodeWithScore]:
+        """Reciprocal rank fusion of per-stage results, deduplicated by node id."""
+        fused: Dict[str, float] = {}
+        first_seen: Dict[str, NodeWithScore] = {}
+        for nodes in ranked_lists:
+            ordered = sorted(nodes, key=lambda n: n.score or 0.0, reverse=True)
+            for rank, node in enumerate(ordered):
+                node_id = node.node.node_id
+                fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (k + rank + 1)
+                first_seen.setdefault(node_id, node)
+        ranked = sorted(fused, key=fused.get, reverse=True)[:limit]
+        return [NodeWithScore(node=first_seen[node_id].node, score=fused[node_id]) for node_id in ranked]
+
+    def retrieve(self, question: str, config: PipelineConfig) -> Dict[str, Any]:
+        """Run the retrieval stages concurrently and merge their nodes."""
         query_bundle = QueryBundle(query_str=question)
         aggregated_nodes: Dict[str, NodeWithScore] = {}
+        stage_nodes: List[List[NodeWithScore]] = []
         pipeline_steps: List[Dict[str, Any]] = []
 
-        # Graph retrieval
+        stages: List[Tuple[str, Callable[[], Tuple[List[NodeWithScore], Dict[str, Any]]], float]] = []
         if config.run_graph:
-            graph_retriever = KnowledgeGraphRAGRetriever(
-                storage_context=self.storage_context,
-                llm=self.llm,
-                graph_traversal_depth=config.graph_depth or self.default_graph_depth,
-                max_knowledge_sequence=self.max_knowledge_sequence,
-                verbose=self.verbose,
-            )
-            graph_nodes = graph_retriever.retrieve(query_bundle)
-            self._merge_nodes(aggregated_nodes, graph_nodes)
-            pipeline_steps.append(
-                {
-                    "step": "graph_retrieval",
-                    "node_count": len(graph_nodes),
-                    "config": {
-                        "graph_traversal_depth": config.graph_depth or self.default_graph_depth,
-                        "max_knowledge_sequence": self.max_knowledge_sequence,
-                    },
-                    "nodes": self._summarize_nodes(graph_nodes),
-                }
-            )
+            stages.append((
+                "graph_retrieval",
+                lambda: self._graph_retrieve(query_bundle, config),
+                config.graph_timeout or settings.graph_retrieval_timeout,
+            ))
+        if config.run_vector and (self.ann_index is not None or self.vector_index is not None):
+            stages.append((
+                "vector_retrieval",
+                lambda: self._vector_retrieve(question, query_bundle, config),
+                config.vector_timeout or settings.vector_retrieval_timeout,
+            ))
+
+        # Retrieval stages run concurrently; a stage that fails or overruns its
+        # timeout contributes no nodes but does not hold up the others.
+        started = time.perf_counter()
+        futures = [
+            (name, None if _stage_saturated(name) else _retrieval_executor.submit(self._timed, stage), timeout)
+            for name, stage, timeout in stages
+        ]
+        for name, future, timeout in futures:
+            remaining = max(0.0, timeout - (time.perf_counter() - started))
+            step: Dict[str, Any] = {"step": name, "status": "ok", "node_count": 0}
+            if future is None:
+                logger.warning(f"{name} skipped, earlier calls are still running past their timeout")
+                step.update(status="skipped", latency_ms=0.0)
+                pipeline_steps.append(step)
+                continue
+            try:
+                (nodes, step_config), latency = future.result(timeout=remaining)
+                self._merge_nodes(aggregated_nodes, nodes)
+                stage_nodes.append(nodes)
+                step.update(
+                    node_count=len(nodes),
+                    config=step_config,
+                    nodes=self._summarize_nodes(nodes),
+                    latency_ms=round(latency * 1000, 2),
+                )
+            except FutureTimeoutError:
+                logger.warning(f"{name} timed out after {timeout}s, continuing without it")
+                if not future.cancel():
+                    _track_overrun(name, future)
+                step.update(
+                    status="timeout",
+                    timeout=timeout,
+                    latency_ms=round((time.perf_counter() - started) * 1000, 2),
+                )
+            except Exception as exc:
+                logger.warning(f"{name} failed: {exc}")
+                step.update(
+                    status="error",
+                    error=str(exc),
+                    latency_ms=round((time.perf_counter() - started) * 1000, 2),
+                )
+            pipeline_steps.append(step)
+        return {
+            "nodes": list(aggregated_nodes.values()),
+            "stage_nodes": stage_nodes,
+            "steps": pipeline_steps,
+            "retrieval_latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
 
-        # Vector retrieval
-        if config.run_vector and self.vector_index is not None:
-            vector_retriever = VectorIndexRetriever(
-                self.vector_index,
-                similarity_top_k=config.top_k or self.default_top_k,
-            )
-            vector_nodes = vector_retriever.retrieve(query_bundle)
-            self._merge_nodes(aggregated_nodes, vector_nodes)
-            pipeline_steps.append(
-                {
-                    "step": "vector_retrieval",
-                    "node_count": len(vector_nodes),
-                    "config": {"top_k": config.top_k or self.default_top_k},
-                    "nodes": self._summarize_nodes(vector_nodes),
-                }
-            )
+    def stream(self, question: str, config: PipelineConfig, synthesizer) -> Iterator[Dict[str, Any]]:
+        """Yield the retrieved sources first, then answer tokens as the LLM produces them."""
+        retrieval = self.retrieve(question, config)
+        yield {"type": "sources", **retrieval}
 
-        aggregated_list = list(aggregated_nodes.values())
+        response = synthesizer.synthesize(QueryBundle(query_str=question), retrieval["nodes"])
+        response_gen = getattr(response, "response_gen", None)
+        if response_gen is None:  # synthesizer without streaming support
+            yield {"type": "token", "delta": str(response)}
+            return
+        for delta in response_gen:
+            yield {"type": "token", "delta": delta}
+
+    def run(self, question: str, config: PipelineConfig) -> Dict[str, Any]:
+        """Execute the pipeline synchronously."""
+        query_bundle = QueryBundle(query_str=question)
+        retrieval = self.retrieve(question, config)
+        pipeline_steps = retrieval["steps"]
+
+        if config.retrieve_only:
+            fused = self._fuse_nodes(retrieval["stage_nodes"], config.top_k or self.default_top_k)
+            return {
+                "response": None,
+                "source_nodes": fused,
+                "retrieved_nodes": fused,
+                "steps": pipeline_steps,
+                "retrieval_latency_ms": retrieval["retrieval_latency_ms"],
+                "tool_outputs": [],
+            }
+
+        aggregated_list = retrieval["nodes"]
         response = self.response_synthesizer.synthesize(query_bundle, aggregated_list)
         source_nodes = getattr(response, "source_nodes", aggregated_list)
 
@@ -226,6 +429,7 @@ class Neo4jRAGPipeline:
             "source_nodes": source_nodes,
             "retrieved_nodes": aggregated_list,
             "steps": pipeline_steps,
+            "retrieval_latency_ms": retrieval["retrieval_latency_ms"],
             "tool_outputs": tool_outputs,
         }
 
@@ -242,7 +446,10 @@ class Neo4jKnowledgeService:
         self.storage_context: Optional[StorageContext] = None
         self.knowledge_index = None
         self.vector_index: Optional[VectorStoreIndex] = None
+        self.ann_index: Optional[AnnIndex] = None
+        self._ann_backfill_task: Optional[asyncio.Task] = None
         self.response_synthesizer = None
+        self.streaming_synthesizer = None
         self.query_pipeline: Optional[Neo4jRAGPipeline] = None
 
         # tools / workflow
@@ -252,6 +459,14 @@ class Neo4jKnowledgeService:
         # ingestion pipelines
         self._pipeline_bundles: Dict[str, PipelineBundle] = {}
 
+        # answers cached until the knowledge base changes
+        self.answer_cache = SemanticQueryCache(
+            query_cache,
+            threshold=settings.knowledge_cache_similarity,
+            max_entries=settings.query_cache_max_entries,
+            enabled=settings.knowledge_cache_enabled,
+        )
+
         self._initialized = False
 
         # get timeout settings from config
@@ -350,6 +565,11 @@ class Neo4jKnowledgeService:
                 api_base=settings.openrouter_base_url,
                 timeout=self.operation_timeout,
             )
+        elif provider == "local":
+            return LocalHashEmbedding(
+                dimension=settings.vector_dimension,
+                model_name=settings.local_embedding_model,
+            )
         else:
             raise ValueError(f"Unsupported embedding provider: {provider}")
 
@@ -401,6 +621,7 @@ class Neo4jKnowledgeService:
             max_knowledge_sequence=30,
             verbose=settings.debug,
             vector_index=self.vector_index,
+            ann_index=self.ann_index,
         )
         self._register_tools()
 
@@ -571,10 +792,21 @@ class Neo4jKnowledgeService:
                 self.storage_context.vector_store,
                 embed_model=Settings.embed_model,
             )
+            if settings.ann_index_enabled:
+                self.ann_index = AnnIndex(settings.ann_index_path, nprobe=settings.ann_nprobe)
+                logger.info(f"Local ANN index loaded with {len(self.ann_index)} vectors")
+                if not self.ann_index.complete:
+                    # searches use the vector store until the backfill has run
+                    self._ann_backfill_task = asyncio.create_task(asyncio.to_thread(self._backfill_ann_index))
             self.response_synthesizer = get_response_synthesizer(
                 response_mode="tree_summarize",
                 llm=Settings.llm,
             )
+            self.streaming_synthesizer = get_response_synthesizer(
+                response_mode="tree_summarize",
+                llm=Settings.llm,
+                streaming=True,
+            )
 
             # Build both query pipeline (RAG) and ingestion pipelines (ETL)
             self._build_pipeline()
@@ -677,8 +909,9 @@ class Neo4jKnowledgeService:
         top_k: Optional[int] = None,
         graph_depth: Optional[int] = None,
         tool_kwargs: Optional[Dict[str, Any]] = None,
+        retrieve_only: bool = False,
     ) -> Dict[str, Any]:
-        """query knowledge graph"""
+        """query knowledge graph; retrieve_only returns fused source nodes without LLM synthesis"""
         if not self._initialized:
             raise Exception("Service not initialized")
         if self.query_pipeline is None:
@@ -694,9 +927,27 @@ class Neo4jKnowledgeService:
                 graph_depth=graph_depth,
                 tool_kwargs=tool_kwargs,
             )
+            config.retrieve_only = retrieve_only
         except ValueError as exc:
             return {"success": False, "error": str(exc)}
 
+        # tool calls may have side effects, so those queries always run
+        use_cache = self.answer_cache.enabled and not config.run_tools
+        cache_params = {
+            "mode": mode,
+            "graph": config.run_graph,
+            "vector": config.run_vector,
+            "top_k": config.top_k,
+            "graph_depth": config.graph_depth,
+            "retrieve_only": retrieve_only,
+        }
+        cache_key, question_embedding = None, None
+        if use_cache:
+            cache_key = self.answer_cache.make_key(question, cache_params)
+            cached, question_embedding, cache_level = await self._cached_answer(question, cache_key, cache_params)
+            if cached is not None:
+                return {**cached, "cache": cache_level}
+
         try:
             pipeline_result = await asyncio.wait_for(
                 asyncio.to_thread(
@@ -723,12 +974,13 @@ class Neo4jKnowledgeService:
 
         logger.info(f"Successfully answered query: {question[:50]}...")
 
-        return {
+        result = {
             "success": True,
-            "answer": str(response),
+            "answer": None if retrieve_only else str(response),
             "source_nodes": source_nodes,
             "retrieved_nodes": self._format_source_nodes(pipeline_result["retrieved_nodes"]),
             "pipeline_steps": pipeline_result["steps"],
+            "retrieval_latency_ms": pipeline_result["retrieval_latency_ms"],
             "tool_outputs": pipeline_result["tool_outputs"],
             "query_mode": mode,
             "config": {
@@ -737,20 +989,160 @@ class Neo4jKnowledgeService:
                 "tools": config.run_tools,
                 "top_k": config.top_k,
                 "graph_depth": config.graph_depth,
+                "retrieve_only": config.retrieve_only,
             },
         }
+        if use_cache:
+            self.answer_cache.set(cache_key, result, cache_params, question_embedding)
+        return result
+
+    async def stream_query(
+        self,
+        question: str,
+        mode: str = "hybrid",
+        *,
+        use_graph: Optional[bool] = None,
+        use_vector: Optional[bool] = None,
+        top_k: Optional[int] = None,
+        graph_depth: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a query as events: one 'sources' event once retrieval finishes,
+        'token' events while the answer is synthesized, then 'done' with the
+        full answer (or 'error').
+        """
+        if not self._initialized:
+            raise Exception("Service not initialized")
+        if self.query_pipeline is None:
+            raise Exception("Query pipeline is not available")
+
+        try:
+            config = self._resolve_pipeline_config(
+                mode,
+                use_graph=use_graph,
+                use_vector=use_vector,
+                top_k=top_k,
+                graph_depth=graph_depth,
+            )
+        except ValueError as exc:
+            yield {"type": "error", "error": str(exc)}
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+
+        def _produce() -> None:
+            try:
+                for event in self.query_pipeline.stream(question, config, self.streaming_synthesizer):
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except Exception as exc:
+                loop.call_soon_threadsafe(queue.put_nowait, {"type": "error", "error": str(exc)})
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        loop.run_in_executor(None, _produce)
+        deadline = loop.time() + self.operation_timeout
+        answer: List[str] = []
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    logger.error(f"Streaming query timed out after {self.operation_timeout}s")
+                    yield {"type": "error", "error": f"Query timed out after {self.operation_timeout}s"}
+                    return
+                if event is None:
+                    break
+                if event["type"] == "sources":
+                    yield {
+                        "type": "sources",
+                        "source_nodes": self._format_source_nodes(event["nodes"]),
+                        "pipeline_steps": event["steps"],
+                        "retrieval_latency_ms": event["retrieval_latency_ms"],
+                    }
+                elif event["type"] == "token":
+                    answer.append(event["delta"])
+                    yield event
+                else:
+                    yield event
+                    return
+            yield {"type": "done", "answer": "".join(answer), "query_mode": mode}
+        finally:
+            # stop synthesis if the client went away
+            stopped.set()
+
+    async def _cached_answer(
+        self, question: str, cache_key: str, cache_params: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]], str]:
+        """Exact, then semantic cache lookup; also returns the question embedding if one was computed."""
+        cached = self.answer_cache.get(cache_key)
+        if cached is not None or not self.answer_cache.semantic_enabled:
+            return cached, None, "exact"
+        try:
+            embedding = await asyncio.to_thread(Settings.embed_model.get_query_embedding, question)
+        except Exception as exc:
+            logger.warning(f"Question embedding for the answer cache failed: {exc}")
+            return None, None, "semantic"
+        return self.answer_cache.get_similar(embedding, cache_params), embedding, "semantic"
 
     # -----------------
     # Ingestion helpers
     # -----------------
 
+    def _index_nodes(self, nodes: List[Any], stored: Optional[Dict[str, List[float]]] = None) -> None:
+        """Add nodes to the local ANN index, embedding those that have no vector yet."""
+        if self.ann_index is None or not nodes:
+            return
+        stored = stored or {}
+        texts = [node.get_content() for node in nodes]
+        known = [node.embedding if node.embedding is not None else stored.get(node.node_id) for node in nodes]
+        missing = [i for i, vector in enumerate(known) if vector is None]
+        computed = iter(
+            Settings.embed_model.get_text_embedding_batch([texts[i] for i in missing])
+            if missing else []
+        )
+        vectors = [vector if vector is not None else next(computed) for vector in known]
+        self.ann_index.add(
+            [node.node_id for node in nodes],
+            vectors,
+            texts=texts,
+            metadatas=[dict(node.metadata or {}) for node in nodes],
+        )
+
+    def _backfill_ann_index(self) -> None:
+        """Upsert every stored node into the ANN index, then mark it complete."""
+        try:
+            docstore = self.storage_context.docstore
+            vector_data = getattr(self.storage_context.vector_store, "data", None)
+            stored = dict(getattr(vector_data, "embedding_dict", None) or {})
+            nodes = list(docstore.docs.values())
+            batch_size = max(1, settings.knowledge_write_batch_size)
+            for start in range(0, len(nodes), batch_size):
+                self._index_nodes(nodes[start:start + batch_size], stored)
+            if len(self.ann_index) >= AnnIndex.MIN_REBUILD_ROWS:
+                self.ann_index.build()
+            self.ann_index.mark_complete()
+            logger.info(f"Backfilled ANN index with {len(nodes)} stored nodes")
+        except Exception as exc:
+            logger.error(f"ANN index backfill failed, vector search stays on the vector store: {exc}")
+
     async def _run_ingestion_pipeline(
         self,
         pipeline_name: str,
         *,
         connector_overrides: Dict[str, Any],
         timeout: Optional[int] = None,
+        progress_callback: Optional[Callable[[Optional[float], str], None]] = None,
     ) -> Dict[str, Any]:
+        """
+        Stream a connector's documents through the pipeline. Documents are
+        parsed in worker processes window by window and written in batches;
+        each document is bounded by knowledge_document_timeout, the run as a
+        whole only by `timeout` when one is given.
+        """
         if pipeline_name not in self._pipeline_bundles:
             available_pipelines = ", ".join(self._pipeline_bundles.keys())
             raise ValueError(
@@ -759,43 +1151,37 @@ class Neo4jKnowledgeService:
         bundle = self._pipeline_bundles[pipeline_name]
         connector = bundle.instantiate_connector(**connector_overrides)
 
-        documents = await connector.aload_data()
-        documents = list(documents)
-        if not documents:
-            return {
-                "success": False,
-                "error": f"Pipeline '{pipeline_name}' produced no documents",
-            }
-
-        timeout = timeout or self.operation_timeout
-        total_chars = sum(len(doc.text) for doc in documents)
-        logger.info(
-            f"Running pipeline '{pipeline_name}' with {len(documents)} documents (total chars: {total_chars})"
+        def _write(nodes: List[Any]) -> None:
+            try:
+                bundle.writer.write(nodes)
+                self._index_nodes(nodes)
+            finally:
+                # cached answers are stale as soon as a batch may have landed, also
+                # when the run fails later or keeps writing after a timeout
+                self.answer_cache.invalidate()
+
+        executor = StreamingIngestionExecutor(
+            bundle.pipeline.transformations,
+            _write,
+            window_size=settings.knowledge_ingest_window,
+            max_workers=settings.knowledge_ingest_workers,
+            write_batch_size=settings.knowledge_write_batch_size,
+            document_timeout=settings.knowledge_document_timeout,
+            progress_callback=progress_callback,
         )
 
         def _process_pipeline() -> Dict[str, Any]:
-            nodes = bundle.pipeline.run(show_progress=False, documents=documents)
-            bundle.writer.write(nodes)
-            return {
-                "nodes_count": len(nodes),
-                "documents_count": len(documents),
-            }
-
-        try:
-            result = await asyncio.wait_for(
-                asyncio.to_thread(_process_pipeline),
-                timeout=timeout,
-            )
+            count = getattr(connector, "document_count", None)
+            expected = count() if callable(count) else None
             logger.info(
-                f"Pipeline '{pipeline_name}' completed with {result['nodes_count']} nodes"
+                f"Running pipeline '{pipeline_name}'"
+                + (f" over {expected} files" if expected is not None else "")
             )
-            return {
-                "success": True,
-                "pipeline": pipeline_name,
-                "documents_count": result["documents_count"],
-                "nodes_count": result["nodes_count"],
-                "total_chars": total_chars,
-            }
+            return executor.run(iter_connector_documents(connector), expected).as_dict()
+
+        try:
+            task = asyncio.to_thread(_process_pipeline)
+            result = await (asyncio.wait_for(task, timeout=timeout) if timeout else task)
         except asyncio.TimeoutError:
             error_msg = f"Pipeline '{pipeline_name}' execution timed out after {timeout}s"
             logger.error(error_msg)
@@ -804,6 +1190,24 @@ class Neo4jKnowledgeService:
             logger.error(f"Pipeline '{pipeline_name}' failed: {exc}")
             return {"success": False, "error": str(exc)}
 
+        if result["documents_count"] == 0:
+            return {
+                "success": False,
+                "error": f"Pipeline '{pipeline_name}' produced no documents",
+            }
+        if result["documents_count"] == len(result["failed_documents"]):
+            return {
+                "success": False,
+                "error": f"Pipeline '{pipeline_name}' failed on every document: {result['failed_documents'][0]['error']}",
+                **result,
+            }
+
+        logger.info(
+            f"Pipeline '{pipeline_name}' completed with {result['nodes_count']} nodes "
+            f"from {result['documents_count']} documents ({result['documents_per_second']} docs/s)"
+        )
+        return {"success": True, "pipeline": pipeline_name, **result}
+
     async def add_document(
         self,
         content: str,
@@ -850,6 +1254,7 @@ class Neo4jKnowledgeService:
         result = await self._run_ingestion_pipeline(
             "file",
             connector_overrides={"file_path": absolute_path},
+            timeout=self.operation_timeout,
         )
 
         if result.get("success"):
@@ -866,8 +1271,9 @@ class Neo4jKnowledgeService:
         directory_path: str,
         recursive: bool = True,
         file_extensions: List[str] = None,
+        progress_callback: Optional[Callable[[Optional[float], str], None]] = None,
     ) -> Dict[str, Any]:
-        """batch add files in directory"""
+        """batch add files in directory, reporting per-document progress to progress_callback"""
         if not self._initialized:
             raise Exception("Service not initialized")
 
@@ -882,6 +1288,7 @@ class Neo4jKnowledgeService:
         result = await self._run_ingestion_pipeline(
             "directory",
             connector_overrides=overrides,
+            progress_callback=progress_callback,
         )
 
         if result.get("success"):
@@ -929,6 +1336,13 @@ class Neo4jKnowledgeService:
             raise Exception("Service not initialized")
 
         try:
+            if self.ann_index is not None and self.ann_index.complete:
+                nodes = await asyncio.wait_for(
+                    asyncio.to_thread(self.query_pipeline._ann_retrieve, query, top_k),
+                    timeout=self.operation_timeout,
+                )
+                return {"success": True, "results": self._format_source_nodes(nodes), "query": query}
+
             # use retriever for vector search, add timeout control
             retriever = self.knowledge_index.as_retriever(
                 similarity_top_k=top_k,
@@ -982,6 +1396,7 @@ class Neo4jKnowledgeService:
                     "default_graph_depth": getattr(self.query_pipeline, "default_graph_depth", None),
                     "supports_tools": bool(self.function_tools),
                 },
+                "query_cache": self.answer_cache.stats(),
             }
 
             if self.graph_store is None:
@@ -1040,10 +1455,16 @@ class Neo4jKnowledgeService:
                         except Exception as exc:  # pragma: no cover - defensive logging
                             logger.warning(f"Vector store clear failed: {exc}")
 
+                if self.ann_index is not None:
+                    self.ann_index.clear()
+                    # an empty index covers the now empty knowledge base
+                    self.ann_index.mark_complete()
+
             await asyncio.to_thread(_clear_sync)
 
         try:
             await asyncio.wait_for(_clear_graph(), timeout=self.operation_timeout)
+            self.answer_cache.invalidate()
 
             # Recreate storage context and indexes to reflect cleared state
             self.storage_context = StorageContext.from_defaults(graph_store=self.graph_store)
@@ -1108,7 +1529,7 @@ class Neo4jKnowledgeService:
         output_path = Path(output_path)
         try:
             export_result = await asyncio.wait_for(
-                asyncio.to_thread(self.graph_store.export_graph, str(output_path)),
+                asyncio.to_thread(self._export_graph_sync, output_path),
                 timeout=self.operation_timeout,
             )
 
@@ -1122,6 +1543,23 @@ class Neo4jKnowledgeService:
             logger.error(f"Failed to export graph: {e}")
             return {"success": False, "error": str(e)}
 
+    def _export_graph_sync(self, output_path: Path) -> Dict[str, int]:
+        """stream all nodes, then all relationships, to an NDJSON file"""
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        counts = {"nodes": 0, "relationships": 0}
+        with self.graph_store.client.session(
+            database=settings.neo4j_database,
+            fetch_size=settings.neo4j_fetch_size,
+            default_access_mode=READ_ACCESS,
+        ) as session, open(output_path, "w", encoding="utf-8") as f:
+            for row in iter_records(session, "MATCH (n) RETURN n"):
+                f.write(to_json_line({"kind": "node", **row["n"]}))
+                counts["nodes"] += 1
+            for row in iter_records(session, "MATCH ()-[r]->() RETURN r"):
+                f.write(to_json_line({"kind": "relationship", **row["r"]}))
+                counts["relationships"] += 1
+        return counts
+
     async def close(self) -> None:
         """close service"""
         if self.graph_store:
@@ -1129,3 +1567,6 @@ class Neo4jKnowledgeService:
         self._initialized = False
         logger.info("Neo4j Knowledge Service closed")
 
+
+# global service instance
+neo4j_knowledge_service = Neo4jKnowledgeService()
@@ -8,7 +8,7 @@ import time
 from dataclasses import dataclass
 from importlib import import_module
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Type
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Type
 
 from llama_index.core import Document
 from llama_index.core.ingestion import IngestionPipeline
@@ -111,21 +111,35 @@ class SimpleDirectoryConnector(BaseConnector):
         self._recursive = recursive
         self._file_extensions = list(file_extensions or [])
         self._reader_kwargs = reader_kwargs or {}
+        self._reader = None
+
+    def _get_reader(self):
+        if self._reader is None:
+            from llama_index.core import SimpleDirectoryReader
+
+            file_extractor = None
+            if self._file_extensions:
+                file_extractor = {ext: None for ext in self._file_extensions}
+
+            self._reader = SimpleDirectoryReader(
+                input_dir=str(self._directory_path),
+                recursive=self._recursive,
+                file_extractor=file_extractor,
+                **self._reader_kwargs,
+            )
+        return self._reader
 
     def load_data(self) -> Sequence[Document]:
-        from llama_index.core import SimpleDirectoryReader
+        return self._get_reader().load_data()
 
-        file_extractor = None
-        if self._file_extensions:
-            file_extractor = {ext: None for ext in self._file_extensions}
+    def iter_documents(self) -> Iterator[Document]:
+        """Read files one at a time instead of loading the whole directory."""
+        for documents in self._get_reader().iter_data():
+            yield from documents
 
-        reader = SimpleDirectoryReader(
-            input_dir=str(self._directory_path),
-            recursive=self._recursive,
-            file_extractor=file_extractor,
-            **self._reader_kwargs,
-        )
-        return reader.load_data()
+    def document_count(self) -> int:
+        """Number of files to read (a file may yield several documents)."""
+        return len(self._get_reader().input_files)
 
     async def aload_data(self) -> Sequence[Document]:
         return await asyncio.to_thread(self.load_data)
@@ -176,6 +190,13 @@ class PipelineBundle:
         return self.connector_cls(**params)
 
 
+def iter_connector_documents(connector: BaseConnector) -> Iterator[Document]:
+    """Documents of a connector, lazily when it supports iter_documents()."""
+    if hasattr(connector, "iter_documents"):
+        return connector.iter_documents()
+    return iter(connector.load_data())
+
+
 def import_from_string(dotted_path: str) -> Any:
     """Import a class from a dotted module path."""
 
@@ -1,7 +1,13 @@
-from typing import List
+from typing import List, Dict, Optional, Tuple
+from array import array
+from pathlib import Path
 import asyncio
+import hashlib
+import sqlite3
 from loguru import logger
 
+from codebase_rag.config import settings
+from codebase_rag.services.utils.hashed_embedding import HashedNgramEmbedder
 from .base import EmbeddingGenerator
 
 class OpenAIEmbeddingGenerator(EmbeddingGenerator):
@@ -55,14 +61,25 @@ class OpenAIEmbeddingGenerator(EmbeddingGenerator):
 class OllamaEmbeddingGenerator(EmbeddingGenerator):
     """Ollama local embedding generator"""
     
-    def __init__(self, host: str = "http://localhost:11434", model: str = "nomic-embed-text"):
+    def __init__(self, host: str = "http://localhost:11434", model: str = "nomic-embed-text",
+                 max_concurrency: Optional[int] = None):
         self.host = host.rstrip('/')
         self.model = model
+        self.max_concurrency = max(1, max_concurrency or settings.embedding_max_concurrency)
+        self._session = None
     
-    async def generate_embedding(self, text: str) -> List[float]:
-        """generate single text embedding vector"""
+    async def _get_session(self):
+        """shared HTTP session; its connector bounds the requests in flight"""
         import aiohttp
         
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+            )
+        return self._session
+    
+    async def generate_embedding(self, text: str) -> List[float]:
+        """generate single text embedding vector"""
         url = f"{self.host}/api/embeddings"
         payload = {
             "model": self.model,
@@ -70,14 +87,14 @@ class OllamaEmbeddingGenerator(EmbeddingGenerator):
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result["embedding"]
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"Ollama API error {response.status}: {error_text}")
+            session = await self._get_session()
+            async with session.post(url, json=payload) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return result["embedding"]
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"Ollama API error {response.status}: {error_text}")
                         
         except Exception as e:
             logger.error(f"Failed to generate Ollama embedding: {e}")
@@ -85,7 +102,7 @@ class OllamaEmbeddingGenerator(EmbeddingGenerator):
     
     async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """batch generate embedding vectors"""
-        # Ollama usually needs to make individual requests, we use concurrency to improve performance
+        # Ollama embeds one prompt per request; at most max_concurrency run at once
         tasks = [self.generate_embedding(text) for text in texts]
         
         try:
@@ -95,6 +112,12 @@ class OllamaEmbeddingGenerator(EmbeddingGenerator):
         except Exception as e:
             logger.error(f"Failed to generate Ollama embeddings: {e}")
             raise
+    
+    async def close(self):
+        """close the shared HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
 class OpenRouterEmbeddingGenerator(EmbeddingGenerator):
     """OpenRouter embedding generator"""
@@ -153,6 +176,165 @@ class OpenRouterEmbeddingGenerator(EmbeddingGenerator):
             logger.error(f"Failed to generate OpenRouter embeddings: {e}")
             raise
 
+class LocalEmbeddingGenerator(EmbeddingGenerator):
+    """Deterministic hashed n-gram embeddings computed in-process"""
+    
+    def __init__(self, dimension: Optional[int] = None, model: str = "hashed-ngram"):
+        self.model = model
+        self.embedder = HashedNgramEmbedder(dimension or settings.vector_dimension)
+        self.dimension = self.embedder.dimension
+        self.ngram_range = self.embedder.ngram_range
+    
+    async def generate_embedding(self, text: str) -> List[float]:
+        """generate single text embedding vector"""
+        return self.embedder.embed_one(text)
+    
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """batch generate embedding vectors"""
+        return self.embedder.embed(texts).tolist()
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by (model, sha256(text)), vectors stored as float32"""
+    
+    # stay below SQLite's bound variable limit
+    MAX_LOOKUP = 500
+    
+    def __init__(self, db_path: str = "data/embeddings.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_database()
+    
+    def _init_database(self):
+        """initialize database table"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+            conn.commit()
+    
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """cached vectors of the given text hashes"""
+        found = {}
+        with sqlite3.connect(self.db_path) as conn:
+            for i in range(0, len(hashes), self.MAX_LOOKUP):
+                chunk = hashes[i:i + self.MAX_LOOKUP]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk]
+                )
+                for text_hash, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[text_hash] = vector.tolist()
+        return found
+    
+    def put_many(self, model: str, vectors: Dict[str, List[float]]):
+        """store vectors by text hash"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model, text_hash, array('f', vector).tobytes()) for text_hash, vector in vectors.items()]
+            )
+            conn.commit()
+
+class BatchingEmbeddingGenerator(EmbeddingGenerator):
+    """
+    Wraps an embedding generator with a persistent cache, deduplication,
+    micro-batches of at most batch_size texts and at most max_concurrency
+    batches in flight. Texts already in the cache cost no embedding call.
+    
+    Cache entries are namespaced by the generator class and every attribute
+    that shapes its vectors (model, dimension, n-gram range), and cached
+    vectors of the wrong length are treated as misses.
+    """
+    
+    # generator attributes that change the vectors produced for a text
+    CACHE_KEY_ATTRIBUTES = ("model", "dimension", "ngram_range")
+    
+    def __init__(self, generator: EmbeddingGenerator, batch_size: Optional[int] = None,
+                 max_concurrency: Optional[int] = None, cache: Optional[EmbeddingCache] = None):
+        self.generator = generator
+        self.batch_size = max(1, batch_size or settings.embedding_batch_size)
+        self.max_concurrency = max(1, max_concurrency or settings.embedding_max_concurrency)
+        self.cache = cache
+        self.dimension = getattr(generator, 'dimension', None)
+        self.model = ":".join([type(generator).__name__] + [
+            f"{name}={getattr(generator, name)}"
+            for name in self.CACHE_KEY_ATTRIBUTES if getattr(generator, name, None) is not None
+        ])
+    
+    async def generate_embedding(self, text: str) -> List[float]:
+        """generate single text embedding vector"""
+        embedding = (await self.generate_embeddings([text]))[0]
+        if embedding is None:
+            raise Exception("Failed to generate embedding")
+        return embedding
+    
+    async def generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """embeddings in input order; None for texts that could not be embedded"""
+        hashes = [EmbeddingCache.text_hash(text) for text in texts]
+        
+        vectors: Dict[str, List[float]] = {}
+        if self.cache is not None:
+            try:
+                vectors = await asyncio.to_thread(self.cache.get_many, self.model, list(set(hashes)))
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed: {e}")
+            if self.dimension:
+                vectors = {h: vector for h, vector in vectors.items() if len(vector) == self.dimension}
+        
+        missing = list({h: text for h, text in zip(hashes, texts) if h not in vectors}.items())
+        if missing:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+            generated: Dict[str, List[float]] = {}
+            for result in await asyncio.gather(*(self._embed_batch(batch, semaphore) for batch in batches)):
+                generated.update(result)
+            vectors.update(generated)
+            
+            if self.cache is not None and generated:
+                try:
+                    await asyncio.to_thread(self.cache.put_many, self.model, generated)
+                except Exception as e:
+                    logger.warning(f"Embedding cache store failed: {e}")
+        
+        logger.debug(f"Embeddings: {len(texts)} texts, {len(set(hashes)) - len(missing)} cached, {len(missing)} generated")
+        return [vectors.get(h) for h in hashes]
+    
+    async def _embed_batch(self, batch: List[Tuple[str, str]], semaphore: asyncio.Semaphore) -> Dict[str, List[float]]:
+        """embed one micro-batch, one text at a time if the batch request fails"""
+        async with semaphore:
+            try:
+                embeddings = await self.generator.generate_embeddings([text for _, text in batch])
+                return {h: embedding for (h, _), embedding in zip(batch, embeddings)}
+            except Exception as e:
+                logger.warning(f"Embedding batch of {len(batch)} texts failed, retrying one by one: {e}")
+            
+            result = {}
+            for h, text in batch:
+                try:
+                    result[h] = await self.generator.generate_embedding(text)
+                except Exception as e:
+                    logger.warning(f"Failed to generate embedding: {e}")
+            return result
+    
+    async def close(self):
+        """close the wrapped generator's HTTP session, if it has one"""
+        close = getattr(self.generator, "close", None)
+        if close is not None:
+            await close()
+
 class EmbeddingGeneratorFactory:
     """embedding generator factory"""
 
@@ -180,11 +362,17 @@ class EmbeddingGeneratorFactory:
             model = config.get("model", "text-embedding-ada-002")
             return OpenRouterEmbeddingGenerator(api_key=api_key, model=model)
 
+        elif provider == "local":
+            dimension = config.get("dimension", settings.vector_dimension)
+            model = config.get("model", "hashed-ngram")
+            return LocalEmbeddingGenerator(dimension=dimension, model=model)
+
         else:
             raise ValueError(f"Unsupported embedding provider: {provider}")
 
 # default embedding generator (can be modified through configuration)
 default_embedding_generator = None
+embedding_cache = None
 
 def get_default_embedding_generator() -> EmbeddingGenerator:
     """get default embedding generator"""
@@ -196,6 +384,22 @@ def get_default_embedding_generator() -> EmbeddingGenerator:
 
     return default_embedding_generator
 
+async def close_default_embedding_generator():
+    """close the default embedding generator's HTTP session on shutdown"""
+    close = getattr(default_embedding_generator, "close", None)
+    if close is not None:
+        await close()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """shared embedding cache, or None when disabled"""
+    global embedding_cache
+    
+    if not settings.embedding_cache_enabled:
+        return None
+    if embedding_cache is None:
+        embedding_cache = EmbeddingCache(settings.embedding_cache_path)
+    return embedding_cache
+
 def set_default_embedding_generator(generator: EmbeddingGenerator):
     """set default embedding generator"""
     global default_embedding_generator
@@ -8,7 +8,7 @@ from .base import (
 )
 from .loaders import loader_registry
 from .transformers import transformer_registry
-from .embeddings import get_default_embedding_generator
+from .embeddings import get_default_embedding_generator, get_embedding_cache, BatchingEmbeddingGenerator
 from .storers import storer_registry, setup_default_storers
 
 class KnowledgePipeline:
@@ -19,7 +19,10 @@ class KnowledgePipeline:
                  default_storer="hybrid",
                  chunk_size: int = 512,
                  chunk_overlap: int = 50):
-        self.embedding_generator = embedding_generator or get_default_embedding_generator()
+        embedding_generator = embedding_generator or get_default_embedding_generator()
+        if not isinstance(embedding_generator, BatchingEmbeddingGenerator):
+            embedding_generator = BatchingEmbeddingGenerator(embedding_generator, cache=get_embedding_cache())
+        self.embedding_generator = embedding_generator
         self.default_storer = default_storer
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
@@ -285,26 +288,17 @@ class KnowledgePipeline:
         if not chunks:
             return
         
-        # batch generate embeddings
+        # cached, micro-batched generation; failed texts come back as None
         texts = [chunk.content for chunk in chunks]
         
         try:
             embeddings = await self.embedding_generator.generate_embeddings(texts)
-            
-            # assign embeddings to corresponding chunks
-            for chunk, embedding in zip(chunks, embeddings):
-                chunk.embedding = embedding
-                
         except Exception as e:
             logger.warning(f"Failed to generate embeddings: {e}")
-            # 如果批量生成失败，尝试逐个生成
-            for chunk in chunks:
-                try:
-                    embedding = await self.embedding_generator.generate_embedding(chunk.content)
-                    chunk.embedding = embedding
-                except Exception as e:
-                    logger.warning(f"Failed to generate embedding for chunk {chunk.id}: {e}")
-                    chunk.embedding = None
+            embeddings = [None] * len(chunks)
+        
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk.embedding = embedding
     
     def get_stats(self) -> Dict[str, Any]:
         """get processing statistics"""
@@ -2,6 +2,7 @@ from typing import List, Dict, Any
 from loguru import logger
 
 from .base import DataStorer, ProcessedChunk, ExtractedRelation
+from codebase_rag.services.code.graph_service import GraphNode, GraphRelationship
 
 class Neo4jRelationStorer(DataStorer):
     """Neo4j graph database storer"""
@@ -15,34 +16,27 @@ class Neo4jRelationStorer(DataStorer):
             return {"success": True, "stored_count": 0}
         
         try:
-            stored_count = 0
-            
-            for chunk in chunks:
-                # build node data
-                node_data = {
-                    "id": chunk.id,
-                    "source_id": chunk.source_id,
-                    "chunk_type": chunk.chunk_type.value,
-                    "title": chunk.title or "",
-                    "content": chunk.content[:1000],  # limit content length
-                    "summary": chunk.summary or "",
-                    **chunk.metadata
-                }
-                
-                # determine node label based on chunk type
-                node_label = self._get_node_label(chunk.chunk_type.value)
-                
-                # create node
-                result = await self.graph_service.create_node(
-                    label=node_label,
-                    properties=node_data
+            nodes = [
+                GraphNode(
+                    id=chunk.id,
+                    labels=[self._get_node_label(chunk.chunk_type.value)],
+                    properties={
+                        "source_id": chunk.source_id,
+                        "chunk_type": chunk.chunk_type.value,
+                        "title": chunk.title or "",
+                        "content": chunk.content[:1000],  # limit content length
+                        "summary": chunk.summary or "",
+                        **chunk.metadata
+                    }
                 )
-                
-                if result.get("success"):
-                    stored_count += 1
-                    logger.debug(f"Stored chunk {chunk.id} as {node_label} node in Neo4j")
-                else:
-                    logger.warning(f"Failed to store chunk {chunk.id}: {result.get('error')}")
+                for chunk in chunks
+            ]
+            
+            # one UNWIND write per label and batch
+            result = await self.graph_service.batch_create_nodes(nodes)
+            stored_count = result.get("created_count", 0)
+            for error in result.get("errors", []):
+                logger.warning(f"Failed to store chunks: {error}")
             
             logger.info(f"Successfully stored {stored_count}/{len(chunks)} chunks to Neo4j")
             
@@ -68,22 +62,24 @@ class Neo4jRelationStorer(DataStorer):
             return {"success": True, "stored_count": 0}
         
         try:
-            stored_count = 0
-            
-            for relation in relations:
-                # create relationship
-                result = await self.graph_service.create_relationship(
-                    from_node_id=relation.from_entity,
-                    to_node_id=relation.to_entity,
-                    relationship_type=relation.relation_type,
-                    properties=relation.properties
+            rels = [
+                GraphRelationship(
+                    start_node=relation.from_entity,
+                    end_node=relation.to_entity,
+                    type=relation.relation_type,
+                    properties=relation.properties,
+                    # same labels store_chunks writes, so endpoints are matched by index seek
+                    start_label=self._get_entity_label(relation.properties.get("from_type")),
+                    end_label=self._get_entity_label(relation.properties.get("to_type"))
                 )
-                
-                if result.get("success"):
-                    stored_count += 1
-                    logger.debug(f"Created relation {relation.from_entity} -> {relation.to_entity}")
-                else:
-                    logger.warning(f"Failed to create relation {relation.id}: {result.get('error')}")
+                for relation in relations
+            ]
+            
+            # one UNWIND write per relationship type and batch
+            result = await self.graph_service.batch_create_relationships(rels)
+            stored_count = result.get("relationships_created", 0)
+            for error in result.get("errors", []):
+                logger.warning(f"Failed to store relations: {error}")
             
             logger.info(f"Successfully stored {stored_count}/{len(relations)} relations to Neo4j")
             
@@ -116,6 +112,20 @@ class Neo4jRelationStorer(DataStorer):
             "document_section": "Section"
         }
         return label_map.get(chunk_type, "Chunk")
+    
+    def _get_entity_label(self, entity_type: str) -> str:
+        """Neo4j label of a relation endpoint, by its from_type/to_type"""
+        type_map = {
+            "function": "code_function",
+            "class": "code_class",
+            "file": "code_module",
+            "module": "code_module",
+            "table": "sql_table",
+            "schema": "sql_schema",
+            "endpoint": "api_endpoint",
+            "section": "document_section"
+        }
+        return self._get_node_label(type_map.get(entity_type or "", ""))
 
 class StorerRegistry:
     """storer registry"""
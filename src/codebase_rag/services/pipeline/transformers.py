@@ -1,8 +1,15 @@
 from typing import List, Dict, Any, Optional, Tuple
 import re
 import ast
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from loguru import logger
 
+from codebase_rag.config import settings
+from codebase_rag.services.utils.worker_processes import get_worker_context
+
 from .base import (
     DataTransformer, DataSource, DataSourceType, ProcessingResult,
     ProcessedChunk, ExtractedRelation, ChunkType
@@ -162,6 +169,69 @@ class DocumentTransformer(DataTransformer):
         
         return chunks
 
+class _PythonModuleVisitor(ast.NodeVisitor):
+    """
+    Collects chunks and relations of a Python module in one traversal.
+    The file is split into lines once; each call is attributed to its
+    innermost enclosing function, and definitions get a qualified name
+    from the enclosing class/function scope (e.g. "Reader.read.inner").
+    """
+    
+    def __init__(self, transformer: "CodeTransformer", data_source: DataSource, content: str):
+        self.transformer = transformer
+        self.data_source = data_source
+        self.lines = content.split('\n')
+        self.scope: List[str] = []
+        # (name, qualified name, callees seen) of the innermost function
+        self.function: Optional[Tuple[str, str, set]] = None
+        self.chunks: List[ProcessedChunk] = []
+        self.imports: List[ExtractedRelation] = []
+        self.relations: List[ExtractedRelation] = []
+    
+    def _qualified(self, name: str) -> str:
+        return '.'.join(self.scope + [name])
+    
+    def visit_FunctionDef(self, node):
+        qualified_name = self._qualified(node.name)
+        self.chunks.append(self.transformer._extract_function_chunk(self.data_source, self.lines, node, qualified_name))
+        
+        outer = self.function
+        self.function = (node.name, qualified_name, set())
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+        self.function = outer
+    
+    visit_AsyncFunctionDef = visit_FunctionDef
+    
+    def visit_ClassDef(self, node):
+        qualified_name = self._qualified(node.name)
+        self.chunks.append(self.transformer._extract_class_chunk(self.data_source, self.lines, node, qualified_name))
+        self.relations.extend(self.transformer._extract_class_relations(self.data_source, node, qualified_name))
+        
+        # class bodies are not functions: calls there are not attributed to an enclosing function
+        outer = self.function
+        self.function = None
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+        self.function = outer
+    
+    def visit_Call(self, node):
+        if self.function is not None and isinstance(node.func, ast.Name):
+            name, qualified_name, callees = self.function
+            if node.func.id not in callees:
+                callees.add(node.func.id)
+                self.relations.append(
+                    self.transformer._extract_call_relation(self.data_source, name, node.func.id, qualified_name)
+                )
+        self.generic_visit(node)
+    
+    def visit_Import(self, node):
+        self.imports.extend(self.transformer._extract_python_imports(self.data_source, node))
+    
+    visit_ImportFrom = visit_Import
+
 class CodeTransformer(DataTransformer):
     """code transformer"""
     
@@ -170,22 +240,34 @@ class CodeTransformer(DataTransformer):
         return data_source.type == DataSourceType.CODE
     
     async def transform(self, data_source: DataSource, content: str) -> ProcessingResult:
-        """transform code to chunks and relations"""
+        """transform code to chunks and relations (parsed off the event loop by code_parse_pool)"""
+        try:
+            return await code_parse_pool.parse(data_source, content)
+        except Exception as e:
+            logger.error(f"Failed to transform code {data_source.name}: {e}")
+            return ProcessingResult(
+                source_id=data_source.id,
+                success=False,
+                error_message=str(e)
+            )
+
+    def parse(self, data_source: DataSource, content: str) -> ProcessingResult:
+        """parse code to chunks and relations synchronously (CPU-bound)"""
         try:
             language = data_source.metadata.get("language", "unknown")
 
             if language == "python":
-                return await self._transform_python_code(data_source, content)
+                return self._transform_python_code(data_source, content)
             elif language in ["javascript", "typescript"]:
-                return await self._transform_js_code(data_source, content)
+                return self._transform_js_code(data_source, content)
             elif language == "java":
-                return await self._transform_java_code(data_source, content)
+                return self._transform_java_code(data_source, content)
             elif language == "php":
-                return await self._transform_php_code(data_source, content)
+                return self._transform_php_code(data_source, content)
             elif language == "go":
-                return await self._transform_go_code(data_source, content)
+                return self._transform_go_code(data_source, content)
             else:
-                return await self._transform_generic_code(data_source, content)
+                return self._transform_generic_code(data_source, content)
 
         except Exception as e:
             logger.error(f"Failed to transform code {data_source.name}: {e}")
@@ -195,53 +277,29 @@ class CodeTransformer(DataTransformer):
                 error_message=str(e)
             )
     
-    async def _transform_python_code(self, data_source: DataSource, content: str) -> ProcessingResult:
-        """transform Python code"""
-        chunks = []
-        relations = []
-
+    def _transform_python_code(self, data_source: DataSource, content: str) -> ProcessingResult:
+        """transform Python code in a single pass over the AST"""
         try:
             # use AST to parse Python code
             tree = ast.parse(content)
-
-            # Extract imports FIRST (file-level relationships)
-            import_relations = self._extract_python_imports(data_source, tree)
-            relations.extend(import_relations)
-
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    # extract function
-                    func_chunk = self._extract_function_chunk(data_source, content, node)
-                    chunks.append(func_chunk)
-
-                    # extract function call relations
-                    func_relations = self._extract_function_relations(data_source, node)
-                    relations.extend(func_relations)
-
-                elif isinstance(node, ast.ClassDef):
-                    # extract class
-                    class_chunk = self._extract_class_chunk(data_source, content, node)
-                    chunks.append(class_chunk)
-
-                    # extract class inheritance relations
-                    class_relations = self._extract_class_relations(data_source, node)
-                    relations.extend(class_relations)
-
-            return ProcessingResult(
-                source_id=data_source.id,
-                success=True,
-                chunks=chunks,
-                relations=relations,
-                metadata={"transformer": "CodeTransformer", "language": "python"}
-            )
-
         except SyntaxError as e:
             logger.warning(f"Python syntax error in {data_source.name}, falling back to generic parsing: {e}")
-            return await self._transform_generic_code(data_source, content)
+            return self._transform_generic_code(data_source, content)
+
+        visitor = _PythonModuleVisitor(self, data_source, content)
+        visitor.visit(tree)
+
+        return ProcessingResult(
+            source_id=data_source.id,
+            success=True,
+            chunks=visitor.chunks,
+            # file-level imports first, as before
+            relations=visitor.imports + visitor.relations,
+            metadata={"transformer": "CodeTransformer", "language": "python"}
+        )
     
-    def _extract_function_chunk(self, data_source: DataSource, content: str, node: ast.FunctionDef) -> ProcessedChunk:
+    def _extract_function_chunk(self, data_source: DataSource, lines: List[str], node: ast.AST, qualified_name: str) -> ProcessedChunk:
         """extract function code chunk"""
-        lines = content.split('\n')
         start_line = node.lineno - 1
         end_line = node.end_lineno if hasattr(node, 'end_lineno') else start_line + 1
         
@@ -259,6 +317,8 @@ class CodeTransformer(DataTransformer):
             summary=docstring or f"Function {node.name} with parameters: {', '.join(args)}",
             metadata={
                 "function_name": node.name,
+                "qualified_name": qualified_name,
+                "is_async": isinstance(node, ast.AsyncFunctionDef),
                 "parameters": args,
                 "line_start": start_line + 1,
                 "line_end": end_line,
@@ -267,9 +327,8 @@ class CodeTransformer(DataTransformer):
             }
         )
     
-    def _extract_class_chunk(self, data_source: DataSource, content: str, node: ast.ClassDef) -> ProcessedChunk:
+    def _extract_class_chunk(self, data_source: DataSource, lines: List[str], node: ast.ClassDef, qualified_name: str) -> ProcessedChunk:
         """extract class code chunk"""
-        lines = content.split('\n')
         start_line = node.lineno - 1
         end_line = node.end_lineno if hasattr(node, 'end_lineno') else start_line + 1
         
@@ -278,7 +337,7 @@ class CodeTransformer(DataTransformer):
         # extract class information
         docstring = ast.get_docstring(node)
         base_classes = [base.id for base in node.bases if isinstance(base, ast.Name)]
-        methods = [n.name for n in node.body if isinstance(n, ast.FunctionDef)]
+        methods = [n.name for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
         
         return ProcessedChunk(
             source_id=data_source.id,
@@ -288,6 +347,7 @@ class CodeTransformer(DataTransformer):
             summary=docstring or f"Class {node.name} with methods: {', '.join(methods)}",
             metadata={
                 "class_name": node.name,
+                "qualified_name": qualified_name,
                 "base_classes": base_classes,
                 "methods": methods,
                 "line_start": start_line + 1,
@@ -297,28 +357,21 @@ class CodeTransformer(DataTransformer):
             }
         )
     
-    def _extract_function_relations(self, data_source: DataSource, node: ast.FunctionDef) -> List[ExtractedRelation]:
-        """extract function call relations"""
-        relations = []
-        
-        for child in ast.walk(node):
-            if isinstance(child, ast.Call) and isinstance(child.func, ast.Name):
-                # function call relation
-                relation = ExtractedRelation(
-                    source_id=data_source.id,
-                    from_entity=node.name,
-                    to_entity=child.func.id,
-                    relation_type="CALLS",
-                    properties={
-                        "from_type": "function",
-                        "to_type": "function"
-                    }
-                )
-                relations.append(relation)
-        
-        return relations
+    def _extract_call_relation(self, data_source: DataSource, caller: str, callee: str, qualified_name: str) -> ExtractedRelation:
+        """extract function call relation"""
+        return ExtractedRelation(
+            source_id=data_source.id,
+            from_entity=caller,
+            to_entity=callee,
+            relation_type="CALLS",
+            properties={
+                "from_type": "function",
+                "to_type": "function",
+                "from_qualified_name": qualified_name
+            }
+        )
     
-    def _extract_class_relations(self, data_source: DataSource, node: ast.ClassDef) -> List[ExtractedRelation]:
+    def _extract_class_relations(self, data_source: DataSource, node: ast.ClassDef, qualified_name: str) -> List[ExtractedRelation]:
         """extract class inheritance relations"""
         relations = []
 
@@ -331,16 +384,17 @@ class CodeTransformer(DataTransformer):
                     relation_type="INHERITS",
                     properties={
                         "from_type": "class",
-                        "to_type": "class"
+                        "to_type": "class",
+                        "from_qualified_name": qualified_name
                     }
                 )
                 relations.append(relation)
 
         return relations
 
-    def _extract_python_imports(self, data_source: DataSource, tree: ast.AST) -> List[ExtractedRelation]:
+    def _extract_python_imports(self, data_source: DataSource, node: ast.AST) -> List[ExtractedRelation]:
         """
-        Extract Python import statements and create IMPORTS relationships.
+        Create IMPORTS relationships for one import statement.
 
         Handles:
         - import module
@@ -352,64 +406,63 @@ class CodeTransformer(DataTransformer):
         """
         relations = []
 
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                # Handle: import module [as alias]
-                for alias in node.names:
-                    module_name = alias.name
-                    relation = ExtractedRelation(
-                        source_id=data_source.id,
-                        from_entity=data_source.source_path or data_source.name,
-                        to_entity=module_name,
-                        relation_type="IMPORTS",
-                        properties={
-                            "from_type": "file",
-                            "to_type": "module",
-                            "import_type": "import",
-                            "alias": alias.asname if alias.asname else None,
-                            "module": module_name
-                        }
-                    )
-                    relations.append(relation)
-
-            elif isinstance(node, ast.ImportFrom):
-                # Handle: from module import name [as alias]
-                module_name = node.module if node.module else ""
-                level = node.level  # 0=absolute, 1+=relative (. or ..)
-
-                # Construct full module path for relative imports
-                if level > 0:
-                    # Relative import (from . import or from .. import)
-                    relative_prefix = "." * level
-                    full_module = f"{relative_prefix}{module_name}" if module_name else relative_prefix
-                else:
-                    full_module = module_name
+        if isinstance(node, ast.Import):
+            # Handle: import module [as alias]
+            for alias in node.names:
+                module_name = alias.name
+                relation = ExtractedRelation(
+                    source_id=data_source.id,
+                    from_entity=data_source.source_path or data_source.name,
+                    to_entity=module_name,
+                    relation_type="IMPORTS",
+                    properties={
+                        "from_type": "file",
+                        "to_type": "module",
+                        "import_type": "import",
+                        "alias": alias.asname if alias.asname else None,
+                        "module": module_name
+                    }
+                )
+                relations.append(relation)
 
-                for alias in node.names:
-                    imported_name = alias.name
+        elif isinstance(node, ast.ImportFrom):
+            # Handle: from module import name [as alias]
+            module_name = node.module if node.module else ""
+            level = node.level  # 0=absolute, 1+=relative (. or ..)
 
-                    # Create import relation
-                    relation = ExtractedRelation(
-                        source_id=data_source.id,
-                        from_entity=data_source.source_path or data_source.name,
-                        to_entity=full_module,
-                        relation_type="IMPORTS",
-                        properties={
-                            "from_type": "file",
-                            "to_type": "module",
-                            "import_type": "from_import",
-                            "module": full_module,
-                            "imported_name": imported_name,
-                            "alias": alias.asname if alias.asname else None,
-                            "is_relative": level > 0,
-                            "level": level
-                        }
-                    )
-                    relations.append(relation)
+            # Construct full module path for relative imports
+            if level > 0:
+                # Relative import (from . import or from .. import)
+                relative_prefix = "." * level
+                full_module = f"{relative_prefix}{module_name}" if module_name else relative_prefix
+            else:
+                full_module = module_name
+
+            for alias in node.names:
+                imported_name = alias.name
+
+                # Create import relation
+                relation = ExtractedRelation(
+                    source_id=data_source.id,
+                    from_entity=data_source.source_path or data_source.name,
+                    to_entity=full_module,
+                    relation_type="IMPORTS",
+                    properties={
+                        "from_type": "file",
+                        "to_type": "module",
+                        "import_type": "from_import",
+                        "module": full_module,
+                        "imported_name": imported_name,
+                        "alias": alias.asname if alias.asname else None,
+                        "is_relative": level > 0,
+                        "level": level
+                    }
+                )
+                relations.append(relation)
 
         return relations
     
-    async def _transform_js_code(self, data_source: DataSource, content: str) -> ProcessingResult:
+    def _transform_js_code(self, data_source: DataSource, content: str) -> ProcessingResult:
         """transform JavaScript/TypeScript code"""
         chunks = []
         relations = []
@@ -557,7 +610,7 @@ class CodeTransformer(DataTransformer):
     # Java Code Transformation
     # ===================================
 
-    async def _transform_java_code(self, data_source: DataSource, content: str) -> ProcessingResult:
+    def _transform_java_code(self, data_source: DataSource, content: str) -> ProcessingResult:
         """transform Java code"""
         chunks = []
         relations = []
@@ -693,7 +746,7 @@ class CodeTransformer(DataTransformer):
     # PHP Code Transformation
     # ===================================
 
-    async def _transform_php_code(self, data_source: DataSource, content: str) -> ProcessingResult:
+    def _transform_php_code(self, data_source: DataSource, content: str) -> ProcessingResult:
         """transform PHP code"""
         chunks = []
         relations = []
@@ -852,7 +905,7 @@ class CodeTransformer(DataTransformer):
     # Go Code Transformation
     # ===================================
 
-    async def _transform_go_code(self, data_source: DataSource, content: str) -> ProcessingResult:
+    def _transform_go_code(self, data_source: DataSource, content: str) -> ProcessingResult:
         """transform Go code"""
         chunks = []
         relations = []
@@ -1006,7 +1059,7 @@ class CodeTransformer(DataTransformer):
 
         return relations
 
-    async def _transform_generic_code(self, data_source: DataSource, content: str) -> ProcessingResult:
+    def _transform_generic_code(self, data_source: DataSource, content: str) -> ProcessingResult:
         """generic code transformation (split by line count)"""
         chunks = []
         lines = content.split('\n')
@@ -1038,6 +1091,186 @@ class CodeTransformer(DataTransformer):
             metadata={"transformer": "CodeTransformer", "method": "generic"}
         )
 
+# compact, picklable records exchanged with parse worker processes
+SourceRecord = Tuple[str, str, Optional[str], str]  # id, name, source_path, language
+ResultRecord = Tuple[bool, List[tuple], List[tuple], Optional[str], Dict[str, Any]]
+
+def _source_record(data_source: DataSource) -> SourceRecord:
+    return (data_source.id, data_source.name, data_source.source_path, data_source.metadata.get("language", "unknown"))
+
+def _result_record(result: ProcessingResult) -> ResultRecord:
+    return (
+        result.success,
+        [(c.chunk_type.value, c.content, c.title, c.summary, c.metadata) for c in result.chunks],
+        [(r.from_entity, r.to_entity, r.relation_type, r.properties) for r in result.relations],
+        result.error_message,
+        result.metadata,
+    )
+
+def _result_from_record(source_id: str, record: ResultRecord) -> ProcessingResult:
+    success, chunks, relations, error_message, metadata = record
+    return ProcessingResult(
+        source_id=source_id,
+        success=success,
+        chunks=[
+            ProcessedChunk(source_id=source_id, chunk_type=ChunkType(chunk_type), content=content,
+                           title=title, summary=summary, metadata=chunk_metadata)
+            for chunk_type, content, title, summary, chunk_metadata in chunks
+        ],
+        relations=[
+            ExtractedRelation(source_id=source_id, from_entity=from_entity, to_entity=to_entity,
+                              relation_type=relation_type, properties=properties)
+            for from_entity, to_entity, relation_type, properties in relations
+        ],
+        error_message=error_message,
+        metadata=metadata,
+    )
+
+def _parse_code_chunk(items: List[Tuple[SourceRecord, str]]) -> List[ResultRecord]:
+    """parse a chunk of sources; runs in a worker process"""
+    transformer = CodeTransformer()
+    records = []
+    for (source_id, name, source_path, language), content in items:
+        data_source = DataSource(id=source_id, name=name, type=DataSourceType.CODE,
+                                 source_path=source_path, metadata={"language": language})
+        records.append(_result_record(transformer.parse(data_source, content)))
+    return records
+
+class CodeParsePool:
+    """
+    Runs CodeTransformer.parse in worker processes, so parsing uses every
+    core and never blocks the event loop. Parse requests made in the same
+    event loop tick are submitted together, split over the workers in
+    chunks of at most chunk_size sources. With max_workers < 1 parsing
+    runs in a thread instead.
+    
+    A dying worker breaks every chunk in flight, so the sources of those
+    chunks are parsed again one at a time on the restarted pool; only a
+    source that breaks the pool on its own fails.
+    """
+    
+    def __init__(self, max_workers: Optional[int] = None, chunk_size: Optional[int] = None):
+        self.max_workers = settings.code_parse_workers if max_workers is None else max_workers
+        self.chunk_size = max(1, chunk_size or settings.code_parse_chunk_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # event loop -> [(item, future)] waiting for the next flush
+        self._pending: Dict[asyncio.AbstractEventLoop, List[Tuple[Tuple[SourceRecord, str], asyncio.Future]]] = {}
+        # event loop -> [(item, future)] caught in a broken pool, re-parsed one at a time
+        self._suspects: Dict[asyncio.AbstractEventLoop, List[Tuple[Tuple[SourceRecord, str], asyncio.Future]]] = {}
+        self._reparse_tasks: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=get_worker_context())
+                logger.info(f"Started code parse pool with {self.max_workers} workers")
+            return self._executor
+    
+    def _discard_executor(self, executor: Optional[ProcessPoolExecutor], error: Exception):
+        """drop a broken executor so the next submit starts a fresh pool"""
+        with self._lock:
+            broken = executor is not None and self._executor is executor
+            if broken:
+                self._executor = None
+        if broken:
+            logger.warning(f"Code parse worker died, restarting the pool: {error}")
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def parse(self, data_source: DataSource, content: str) -> ProcessingResult:
+        """parse one code source in the pool"""
+        item = (_source_record(data_source), content)
+        if self.max_workers < 1:
+            record = (await asyncio.to_thread(_parse_code_chunk, [item]))[0]
+            return _result_from_record(data_source.id, record)
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            pending = self._pending.setdefault(loop, [])
+            pending.append((item, future))
+            first = len(pending) == 1
+        if first:
+            loop.call_soon(self._flush, loop)
+        return _result_from_record(data_source.id, await future)
+    
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            pending = self._pending.pop(loop, [])
+        if not pending:
+            return
+        # spread a burst over all workers, but keep each task small
+        size = min(self.chunk_size, -(-len(pending) // self.max_workers))
+        for i in range(0, len(pending), size):
+            chunk = pending[i:i + size]
+            executor = None
+            try:
+                executor = self._get_executor()
+                task = loop.run_in_executor(executor, _parse_code_chunk, [item for item, _ in chunk])
+            except Exception as e:
+                self._deliver(loop, executor, chunk, e)
+                continue
+            task.add_done_callback(lambda task, executor=executor, chunk=chunk: self._deliver(loop, executor, chunk, task))
+    
+    def _deliver(self, loop, executor, chunk, outcome):
+        if isinstance(outcome, Exception):
+            error, records = outcome, None
+        elif outcome.cancelled():
+            error, records = asyncio.CancelledError(), None
+        else:
+            error, records = outcome.exception(), None
+            if error is None:
+                records = outcome.result()
+        if isinstance(error, BrokenProcessPool):
+            # the chunk may only have been in flight when another one crashed a worker
+            self._discard_executor(executor, error)
+            with self._lock:
+                self._suspects.setdefault(loop, []).extend(entry for entry in chunk if not entry[1].done())
+                if loop not in self._reparse_tasks:
+                    self._reparse_tasks[loop] = loop.create_task(self._reparse_suspects(loop))
+            return
+        
+        for i, (_, future) in enumerate(chunk):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(records[i])
+    
+    async def _reparse_suspects(self, loop: asyncio.AbstractEventLoop):
+        """parse sources caught in a broken pool one at a time, failing only those that break it again"""
+        while True:
+            with self._lock:
+                suspects = self._suspects.get(loop)
+                if not suspects:
+                    self._suspects.pop(loop, None)
+                    self._reparse_tasks.pop(loop, None)
+                    return
+                item, future = suspects[0]
+            if not future.done():
+                executor = None
+                try:
+                    executor = self._get_executor()
+                    records = await loop.run_in_executor(executor, _parse_code_chunk, [item])
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        self._discard_executor(executor, e)
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(records[0])
+            with self._lock:
+                suspects.pop(0)
+    
+    def close(self):
+        """stop the worker processes (they are restarted on the next parse)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
 class SQLTransformer(DataTransformer):
     """SQL transformer"""
     
@@ -1164,4 +1397,7 @@ class TransformerRegistry:
         self.transformers.insert(0, transformer)  # new transformer has highest priority
 
 # global transformer registry instance
-transformer_registry = TransformerRegistry() 
\ No newline at end of file
+transformer_registry = TransformerRegistry()
+
+# shared code parse worker pool
+code_parse_pool = CodeParsePool() 
\ No newline at end of file
@@ -1,7 +1,7 @@
 """Task queue and processing services."""
 
-from codebase_rag.services.tasks.task_queue import TaskQueue, task_queue, TaskStatus
+from codebase_rag.services.tasks.task_queue import TaskQueue, task_queue, TaskStatus, submit_repo_ingestion_task
 from codebase_rag.services.tasks.task_storage import TaskStorage, TaskType
 from codebase_rag.services.tasks.task_processors import TaskProcessor, processor_registry
 
-__all__ = ["TaskQueue", "TaskStorage", "TaskProcessor", "task_queue", "TaskStatus", "TaskType", "processor_registry"]
+__all__ = ["TaskQueue", "TaskStorage", "TaskProcessor", "task_queue", "TaskStatus", "TaskType", "processor_registry", "submit_repo_ingestion_task"]
@@ -366,6 +366,10 @@ class BatchProcessingProcessor(TaskProcessor):
             if not directory.exists():
                 raise FileNotFoundError(f"Directory not found: {directory_path}")
             
+            # the knowledge service streams the directory through its ingestion pipeline
+            if hasattr(self.neo4j_service, "add_directory"):
+                return await self._ingest_directory(directory, kwargs, progress_callback)
+            
             self._update_progress(progress_callback, 20, "Scanning directory for files")
             
             # collect all matching files
@@ -418,6 +422,39 @@ class BatchProcessingProcessor(TaskProcessor):
             logger.error(f"Batch processing failed: {e}")
             raise
     
+    async def _ingest_directory(self, directory: Path, kwargs: Dict[str, Any], progress_callback: Optional[Callable]) -> Dict[str, Any]:
+        """ingest a directory with the knowledge service, forwarding per-document progress"""
+        file_patterns = kwargs.get("file_patterns")
+        file_extensions = [Path(p).suffix for p in file_patterns if Path(p).suffix] if file_patterns else None
+        
+        # documents are reported from an ingestion worker thread, hop back to the event loop
+        loop = asyncio.get_running_loop()
+        last_progress = [20.0]
+        
+        def on_document(progress: Optional[float], message: str):
+            if progress is not None:
+                last_progress[0] = 20 + 0.75 * progress
+            loop.call_soon_threadsafe(self._update_progress, progress_callback, round(last_progress[0], 1), message)
+        
+        self._update_progress(progress_callback, 20, "Ingesting directory")
+        result = await self.neo4j_service.add_directory(
+            str(directory),
+            recursive=kwargs.get("recursive", True),
+            file_extensions=file_extensions,
+            progress_callback=on_document
+        )
+        if not result.get("success"):
+            raise RuntimeError(result.get("error", "Directory ingestion failed"))
+        
+        self._update_progress(progress_callback, 100, "Batch processing completed")
+        return {
+            "status": "success",
+            "message": result.get("message", "Batch processing completed successfully"),
+            "result": result,
+            "files_processed": result.get("documents_count", 0),
+            "directory_path": str(directory)
+        }
+    
     async def _process_file_batch(self, files: list, progress_callback: Optional[Callable]) -> list:
         """process a batch of files"""
         results = []
@@ -486,6 +523,121 @@ class BatchProcessingProcessor(TaskProcessor):
             "failed_file_paths": [r["file_path"] for r in failed]
         }
 
+class RepoIngestionProcessor(TaskProcessor):
+    """repository ingestion task processor"""
+    
+    def __init__(self, graph_service=None):
+        self.graph_service = graph_service
+    
+    async def process(self, task: Task, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """process repository ingestion task"""
+        from codebase_rag.services.code import get_code_ingestor
+        from .task_queue import task_queue
+        
+        payload = task.payload
+        kwargs = payload.get("kwargs", {})
+        checkpoint = payload.get("checkpoint")
+        
+        if not kwargs.get("local_path") and not kwargs.get("repo_url"):
+            raise ValueError("Either local_path or repo_url must be provided")
+        
+        graph_service = self.graph_service
+        if graph_service is None:
+            from codebase_rag.services.code import graph_service
+        if not graph_service._connected and not await graph_service.connect():
+            raise RuntimeError("Failed to connect to Neo4j")
+        
+        if checkpoint:
+            logger.info(
+                f"Task {task.id} - Resuming repository ingestion after "
+                f"{checkpoint.get('batches_committed', 0)} committed batches"
+            )
+            self._update_progress(progress_callback, task.progress or 10, "Resuming repository ingestion")
+        else:
+            self._update_progress(progress_callback, 5, "Starting repository ingestion")
+        
+        # ingestion runs in a worker thread, hop back to the event loop to report
+        loop = asyncio.get_running_loop()
+        
+        checkpoints = CheckpointWriter(task.id, task_queue)
+        
+        def on_progress(stats: Dict[str, Any]):
+            loop.call_soon_threadsafe(self._report_progress, stats, progress_callback, checkpoints)
+        
+        code_ingestor = get_code_ingestor(graph_service)
+        try:
+            result = await asyncio.to_thread(
+                code_ingestor.ingest_repository,
+                repo_url=kwargs.get("repo_url"),
+                local_path=kwargs.get("local_path"),
+                branch=kwargs.get("branch", "main"),
+                mode=kwargs.get("mode", "full"),
+                include_globs=kwargs.get("include_globs"),
+                exclude_globs=kwargs.get("exclude_globs"),
+                since_commit=kwargs.get("since_commit"),
+                force=kwargs.get("force", False),
+                resume=bool(checkpoint),
+                on_progress=on_progress
+            )
+        finally:
+            # the last checkpoint is stored before the task is marked finished
+            await checkpoints.flush()
+        
+        if not result.get("success"):
+            raise RuntimeError(result.get("error", "Repository ingestion failed"))
+        
+        self._update_progress(progress_callback, 100, result.get("message", "Repository ingestion completed"))
+        
+        # per-batch timings are only useful while running, keep the stored result small
+        result.pop("batches", None)
+        return result
+    
+    def _report_progress(self, stats: Dict[str, Any], progress_callback: Optional[Callable], checkpoints: "CheckpointWriter"):
+        """publish streamed progress and checkpoint the last committed batch"""
+        estimated = stats.get("files_estimated")
+        if estimated:
+            progress = min(95.0, 10 + 85 * stats["files_scanned"] / max(estimated, stats["files_scanned"]))
+        else:
+            progress = 50.0
+        
+        message = (
+            f"Scanned {stats['files_scanned']} files, wrote {stats['files_written']} "
+            f"(skipped {stats['files_skipped']} unchanged), {stats.get('bytes_per_sec', 0)} bytes/sec"
+        )
+        self._update_progress(progress_callback, round(progress, 1), message)
+        checkpoints.submit(stats)
+
+class CheckpointWriter:
+    """
+    Saves task checkpoints one at a time. Checkpoints submitted while a save
+    is running replace each other, so only the newest one is written next.
+    """
+    
+    def __init__(self, task_id: str, task_queue):
+        self.task_id = task_id
+        self.task_queue = task_queue
+        self._pending: Optional[Dict[str, Any]] = None
+        self._writer: Optional[asyncio.Task] = None
+    
+    def submit(self, checkpoint: Dict[str, Any]):
+        """queue a checkpoint; must be called on the event loop"""
+        self._pending = checkpoint
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._drain())
+    
+    async def _drain(self):
+        while self._pending is not None:
+            checkpoint, self._pending = self._pending, None
+            try:
+                await self.task_queue.save_task_checkpoint(self.task_id, checkpoint)
+            except Exception as e:
+                logger.warning(f"Task {self.task_id} - Failed to save checkpoint: {e}")
+    
+    async def flush(self):
+        """wait until the newest checkpoint is saved"""
+        if self._writer is not None:
+            await self._writer
+
 class TaskProcessorRegistry:
     """task processor registry"""
     
@@ -519,6 +671,10 @@ class TaskProcessorRegistry:
             TaskType.BATCH_PROCESSING, 
             BatchProcessingProcessor(neo4j_service)
         )
+        self.register_processor(
+            TaskType.REPO_INGESTION,
+            RepoIngestionProcessor()
+        )
         
         logger.info("Initialized all default task processors")
 
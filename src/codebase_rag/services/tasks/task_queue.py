@@ -13,6 +13,9 @@ from datetime import datetime
 import json
 from loguru import logger
 
+# task types whose processors checkpoint progress and can resume after a restart
+RESUMABLE_TASK_TYPES = {"repo_ingestion"}
+
 class TaskStatus(Enum):
     PENDING = "pending"
     PROCESSING = "processing"
@@ -125,8 +128,15 @@ class TaskQueue:
                 )
                 self.tasks[task.id] = task_result
                 
+                # resumable tasks pick up from their last checkpoint
+                if task.status == TaskStatus.PROCESSING and task.type.value in RESUMABLE_TASK_TYPES:
+                    logger.warning(f"Task {task.id} was processing when service stopped, requeueing to resume")
+                    await self._storage.requeue_task(task.id)
+                    task_result.status = TaskStatus.PENDING
+                    task_result.message = "Requeued after restart, resuming from last checkpoint"
+                
                 # restart interrupted running tasks
-                if task.status == TaskStatus.PROCESSING:
+                elif task.status == TaskStatus.PROCESSING:
                     logger.warning(f"Task {task.id} was processing when service stopped, marking as failed")
                     await self._storage.update_task_status(
                         task.id, 
@@ -174,6 +184,8 @@ class TaskQueue:
             task_type_enum = TaskType.KNOWLEDGE_GRAPH_CONSTRUCTION
         elif task_type == "batch_processing":
             task_type_enum = TaskType.BATCH_PROCESSING
+        elif task_type == "repo_ingestion":
+            task_type_enum = TaskType.REPO_INGESTION
         
         # create task in database
         if self._storage:
@@ -416,6 +428,17 @@ class TaskQueue:
         
         return False
     
+    async def save_task_checkpoint(self, task_id: str, checkpoint: Dict[str, Any]):
+        """persist a processor checkpoint in the task payload so the task can resume"""
+        if task_id in self.tasks:
+            self.tasks[task_id].metadata["checkpoint"] = checkpoint
+        
+        if self._storage:
+            task = await self._storage.get_task(task_id)
+            if task:
+                task.payload["checkpoint"] = checkpoint
+                await self._storage.update_task_payload(task_id, task.payload)
+    
     def update_task_progress(self, task_id: str, progress: float, message: str = ""):
         """update task progress"""
         if task_id in self.tasks:
@@ -518,6 +541,22 @@ async def submit_document_processing_task(
         task_type="document_processing"
     )
 
+async def submit_repo_ingestion_task(
+    task_name: str = "Repository Ingestion",
+    **kwargs
+) -> str:
+    """submit repository ingestion task"""
+    return await task_queue.submit_task(
+        task_func=process_repo_ingestion_task,
+        task_kwargs=kwargs,
+        task_name=task_name,
+        task_type="repo_ingestion"
+    )
+
+async def process_repo_ingestion_task(**kwargs):
+    """repository ingestion task placeholder, actual processing is done by RepoIngestionProcessor"""
+    pass
+
 async def submit_directory_processing_task(
     service_method: Callable,
     directory_path: str,
@@ -527,8 +566,8 @@ async def submit_directory_processing_task(
     """submit directory processing task"""
     return await task_queue.submit_task(
         task_func=service_method,
-        task_args=(directory_path,),
-        task_kwargs=kwargs,
+        # the batch processor reads its parameters from the payload kwargs
+        task_kwargs={"directory_path": directory_path, **kwargs},
         task_name=task_name,
         task_type="batch_processing"
     ) 
\ No newline at end of file
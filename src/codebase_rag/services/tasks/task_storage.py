@@ -22,6 +22,7 @@ class TaskType(Enum):
     SCHEMA_PARSING = "schema_parsing"
     KNOWLEDGE_GRAPH_CONSTRUCTION = "knowledge_graph_construction"
     BATCH_PROCESSING = "batch_processing"
+    REPO_INGESTION = "repo_ingestion"
 
 @dataclass
 class Task:
@@ -226,6 +227,36 @@ class TaskStorage:
             conn.commit()
             return cursor.rowcount > 0
     
+    async def update_task_payload(self, task_id: str, payload: Dict[str, Any]) -> bool:
+        """Replace the stored payload of a task (used for checkpoints)"""
+        async with self._lock:
+            return await asyncio.to_thread(self._update_task_payload_sync, task_id, payload)
+    
+    def _update_task_payload_sync(self, task_id: str, payload: Dict[str, Any]) -> bool:
+        """Update task payload (synchronous)"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET payload = ? WHERE id = ?",
+                (json.dumps(payload), task_id)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    async def requeue_task(self, task_id: str) -> bool:
+        """Put an interrupted task back into the pending queue and drop its lock"""
+        async with self._lock:
+            return await asyncio.to_thread(self._requeue_task_sync, task_id)
+    
+    def _requeue_task_sync(self, task_id: str) -> bool:
+        """Requeue task (synchronous)"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, lock_id = NULL, started_at = NULL WHERE id = ?",
+                (TaskStatus.PENDING.value, task_id)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+    
     async def acquire_task_lock(self, task_id: str, lock_id: str) -> bool:
         """Acquire a lock on a task"""
         async with self._lock:
@@ -3,5 +3,11 @@
 from codebase_rag.services.utils.git_utils import GitUtils, git_utils
 from codebase_rag.services.utils.ranker import Ranker, ranker
 from codebase_rag.services.utils.metrics import MetricsCollector, metrics_service
+from codebase_rag.services.utils.query_cache import QueryCache, CacheBackend, query_cache
+from codebase_rag.services.utils.cypher_stream import iter_records, to_plain
+from codebase_rag.services.utils.hashed_embedding import HashedNgramEmbedder
+from codebase_rag.services.utils.ann_index import AnnIndex
+from codebase_rag.services.utils.semantic_cache import SemanticQueryCache
+from codebase_rag.services.utils.worker_processes import get_worker_context
 
-__all__ = ["GitUtils", "Ranker", "MetricsCollector", "git_utils", "ranker", "metrics_service"]
+__all__ = ["GitUtils", "Ranker", "MetricsCollector", "git_utils", "ranker", "metrics_service", "QueryCache", "CacheBackend", "query_cache", "iter_records", "to_plain", "HashedNgramEmbedder", "AnnIndex", "SemanticQueryCache", "get_worker_context"]
@@ -0,0 +1,301 @@
+"""
+Local approximate nearest neighbour index
+IVF-flat cosine search over memory-mapped float32 vectors, persisted in one directory
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+
+class AnnIndex:
+    """
+    Inverted-file (IVF) index with exact re-scoring, stored under `path`:
+
+        meta.json      dimension and number of clustered rows
+        vectors.f32    normalized float32 vectors, memory-mapped
+        offsets.i64    byte offset of each row in payload.jsonl
+        payload.jsonl  id, text and metadata of each row
+        ivf.npz        k-means centroids and the row range of each cluster
+
+    build() clusters the vectors and rewrites them grouped by cluster, so
+    probing a cluster reads one contiguous slice. Rows added later form a
+    tail that is scanned exhaustively until the tail outgrows
+    `rebuild_ratio` of the index and add() rebuilds it.
+
+    Adding an id that is already indexed is an upsert: the older rows of
+    that id are skipped by query() and dropped by the next build().
+    `complete` records whether the index has been filled with the whole
+    corpus; callers should not rely on it alone until then.
+    """
+
+    MIN_REBUILD_ROWS = 1024
+    MAX_CLUSTERS = 4096
+
+    def __init__(self, path: str, dimension: Optional[int] = None, nprobe: int = 8, rebuild_ratio: float = 0.1):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.nprobe = nprobe
+        self.rebuild_ratio = rebuild_ratio
+        self._lock = threading.RLock()
+
+        meta = self._read_meta()
+        self.dimension = meta.get("dimension") or dimension
+        self._indexed_rows = meta.get("indexed_rows", 0)
+        self._complete = meta.get("complete", False)
+        # id -> payload offset of its latest row
+        self._latest: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._list_offsets: Optional[np.ndarray] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._remap()
+        self._load_ivf()
+        self._load_ids()
+
+    # ------------------------------------------------------------ storage
+
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    def _read_meta(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self._file("meta.json").read_text())
+        except FileNotFoundError:
+            return {}
+
+    def _write_meta(self):
+        tmp = self._file("meta.json.tmp")
+        tmp.write_text(json.dumps({
+            "dimension": self.dimension, "indexed_rows": self._indexed_rows, "complete": self._complete
+        }))
+        os.replace(tmp, self._file("meta.json"))
+
+    def _remap(self):
+        """Memory-map the vector and offset files at their current size"""
+        if not self.dimension:
+            return
+        vectors_file, offsets_file = self._file("vectors.f32"), self._file("offsets.i64")
+        rows = min(
+            vectors_file.stat().st_size // (4 * self.dimension) if vectors_file.exists() else 0,
+            offsets_file.stat().st_size // 8 if offsets_file.exists() else 0
+        )
+        if rows == 0:
+            self._vectors = np.zeros((0, self.dimension), dtype=np.float32)
+            self._offsets = np.zeros(0, dtype=np.int64)
+            return
+        self._vectors = np.memmap(vectors_file, dtype=np.float32, mode='r', shape=(rows, self.dimension))
+        self._offsets = np.memmap(offsets_file, dtype=np.int64, mode='r', shape=(rows,))
+
+    def _load_ivf(self):
+        try:
+            with np.load(self._file("ivf.npz")) as ivf:
+                self._centroids = ivf["centroids"]
+                self._list_offsets = ivf["list_offsets"]
+        except FileNotFoundError:
+            self._centroids = None
+            self._list_offsets = None
+            self._indexed_rows = 0
+
+    def _load_ids(self):
+        """Latest payload offset of every id, read from payload.jsonl"""
+        self._latest = {}
+        try:
+            with open(self._file("payload.jsonl"), 'rb') as f:
+                offset = f.tell()
+                for line in iter(f.readline, b""):
+                    self._latest[json.loads(line)["id"]] = offset
+                    offset = f.tell()
+        except FileNotFoundError:
+            pass
+
+    @property
+    def complete(self) -> bool:
+        return self._complete
+
+    def mark_complete(self, complete: bool = True):
+        """Record whether the index holds the whole corpus"""
+        with self._lock:
+            self._complete = complete
+            self._write_meta()
+
+    def __len__(self) -> int:
+        return 0 if self._vectors is None else len(self._vectors)
+
+    # ------------------------------------------------------------ writes
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: Any,
+        texts: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None
+    ):
+        """Append vectors with their ids, texts and metadata; rebuilds when the tail grows too large"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("vectors must be a (len(ids), dimension) matrix")
+        if not len(ids):
+            return
+
+        with self._lock:
+            if not self.dimension:
+                self.dimension = vectors.shape[1]
+                self._write_meta()
+            if vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {vectors.shape[1]}")
+
+            payload_file = self._file("payload.jsonl")
+            offsets = []
+            with open(payload_file, 'ab') as f:
+                for i, node_id in enumerate(ids):
+                    offsets.append(f.tell())
+                    line = json.dumps({
+                        "id": node_id,
+                        "text": texts[i] if texts else None,
+                        "metadata": metadatas[i] if metadatas else {}
+                    }, default=str)
+                    f.write(line.encode('utf-8') + b"\n")
+            with open(self._file("vectors.f32"), 'ab') as f:
+                f.write(self._normalize(vectors).tobytes())
+            with open(self._file("offsets.i64"), 'ab') as f:
+                f.write(np.asarray(offsets, dtype=np.int64).tobytes())
+            self._latest.update(zip(ids, offsets))
+            self._remap()
+
+            tail = len(self) - self._indexed_rows
+            if tail >= self.MIN_REBUILD_ROWS and tail > self.rebuild_ratio * self._indexed_rows:
+                self.build()
+
+    def build(self, n_clusters: Optional[int] = None, iterations: int = 10, sample_size: int = 100_000, seed: int = 0):
+        """Cluster the live rows with k-means and rewrite them grouped by cluster"""
+        with self._lock:
+            if len(self) == 0:
+                return
+            # rows superseded by a later row of the same id are dropped here
+            live = np.isin(np.asarray(self._offsets), np.fromiter(self._latest.values(), dtype=np.int64))
+            vectors = np.asarray(self._vectors)[live]
+            row_offsets = np.asarray(self._offsets)[live]
+            n = len(vectors)
+            if n == 0:
+                return
+            k = n_clusters or min(self.MAX_CLUSTERS, max(1, int(np.sqrt(n))))
+            rng = np.random.default_rng(seed)
+
+            sample = vectors[rng.choice(n, size=min(n, sample_size), replace=False)]
+            centroids = sample[rng.choice(len(sample), size=min(k, len(sample)), replace=False)].copy()
+            for _ in range(iterations):
+                assignment = self._assign(sample, centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sample)
+                counts = np.bincount(assignment, minlength=len(centroids))
+                empty = counts == 0
+                # re-seed empty clusters with random sample points
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+                centroids = self._normalize(sums)
+
+            assignment = self._assign(vectors, centroids)
+            order = np.argsort(assignment, kind='stable')
+            list_offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(assignment, minlength=len(centroids)), out=list_offsets[1:])
+
+            grouped_vectors = vectors[order]
+            grouped_offsets = row_offsets[order]
+            self._vectors = self._offsets = None
+            self._replace_file("vectors.f32", grouped_vectors.tobytes())
+            self._replace_file("offsets.i64", grouped_offsets.tobytes())
+            tmp = self._file("ivf.tmp.npz")
+            np.savez(tmp, centroids=centroids, list_offsets=list_offsets)
+            os.replace(tmp, self._file("ivf.npz"))
+
+            self._centroids, self._list_offsets, self._indexed_rows = centroids, list_offsets, n
+            self._write_meta()
+            self._remap()
+            logger.info(f"Built ANN index over {n} vectors with {len(centroids)} clusters")
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[i:i + chunk] @ centroids.T, axis=1)
+            for i in range(0, len(vectors), chunk)
+        ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+    def _replace_file(self, name: str, data: bytes):
+        tmp = self._file(name + ".tmp")
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._file(name))
+
+    def clear(self):
+        """Remove all vectors"""
+        with self._lock:
+            self._vectors = self._offsets = None
+            for name in ("vectors.f32", "offsets.i64", "payload.jsonl", "ivf.npz", "meta.json"):
+                self._file(name).unlink(missing_ok=True)
+            self._centroids = self._list_offsets = None
+            self._indexed_rows = 0
+            self._complete = False
+            self._latest = {}
+            self._remap()
+
+    # ------------------------------------------------------------ reads
+
+    def search(self, query: Any, top_k: int = 10, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        (payload offset, cosine similarity) of the approximate top_k rows, best first.
+
+        Rows are renumbered by build(), so results carry payload offsets, taken
+        from the same mapping as the vectors, rather than row numbers.
+        """
+        with self._lock:
+            vectors, offsets = self._vectors, self._offsets
+            centroids, list_offsets = self._centroids, self._list_offsets
+            indexed = self._indexed_rows if centroids is not None else 0
+        if vectors is None or len(vectors) == 0:
+            return []
+
+        q = self._normalize(np.asarray(query, dtype=np.float32))
+        ranges = [(indexed, len(vectors))]
+        if indexed:
+            probe = min(nprobe or self.nprobe, len(centroids))
+            nearest = np.argpartition(-(centroids @ q), probe - 1)[:probe]
+            ranges += [(int(list_offsets[c]), int(list_offsets[c + 1])) for c in nearest]
+
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges if end > start] or [np.zeros(0, dtype=np.int64)])
+        if len(rows) == 0:
+            return []
+        scores = np.concatenate([vectors[start:end] @ q for start, end in ranges if end > start])
+        top = min(top_k, len(rows))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        return [(int(offsets[rows[i]]), float(scores[i])) for i in best]
+
+    def _read_payload(self, offset: int) -> Dict[str, Any]:
+        with open(self._file("payload.jsonl"), 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def get_payload(self, offset: int) -> Dict[str, Any]:
+        """id, text and metadata stored at a payload offset returned by search()"""
+        return self._read_payload(offset)
+
+    def query(self, query: Any, top_k: int = 10, nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Top-k payloads with their score, one per id, skipping rows replaced by a later upsert"""
+        results = []
+        for offset, score in self.search(query, top_k * 2, nprobe):
+            payload = self._read_payload(offset)
+            if self._latest.get(payload["id"]) != offset:
+                continue
+            results.append({**payload, "score": score})
+            if len(results) == top_k:
+                break
+        return results
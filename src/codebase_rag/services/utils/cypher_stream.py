@@ -0,0 +1,108 @@
+"""
+Streaming helpers for Cypher results
+Yield records lazily as plain dicts and page through results with opaque cursors
+"""
+import base64
+import hashlib
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+from neo4j.graph import Node, Path, Relationship
+
+
+def to_plain(value: Any) -> Any:
+    """Convert Neo4j graph values (recursively) into JSON-friendly dicts"""
+    if isinstance(value, Node):
+        return {
+            "id": value.get("id", value.element_id),
+            "labels": list(value.labels),
+            "properties": dict(value)
+        }
+    if isinstance(value, Relationship):
+        return {
+            "id": value.element_id,
+            "type": value.type,
+            "start_node": value.start_node.element_id if value.start_node is not None else None,
+            "end_node": value.end_node.element_id if value.end_node is not None else None,
+            "properties": dict(value)
+        }
+    if isinstance(value, Path):
+        return {
+            "nodes": [dict(n) for n in value.nodes],
+            "relationships": [dict(r) for r in value.relationships],
+            "length": len(value.relationships)
+        }
+    if isinstance(value, dict):
+        return {k: to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(v) for v in value]
+    return value
+
+
+def iter_records(session, query: str, parameters: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Run a query and yield each record as a plain dict while the driver pulls
+    further batches (the session's fetch_size) on demand.
+    """
+    for record in session.run(query, parameters or {}):
+        yield {key: to_plain(value) for key, value in record.items()}
+
+
+def to_json_line(row: Dict[str, Any]) -> str:
+    """Serialize a row as one NDJSON line (temporal and spatial values as strings)"""
+    return json.dumps(row, default=str) + "\n"
+
+
+def _query_digest(query: str, parameters: Optional[Dict[str, Any]]) -> str:
+    payload = json.dumps({"q": query, "p": parameters or {}}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def _encode(payload: Dict[str, Any], query: str, parameters: Optional[Dict[str, Any]]) -> str:
+    token = json.dumps({**payload, "h": _query_digest(query, parameters)}, default=str)
+    return base64.urlsafe_b64encode(token.encode()).decode()
+
+
+def _decode(cursor: str, query: str, parameters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        token = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        digest = token["h"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if digest != _query_digest(query, parameters):
+        raise ValueError("Cursor does not match this query")
+    return token
+
+
+def encode_cursor(query: str, parameters: Optional[Dict[str, Any]], offset: int) -> str:
+    """Opaque paging token bound to one query and its parameters"""
+    return _encode({"o": offset}, query, parameters)
+
+
+def decode_cursor(cursor: Optional[str], query: str, parameters: Optional[Dict[str, Any]]) -> int:
+    """Offset encoded in a paging token; raises ValueError if it belongs to another query"""
+    if not cursor:
+        return 0
+    token = _decode(cursor, query, parameters)
+    try:
+        offset = int(token["o"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if offset < 0:
+        raise ValueError("Cursor does not match this query")
+    return offset
+
+
+def encode_keyset_cursor(query: str, parameters: Optional[Dict[str, Any]], after: List[Any]) -> str:
+    """Opaque paging token holding the sort key of the last row returned"""
+    return _encode({"k": after}, query, parameters)
+
+
+def decode_keyset_cursor(cursor: Optional[str], query: str, parameters: Optional[Dict[str, Any]]) -> Optional[List[Any]]:
+    """Sort key encoded in a keyset token (None for the first page)"""
+    if not cursor:
+        return None
+    token = _decode(cursor, query, parameters)
+    if not isinstance(token.get("k"), list):
+        raise ValueError("Invalid cursor: not a keyset cursor")
+    return token["k"]
@@ -3,7 +3,7 @@ Git utilities for repository operations
 """
 import os
 import subprocess
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from loguru import logger
 import tempfile
 import shutil
@@ -127,13 +127,13 @@ class GitUtils:
 
             changed_files = []
 
-            # Get modified/added/deleted files
+            # Get modified/added/deleted/renamed files
             if since_commit:
                 # Compare against specific commit
-                cmd = ["git", "-C", repo_path, "diff", "--name-status", since_commit, "HEAD"]
+                cmd = ["git", "-C", repo_path, "diff", "--name-status", "-M", since_commit, "HEAD"]
             else:
                 # Compare against working directory changes
-                cmd = ["git", "-C", repo_path, "diff", "--name-status", "HEAD"]
+                cmd = ["git", "-C", repo_path, "diff", "--name-status", "-M", "HEAD"]
 
             result = subprocess.run(
                 cmd,
@@ -142,19 +142,14 @@ class GitUtils:
                 timeout=30
             )
 
-            if result.returncode == 0 and result.stdout.strip():
-                for line in result.stdout.strip().split('\n'):
-                    if not line.strip():
-                        continue
-
-                    parts = line.split('\t', 1)
-                    if len(parts) == 2:
-                        status, file_path = parts
-                        changed_files.append({
-                            "path": file_path,
-                            "status": status,  # A=added, M=modified, D=deleted
-                            "action": GitUtils._get_action_from_status(status)
-                        })
+            if result.returncode != 0:
+                # e.g. since_commit is unknown (shallow clone, rewritten history)
+                return {
+                    "success": False,
+                    "error": result.stderr.strip() or f"git diff failed against {since_commit or 'HEAD'}",
+                    "changed_files": []
+                }
+            changed_files.extend(GitUtils._parse_name_status(result.stdout))
 
             # Get untracked files if requested
             if include_untracked:
@@ -176,7 +171,7 @@ class GitUtils:
                             })
 
             # Get staged but uncommitted files
-            cmd = ["git", "-C", repo_path, "diff", "--name-status", "--cached"]
+            cmd = ["git", "-C", repo_path, "diff", "--name-status", "-M", "--cached"]
             result = subprocess.run(
                 cmd,
                 capture_output=True,
@@ -184,21 +179,13 @@ class GitUtils:
                 timeout=30
             )
 
-            if result.returncode == 0 and result.stdout.strip():
-                for line in result.stdout.strip().split('\n'):
-                    if not line.strip():
-                        continue
-
-                    parts = line.split('\t', 1)
-                    if len(parts) == 2:
-                        status, file_path = parts
-                        # Check if already in list
-                        if not any(f['path'] == file_path for f in changed_files):
-                            changed_files.append({
-                                "path": file_path,
-                                "status": status,
-                                "action": f"staged_{GitUtils._get_action_from_status(status)}"
-                            })
+            if result.returncode == 0:
+                known_paths = {f['path'] for f in changed_files}
+                for change in GitUtils._parse_name_status(result.stdout):
+                    # Check if already in list
+                    if change['path'] not in known_paths:
+                        change["action"] = f"staged_{change['action']}"
+                        changed_files.append(change)
 
             logger.info(f"Found {len(changed_files)} changed files in {repo_path}")
 
@@ -216,6 +203,31 @@ class GitUtils:
                 "changed_files": []
             }
 
+    @staticmethod
+    def _parse_name_status(output: str) -> List[Dict[str, Any]]:
+        """
+        Parse `git diff --name-status` output.
+
+        Renames and copies (status "R087", "C100", ...) are reported on the
+        new path with the previous one in `old_path`.
+        """
+        changes = []
+        for line in output.splitlines():
+            parts = line.split('\t')
+            if len(parts) < 2 or not parts[0]:
+                continue
+
+            status = parts[0]
+            change = {
+                "path": parts[-1],
+                "status": status[0],  # A=added, M=modified, D=deleted, R=renamed
+                "action": GitUtils._get_action_from_status(status[0])
+            }
+            if status[0] in ('R', 'C') and len(parts) == 3:
+                change["old_path"] = parts[1]
+            changes.append(change)
+        return changes
+
     @staticmethod
     def _get_action_from_status(status: str) -> str:
         """Convert git status code to action name"""
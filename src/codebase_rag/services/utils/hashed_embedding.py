@@ -0,0 +1,60 @@
+"""
+Local hashed n-gram embeddings
+Deterministic feature-hashing vectors for offline benchmarking, no model or network needed
+"""
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=65536)
+def _word_hashes(word: str, ngram_range: Tuple[int, int]) -> Tuple[int, ...]:
+    """CRC32 of a word and its character n-grams (words repeat a lot, so cache them)"""
+    low, high = ngram_range
+    marked = f"<{word}>"
+    features = [word] + [
+        marked[i:i + n] for n in range(low, high + 1) for i in range(len(marked) - n + 1)
+    ]
+    return tuple(zlib.crc32(f.encode('utf-8')) for f in features)
+
+
+class HashedNgramEmbedder:
+    """
+    Embeds text as an L2-normalized bag of hashed features: lowercase words
+    plus character n-grams of each word (with boundary markers). Every feature
+    is hashed with CRC32 into one of `dimension` buckets with a +/-1 sign.
+    The same text always maps to the same vector, on every machine.
+    """
+
+    def __init__(self, dimension: int = 384, ngram_range: Tuple[int, int] = (3, 5)):
+        if dimension <= 0:
+            raise ValueError("dimension must be positive")
+        self.dimension = dimension
+        self.ngram_range = tuple(ngram_range)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """float32 matrix of shape (len(texts), dimension)"""
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            start = len(hashes)
+            for word in WORD_PATTERN.findall(text.lower()):
+                hashes.extend(_word_hashes(word, self.ngram_range))
+            rows.extend([row] * (len(hashes) - start))
+
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        if hashes:
+            hashes = np.asarray(hashes, dtype=np.uint32)
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors, (np.asarray(rows), (hashes & 0x7FFFFFFF) % self.dimension), signs)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0].tolist()
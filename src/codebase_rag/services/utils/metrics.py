@@ -62,6 +62,15 @@ ingestion_duration_seconds = Histogram(
     registry=registry
 )
 
+# Ingestion batch write duration histogram
+ingestion_batch_duration_seconds = Histogram(
+    'ingestion_batch_duration_seconds',
+    'Duration of a single batched File write transaction in seconds',
+    ['status'],  # success/error
+    buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+    registry=registry
+)
+
 # =================================
 # Graph operations metrics
 # =================================
@@ -83,6 +92,14 @@ graph_query_duration_seconds = Histogram(
     registry=registry
 )
 
+# Query result cache lookups
+query_cache_requests_total = Counter(
+    'query_cache_requests_total',
+    'Query result cache lookups',
+    ['endpoint', 'result'],  # result: hit/miss
+    registry=registry
+)
+
 # =================================
 # Neo4j metrics
 # =================================
@@ -110,6 +127,14 @@ neo4j_relationships_total = Gauge(
     registry=registry
 )
 
+# Graph query worker/connection usage, in_use / max is pool saturation
+neo4j_pool_connections = Gauge(
+    'neo4j_pool_connections',
+    'Neo4j graph queries by pool state',
+    ['state'],  # in_use, waiting, max
+    registry=registry
+)
+
 # =================================
 # Context pack metrics
 # =================================
@@ -203,6 +228,11 @@ class MetricsService:
         """Track ingestion duration"""
         ingestion_duration_seconds.labels(mode=mode).observe(duration)
 
+    @staticmethod
+    def track_ingestion_batch(status: str, duration: float):
+        """Track a batched file write"""
+        ingestion_batch_duration_seconds.labels(status=status).observe(duration)
+
     @staticmethod
     def track_graph_query(operation: str, status: str):
         """Track graph query"""
@@ -213,6 +243,11 @@ class MetricsService:
         """Track graph query duration"""
         graph_query_duration_seconds.labels(operation=operation).observe(duration)
 
+    @staticmethod
+    def track_query_cache(endpoint: str, hit: bool):
+        """Track query cache hit or miss"""
+        query_cache_requests_total.labels(endpoint=endpoint, result="hit" if hit else "miss").inc()
+
     @staticmethod
     def update_neo4j_status(connected: bool):
         """Update Neo4j connection status"""
@@ -228,6 +263,13 @@ class MetricsService:
         """Update Neo4j relationship count"""
         neo4j_relationships_total.labels(type=rel_type).set(count)
 
+    @staticmethod
+    def update_neo4j_pool(in_use: int, waiting: int, max_size: int):
+        """Update Neo4j graph query pool usage"""
+        neo4j_pool_connections.labels(state="in_use").set(in_use)
+        neo4j_pool_connections.labels(state="waiting").set(waiting)
+        neo4j_pool_connections.labels(state="max").set(max_size)
+
     @staticmethod
     def track_context_pack(stage: str, status: str, budget_used: int):
         """Track context pack generation"""
@@ -0,0 +1,131 @@
+"""
+Query result cache for graph search endpoints
+Caches /graph/related and /context/pack responses per repository
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+from loguru import logger
+
+from codebase_rag.config import settings
+from codebase_rag.services.utils.metrics import metrics_service
+
+
+class CacheBackend(ABC):
+    """Key/value backend interface, implement this for a shared cache (e.g. Redis)"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, persistent: bool = False):
+        """Store a value; persistent values are exempt from TTL and LRU eviction"""
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache with a TTL on query results"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self._entries = TTLCache(maxsize=max_entries, ttl=ttl)
+        # generation counters must outlive result entries
+        self._persistent: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._persistent:
+                return self._persistent[key]
+            return self._entries.get(key)
+
+    def set(self, key: str, value: Any, persistent: bool = False):
+        with self._lock:
+            if persistent:
+                self._persistent[key] = value
+            else:
+                self._entries[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._persistent.clear()
+
+
+class QueryCache:
+    """
+    Result cache keyed on (endpoint, repo, generation, normalized params).
+
+    Every repository has a generation token that CodeIngestor bumps after
+    writing to the graph. Keys embed the token, so entries of an older
+    ingestion are never read again and simply age out of the backend.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, enabled: bool = True):
+        self.backend = backend or MemoryCacheBackend(
+            max_entries=settings.query_cache_max_entries,
+            ttl=settings.query_cache_ttl
+        )
+        self.enabled = enabled
+
+    @staticmethod
+    def normalize_query(query: Optional[str]) -> str:
+        """Lowercase and collapse whitespace so trivially different queries share an entry"""
+        return re.sub(r'\s+', ' ', (query or '').strip().lower())
+
+    def generation(self, repo_id: str) -> int:
+        """Current cache generation of a repository"""
+        return self.backend.get(f"gen:{repo_id}") or 0
+
+    def bump_generation(self, repo_id: str):
+        """Invalidate all cached results of a repository"""
+        # a timestamp stays unique across processes sharing one backend
+        self.backend.set(f"gen:{repo_id}", time.time_ns(), persistent=True)
+        logger.debug(f"Query cache invalidated for repo {repo_id}")
+
+    def make_key(self, endpoint: str, repo_id: str, params: Dict[str, Any]) -> str:
+        """
+        Build the cache key for the repository's current generation.
+        Take the key before querying, so a result computed while the repo
+        is being re-ingested is stored under the old generation.
+        """
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+        return f"{endpoint}:{repo_id}:{self.generation(repo_id)}:{digest}"
+
+    def get(self, endpoint: str, key: str) -> Optional[Any]:
+        """Return a cached result or None, recording a hit or miss"""
+        if not self.enabled:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Query cache lookup failed: {e}")
+            value = None
+        metrics_service.track_query_cache(endpoint, value is not None)
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store a result"""
+        if not self.enabled:
+            return
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            logger.warning(f"Query cache store failed: {e}")
+
+    def clear(self):
+        self.backend.clear()
+
+
+# Global instance
+query_cache = QueryCache(enabled=settings.query_cache_enabled)
@@ -2,64 +2,101 @@
 Ranking service for search results
 Simple keyword and path matching for file relevance
 """
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import heapq
 import re
 
+TOKEN_PATTERN = re.compile(r'\w+')
+PREFERRED_DIRS = ('src/', 'lib/', 'core/', 'app/')
+
+# per-path features reused across calls: (lowercased path, tokens, dir boost, is test file)
+PathFeatures = Tuple[str, frozenset, float, bool]
+
 
 class Ranker:
     """Search result ranker"""
     
+    MAX_CACHED_PATHS = 200_000
+    
+    def __init__(self):
+        self._features: Dict[str, PathFeatures] = {}
+    
     @staticmethod
+    def tokenize_path(path: str) -> List[str]:
+        """Lowercase word tokens of a path, stored on File nodes at ingestion time"""
+        return sorted(set(TOKEN_PATTERN.findall(path.lower())))
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _compile_query(query: str) -> Tuple[str, frozenset, bool]:
+        query_lower = query.lower()
+        return query_lower, frozenset(TOKEN_PATTERN.findall(query_lower)), 'test' not in query_lower
+    
+    def _path_features(self, path: str, path_tokens: Optional[Iterable[str]]) -> PathFeatures:
+        features = self._features.get(path)
+        if features is None:
+            path_lower = path.lower()
+            tokens = frozenset(path_tokens) if path_tokens is not None else frozenset(TOKEN_PATTERN.findall(path_lower))
+            dir_boost = 1.2 if any(prefix in path_lower for prefix in PREFERRED_DIRS) else 1.0
+            is_test = 'test' in path_lower or 'spec' in path_lower
+            features = (path_lower, tokens, dir_boost, is_test)
+            if len(self._features) >= self.MAX_CACHED_PATHS:
+                self._features.clear()
+            self._features[path] = features
+        return features
+    
     def rank_files(
+        self,
         files: List[Dict[str, Any]],
         query: str,
         limit: int = 30
     ) -> List[Dict[str, Any]]:
-        """Rank files by relevance to query using keyword matching"""
-        query_lower = query.lower()
-        query_terms = set(re.findall(r'\w+', query_lower))
+        """
+        Rank files by relevance to query using keyword matching.
+        
+        Scores are computed in one pass over the candidates using cached path
+        features (and the `path_tokens` stored at ingestion when present), then
+        only the top `limit` files are selected and copied.
+        """
+        query_lower, query_terms, penalize_tests = self._compile_query(query)
+        path_features = self._path_features
         
-        scored_files = []
+        scores = []
         for file in files:
-            path = file.get("path", "").lower()
-            lang = file.get("lang", "").lower()
-            base_score = file.get("score", 1.0)
+            path_lower, path_terms, dir_boost, is_test = path_features(
+                file.get("path", ""), file.get("path_tokens")
+            )
             
-            # Calculate relevance score
-            score = base_score
+            # Prefer files in src/, lib/, core/, app/ directories
+            score = file.get("score", 1.0) * dir_boost
             
             # Exact path match
-            if query_lower in path:
+            if query_lower in path_lower:
                 score *= 2.0
             
             # Term matching in path
-            path_terms = set(re.findall(r'\w+', path))
-            matching_terms = query_terms & path_terms
-            if matching_terms:
-                score *= (1.0 + len(matching_terms) * 0.3)
+            if not query_terms.isdisjoint(path_terms):
+                score *= (1.0 + len(query_terms & path_terms) * 0.3)
             
             # Language match
-            if query_lower in lang:
+            if query_lower in (file.get("lang") or "").lower():
                 score *= 1.5
             
-            # Prefer files in src/, lib/, core/ directories
-            if any(prefix in path for prefix in ['src/', 'lib/', 'core/', 'app/']):
-                score *= 1.2
-            
             # Penalize test files (unless looking for tests)
-            if 'test' not in query_lower and ('test' in path or 'spec' in path):
+            if penalize_tests and is_test:
                 score *= 0.5
             
-            scored_files.append({
-                **file,
-                "score": score
-            })
-        
-        # Sort by score descending
-        scored_files.sort(key=lambda x: x["score"], reverse=True)
+            # Boost central files (precomputed PageRank, scaled to [0, 1])
+            centrality = file.get("centrality")
+            if centrality:
+                score *= (1.0 + centrality * 0.3)
+            
+            scores.append(score)
         
-        # Return top results
-        return scored_files[:limit]
+        # Partial selection instead of sorting every candidate
+        top = heapq.nlargest(limit, range(len(scores)), key=scores.__getitem__)
+        return [{**files[i], "score": scores[i]} for i in top]
     
     @staticmethod
     def generate_file_summary(path: str, lang: str) -> str:
@@ -0,0 +1,157 @@
+"""
+Semantic answer cache for knowledge queries
+Exact-match entries live in QueryCache; near-duplicate questions are matched by embedding similarity
+"""
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from codebase_rag.services.utils.query_cache import QueryCache
+
+
+class SemanticQueryCache:
+    """
+    Two-level answer cache on top of QueryCache.
+
+    Level one is the exact key: normalized question plus pipeline params.
+    Level two keeps the embedding of every cached question per params set
+    and reuses an answer when a new question's cosine similarity to one of
+    them reaches `threshold`. Both levels are scoped to the generation of
+    `scope` in QueryCache, so invalidate() drops every answer at once.
+
+    Level two is off unless `threshold` is below 1.0: it embeds every
+    missed question, and close questions about different identifiers can
+    pass a high similarity threshold.
+    """
+
+    def __init__(
+        self,
+        cache: QueryCache,
+        endpoint: str = "knowledge_query",
+        scope: str = "knowledge",
+        threshold: float = 1.0,
+        max_entries: int = 1024,
+        enabled: bool = True
+    ):
+        self.cache = cache
+        self.endpoint = endpoint
+        self.scope = scope
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._generation = None
+        # params digest -> (exact keys, unit embeddings)
+        self._questions: Dict[str, Any] = {}
+        self._hits = {"exact": 0, "semantic": 0, "miss": 0}
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.enabled and self.threshold < 1.0
+
+    def make_key(self, question: str, params: Dict[str, Any]) -> str:
+        return self.cache.make_key(
+            self.endpoint, self.scope, {"question": self.cache.normalize_query(question), **params}
+        )
+
+    def _params_digest(self, params: Dict[str, Any]) -> str:
+        # same generation-scoped key scheme, minus the question
+        return self.cache.make_key(self.endpoint, self.scope, params)
+
+    @staticmethod
+    def _key_generation(key: str) -> str:
+        # keys are "{endpoint}:{scope}:{generation}:{digest}"
+        return key.rsplit(":", 2)[1]
+
+    def _is_current(self, key: str) -> bool:
+        return self._key_generation(key) == str(self.cache.generation(self.scope))
+
+    def _rows(self, digest: str, create: bool = False):
+        """Embedding rows of a params set, dropping rows of an older generation"""
+        generation = self.cache.generation(self.scope)
+        if generation != self._generation:
+            self._questions.clear()
+            self._generation = generation
+        if create:
+            return self._questions.setdefault(digest, ([], np.zeros((0, 0), dtype=np.float32)))
+        return self._questions.get(digest)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Exact-match lookup (a miss is only counted here when there is no semantic level)"""
+        if not self.enabled:
+            return None
+        value = self.cache.get(self.endpoint, key)
+        with self._lock:
+            if value is not None:
+                self._hits["exact"] += 1
+            elif not self.semantic_enabled:
+                self._hits["miss"] += 1
+        return value
+
+    def get_similar(self, embedding: List[float], params: Dict[str, Any]) -> Optional[Any]:
+        """Answer of the most similar cached question with the same params, if similar enough"""
+        if not self.semantic_enabled:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        with self._lock:
+            rows = self._rows(self._params_digest(params))
+            if rows is None or norm == 0 or len(rows[0]) == 0 or rows[1].shape[1] != len(query):
+                self._hits["miss"] += 1
+                return None
+            keys, matrix = rows
+            similarities = matrix @ (query / norm)
+            best = int(np.argmax(similarities))
+            key = keys[best] if similarities[best] >= self.threshold else None
+
+        value = self.cache.get(f"{self.endpoint}_semantic", key) if key else None
+        with self._lock:
+            self._hits["semantic" if value is not None else "miss"] += 1
+        return value
+
+    def set(self, key: str, value: Any, params: Dict[str, Any], embedding: Optional[List[float]] = None):
+        """Store an answer and, when given, the question embedding for similarity lookups"""
+        if not self.enabled or not self._is_current(key):
+            # the key was taken before an invalidate(); the answer may be stale
+            return
+        self.cache.set(key, value)
+        if embedding is None or not self.semantic_enabled:
+            return
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return
+        with self._lock:
+            if not self._is_current(key):
+                return
+            digest = self._params_digest(params)
+            keys, matrix = self._rows(digest, create=True)
+            if matrix.shape[1] not in (0, len(vector)):
+                keys, matrix = [], np.zeros((0, 0), dtype=np.float32)
+            if not len(keys):
+                matrix = np.zeros((0, len(vector)), dtype=np.float32)
+            keys = (keys + [key])[-self.max_entries:]
+            matrix = np.vstack([matrix, vector / norm])[-self.max_entries:]
+            self._questions[digest] = (keys, matrix)
+
+    def invalidate(self):
+        """Drop all cached answers (the knowledge base changed)"""
+        self.cache.bump_generation(self.scope)
+        with self._lock:
+            self._questions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = dict(self._hits)
+            questions = sum(len(keys) for keys, _ in self._questions.values())
+        lookups = hits["exact"] + hits["semantic"] + hits["miss"]
+        return {
+            "enabled": self.enabled,
+            "exact_hits": hits["exact"],
+            "semantic_hits": hits["semantic"],
+            "misses": hits["miss"],
+            "hit_rate": round((hits["exact"] + hits["semantic"]) / lookups, 4) if lookups else 0.0,
+            "semantic_entries": questions,
+            "similarity_threshold": self.threshold,
+        }
@@ -0,0 +1,25 @@
+"""
+Start method for worker process pools
+Pools are started from inside the running server, so workers must not be forked from it
+"""
+import multiprocessing
+from multiprocessing.context import BaseContext
+
+# Modules worker processes run code from; the fork server imports them once,
+# so a new worker starts without importing them again
+WORKER_MODULES = [
+    "codebase_rag.services.knowledge.ingestion_executor",
+    "codebase_rag.services.pipeline.transformers",
+]
+
+
+def get_worker_context() -> BaseContext:
+    """
+    forkserver where available, spawn elsewhere. Forking the server directly
+    would copy locks held by its driver and executor threads into the workers.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(WORKER_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
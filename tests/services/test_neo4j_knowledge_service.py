@@ -0,0 +1,87 @@
+import importlib
+import threading
+
+import pytest
+
+try:
+    knowledge_module = importlib.import_module("src.codebase_rag.services.knowledge.neo4j_knowledge_service")
+    from llama_index.core.schema import NodeWithScore, TextNode
+except ImportError:  # pragma: no cover - dependency mismatch
+    knowledge_module = None
+
+pytestmark = pytest.mark.skipif(knowledge_module is None, reason="llama_index could not be imported")
+
+
+def _node(node_id: str, score: float) -> "NodeWithScore":
+    return NodeWithScore(node=TextNode(id_=node_id, text=node_id), score=score)
+
+
+def _pipeline(graph_stage, vector_stage):
+    pipeline = knowledge_module.Neo4jRAGPipeline(
+        storage_context=None, response_synthesizer=None, llm=None, vector_index=object()
+    )
+    pipeline._graph_retrieve = lambda query_bundle, config: graph_stage()
+    pipeline._vector_retrieve = lambda question, query_bundle, config: vector_stage()
+    return pipeline
+
+
+def test_slow_graph_stage_times_out_without_blocking_vector_nodes():
+    release = threading.Event()
+
+    def stalled_graph():
+        release.wait(5)
+        return [_node("graph", 1.0)], {}
+
+    pipeline = _pipeline(stalled_graph, lambda: ([_node("vec-1", 0.9), _node("vec-2", 0.8)], {"source": "test"}))
+    config = knowledge_module.PipelineConfig(graph_timeout=0.2, vector_timeout=2.0)
+    try:
+        result = pipeline.retrieve("how is the token parsed", config)
+    finally:
+        release.set()
+
+    steps = {step["step"]: step for step in result["steps"]}
+    assert [node.node.node_id for node in result["nodes"]] == ["vec-1", "vec-2"]
+    assert steps["vector_retrieval"]["status"] == "ok"
+    assert steps["graph_retrieval"]["status"] == "timeout"
+    assert 200 <= steps["graph_retrieval"]["latency_ms"] < 2000
+    assert result["retrieval_latency_ms"] < 2000
+
+
+def test_overrunning_stage_is_skipped_until_its_threads_return(monkeypatch):
+    monkeypatch.setattr(knowledge_module, "_MAX_OVERRUNNING_PER_STAGE", 1)
+    release = threading.Event()
+    calls = []
+
+    def stalled_graph():
+        calls.append(1)
+        release.wait(5)
+        return [], {}
+
+    pipeline = _pipeline(stalled_graph, lambda: ([_node("vec", 0.5)], {}))
+    config = knowledge_module.PipelineConfig(graph_timeout=0.1)
+    try:
+        first = pipeline.retrieve("q", config)
+        second = pipeline.retrieve("q", config)
+    finally:
+        release.set()
+
+    assert first["steps"][0]["status"] == "timeout"
+    assert second["steps"][0]["status"] == "skipped"
+    assert [node.node.node_id for node in second["nodes"]] == ["vec"]
+    assert len(calls) == 1
+
+
+def test_fuse_nodes_ranks_by_reciprocal_rank_and_dedups():
+    fuse = knowledge_module.Neo4jRAGPipeline._fuse_nodes
+    graph = [_node("shared", 0.2), _node("graph-only", 0.9)]
+    vector = [_node("vector-only", 0.95), _node("shared", 0.9), _node("tail", 0.1)]
+
+    fused = fuse([graph, vector], limit=3, k=60)
+
+    # rank 2 in both lists beats a single first place; ties keep first-seen order
+    assert [node.node.node_id for node in fused] == ["shared", "graph-only", "vector-only"]
+    assert fused[0].score == pytest.approx(2 / 62)
+    assert fused[1].score == pytest.approx(1 / 61)
+    assert len({node.node.node_id for node in fused}) == 3
+    assert fuse([graph, vector], limit=10)[-1].node.node_id == "tail"
+    assert fuse([], limit=5) == []
@@ -1,5 +1,6 @@
 import asyncio
 import importlib.util
+import sys
 from pathlib import Path
 from typing import Dict
 
@@ -11,6 +12,7 @@ try:
         Path("src/codebase_rag/services/knowledge/pipeline_components.py"),
     )
     pipeline_components = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = pipeline_components
     assert spec.loader is not None
     spec.loader.exec_module(pipeline_components)
 except ImportError:  # pragma: no cover - dependency mismatch
@@ -20,8 +22,24 @@ else:
     build_pipeline_bundle = pipeline_components.build_pipeline_bundle
     merge_pipeline_configs = pipeline_components.merge_pipeline_configs
 
+try:
+    # Worker processes import this file again when they unpickle the transformations
+    # below; keep the module whose _init_worker already ran instead of replacing it.
+    ingestion_executor = sys.modules.get("codebase_rag.services.knowledge.ingestion_executor")
+    if ingestion_executor is None:
+        spec = importlib.util.spec_from_file_location(
+            "codebase_rag.services.knowledge.ingestion_executor",
+            Path("src/codebase_rag/services/knowledge/ingestion_executor.py"),
+        )
+        ingestion_executor = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = ingestion_executor
+        assert spec.loader is not None
+        spec.loader.exec_module(ingestion_executor)
+except ImportError:  # pragma: no cover - dependency mismatch
+    ingestion_executor = None
+
 pytestmark = pytest.mark.skipif(
-    pipeline_components is None, reason="llama_index could not be imported"
+    pipeline_components is None or ingestion_executor is None, reason="llama_index could not be imported"
 )
 
 
@@ -101,3 +119,72 @@ def test_merge_pipeline_configs_allows_override():
     assert merged["file"]["connector"]["class_path"] == "default.Connector"
     assert merged["file"]["connector"]["kwargs"] == {"recursive": False}
     assert "custom" in merged
+
+
+class ExitOnMarker(pipeline_components.BaseTransformation if pipeline_components else object):
+    """Splits documents into one node each, killing the worker on documents containing 'CRASH'."""
+
+    def __call__(self, nodes, **kwargs):
+        import os
+        import time
+        from llama_index.core.schema import TextNode
+
+        if any("CRASH" in node.get_content() for node in nodes):
+            os._exit(1)
+        time.sleep(0.2)  # keep the other documents in flight when the worker dies
+        return [TextNode(text=node.get_content(), metadata=dict(node.metadata)) for node in nodes]
+
+
+class SlowOnMarker(pipeline_components.BaseTransformation if pipeline_components else object):
+    """Splits documents into one node each, hanging on documents containing 'HANG'."""
+
+    def __call__(self, nodes, **kwargs):
+        import time
+        from llama_index.core.schema import TextNode
+
+        for node in nodes:
+            if "HANG" in node.get_content():
+                time.sleep(30)
+        return [TextNode(text=node.get_content(), metadata=dict(node.metadata)) for node in nodes]
+
+
+def test_streaming_executor_batches_and_isolates_slow_documents(tmp_path):
+    for i in range(5):
+        (tmp_path / f"doc{i}.txt").write_text("HANG" if i == 2 else f"document {i}")
+    connector = pipeline_components.SimpleDirectoryConnector(tmp_path)
+
+    written, progress = [], []
+    executor = ingestion_executor.StreamingIngestionExecutor(
+        [SlowOnMarker()],
+        lambda nodes: written.append(len(nodes)),
+        window_size=3,
+        max_workers=2,
+        write_batch_size=2,
+        document_timeout=2,
+        progress_callback=lambda pct, message: progress.append(pct),
+    )
+    stats = executor.run(pipeline_components.iter_connector_documents(connector), connector.document_count())
+
+    assert stats.documents == 5 and stats.nodes == 4
+    assert written == [2, 2]
+    assert [f["document"].endswith("doc2.txt") for f in stats.failed] == [True]
+    assert progress[-1] == 100.0 and len(progress) == 5
+    assert stats.elapsed < 20, "the hanging document must not hold up the run"
+
+
+def test_streaming_executor_fails_only_the_document_that_kills_its_worker():
+    from llama_index.core import Document
+
+    documents = [Document(text="CRASH" if i == 1 else f"document {i}", metadata={"file_name": f"doc{i}"}) for i in range(6)]
+    written = []
+    executor = ingestion_executor.StreamingIngestionExecutor(
+        [ExitOnMarker()],
+        lambda nodes: written.extend(node.get_content() for node in nodes),
+        window_size=6,
+        max_workers=2,
+    )
+    stats = executor.run(documents)
+
+    assert stats.documents == 6 and stats.nodes == 5
+    assert sorted(written) == [f"document {i}" for i in range(6) if i != 1]
+    assert [f["document"] for f in stats.failed] == ["doc1"]
@@ -286,6 +286,7 @@ class TestContextPackAPI:
         # First ingest data
         ingest_response = test_client.post("/api/v1/ingest/repo", json={
             "local_path": test_repo_path,
+            "wait": True,
             "include_globs": ["**/*.py"],
             "exclude_globs": []
         })
@@ -318,6 +319,7 @@ class TestContextPackIntegration:
         # 1. Ingest repository
         ingest_response = test_client.post("/api/v1/ingest/repo", json={
             "local_path": test_repo_path,
+            "wait": True,
             "include_globs": ["**/*.py", "**/*.ts"],
             "exclude_globs": []
         })
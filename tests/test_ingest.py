@@ -2,7 +2,9 @@
 Tests for repository ingestion functionality
 Tests POST /ingest/repo endpoint
 """
+import asyncio
 import pytest
+from unittest.mock import MagicMock
 from src.codebase_rag.services.code import CodeIngestor, Neo4jGraphService
 
 
@@ -66,6 +68,786 @@ class TestCodeIngestor:
         node_modules_files = [f for f in files if "node_modules" in f["path"]]
         assert len(node_modules_files) == 0, "Should exclude node_modules"
 
+    @pytest.mark.unit
+    def test_iter_files_streams_records(self, test_repo_path):
+        """iter_files yields the same records as scan_files, lazily"""
+        import types
+
+        ingestor = CodeIngestor(Neo4jGraphService())
+        globs = (["**/*.py", "**/*.ts"], ["**/node_modules/**"])
+
+        stream = ingestor.iter_files(test_repo_path, *globs, max_workers=2)
+        assert isinstance(stream, types.GeneratorType)
+
+        streamed = sorted(stream, key=lambda f: f["path"])
+        scanned = sorted(ingestor.scan_files(test_repo_path, *globs), key=lambda f: f["path"])
+        assert streamed == scanned
+        # Root-level files match '**/' globs too
+        assert "main.py" in {f["path"] for f in streamed}
+
+    @pytest.mark.unit
+    def test_file_info_content_and_sha(self, tmp_path):
+        """Content and hash come from a single read; large files keep only the hash"""
+        import hashlib
+
+        small = tmp_path / "small.py"
+        small.write_text("x = 1\n")
+        large = tmp_path / "large.py"
+        large.write_bytes(b"#" * (CodeIngestor.MAX_CONTENT_SIZE + 1))
+
+        ingestor = CodeIngestor(Neo4jGraphService())
+        files = {f["path"]: f for f in ingestor.scan_files(str(tmp_path), ["*.py"], [])}
+
+        assert files["small.py"]["content"] == "x = 1\n"
+        assert files["small.py"]["sha"] == hashlib.sha256(b"x = 1\n").hexdigest()[:16]
+        assert files["large.py"]["content"] is None
+        assert files["large.py"]["sha"] == hashlib.sha256(large.read_bytes()).hexdigest()[:16]
+
+
+class TestBatchedFileWrites:
+    """Test batched UNWIND file ingestion"""
+
+    @staticmethod
+    def _make_service(execute_write):
+        service = Neo4jGraphService()
+        session = MagicMock()
+        session.execute_write.side_effect = execute_write
+        service.driver = MagicMock()
+        service.driver.session.return_value.__enter__.return_value = session
+        service._connected = True
+        return service, session
+
+    @pytest.mark.unit
+    def test_files_written_in_batches(self, sample_files):
+        """Files are split into batches that share one session"""
+        service, session = self._make_service(lambda fn, repo_id, rows: len(rows))
+
+        result = service.create_files_batch("repo", sample_files, batch_size=2)
+
+        assert result["success"]
+        assert result["files_processed"] == 3
+        assert [b["size"] for b in result["batches"]] == [2, 1]
+        assert all("duration_ms" in b for b in result["batches"])
+        assert service.driver.session.call_count == 1
+        assert session.execute_write.call_count == 2
+
+    @pytest.mark.unit
+    def test_failed_batch_retried_alone(self, sample_files, monkeypatch):
+        """A failing batch is retried without rewriting committed batches"""
+        monkeypatch.setattr("time.sleep", lambda _: None)
+        calls = []
+
+        def execute_write(fn, repo_id, rows):
+            calls.append([r["path"] for r in rows])
+            if len(calls) == 2:
+                raise RuntimeError("transient failure")
+            return len(rows)
+
+        service, _ = self._make_service(execute_write)
+        result = service.create_files_batch("repo", sample_files, batch_size=2, max_retries=2)
+
+        assert result["files_processed"] == 3
+        assert result["failed_batches"] == []
+        assert result["batches"][1]["attempts"] == 2
+        # First batch committed once, second batch written twice
+        assert calls[0] == [f["path"] for f in sample_files[:2]]
+        assert calls[1] == calls[2] == [sample_files[2]["path"]]
+
+    @pytest.mark.unit
+    def test_batch_reported_after_max_retries(self, sample_files, monkeypatch):
+        """A batch that keeps failing is reported instead of aborting the run"""
+        monkeypatch.setattr("time.sleep", lambda _: None)
+
+        def execute_write(fn, repo_id, rows):
+            if rows[0]["path"] == sample_files[0]["path"]:
+                raise RuntimeError("boom")
+            return len(rows)
+
+        service, _ = self._make_service(execute_write)
+        result = service.create_files_batch("repo", sample_files, batch_size=1, max_retries=1)
+
+        assert result["failed_batches"] == [0]
+        assert result["files_processed"] == 2
+
+
+class TestIncrementalSync:
+    """Test content-hash based skipping on full re-ingestion"""
+
+    @pytest.mark.unit
+    def test_unchanged_files_skipped_and_missing_deleted(self, sample_files):
+        """Only changed files are written and vanished files are removed"""
+        service = MagicMock()
+        service.get_file_shas.return_value = {
+            "src/auth/token.py": "abc123",   # unchanged
+            "src/auth/user.py": "stale",     # modified
+            "src/old/removed.py": "zzz999",  # deleted from the repo
+        }
+        written = []
+
+        def create_files_batch(repo_id, files, batch_size=None, on_batch=None):
+            rows = list(files)
+            written.extend(f["path"] for f in rows)
+            return {"success": True, "files_processed": len(rows), "batches": [], "failed_batches": []}
+
+        service.create_files_batch.side_effect = create_files_batch
+        service.delete_files.return_value = {"success": True, "nodes_deleted": 1}
+
+        result = CodeIngestor(service).ingest_files(
+            "repo", sample_files, skip_unchanged=True, delete_missing=True
+        )
+
+        assert written == ["src/auth/user.py", "src/api/routes.ts"]
+        assert result["files_skipped"] == 1
+        assert result["files_deleted"] == 1
+        assert result["total_files"] == 3
+        service.delete_files.assert_called_once_with("repo", ["src/old/removed.py"], None)
+
+    @pytest.mark.unit
+    def test_delete_missing_limited_to_scan_scope(self, sample_files, tmp_path):
+        """Unseen files under other globs or still on disk are kept"""
+        (tmp_path / "src" / "auth").mkdir(parents=True)
+        (tmp_path / "src" / "auth" / "unreadable.py").write_text("x = 1\n")
+        service = MagicMock()
+        service.get_file_shas.return_value = {
+            "src/old/removed.py": "a",        # gone from disk
+            "docs/guide.md": "b",             # ingested under other globs
+            "vendor/lib/dep.py": "c",         # excluded from this scan
+            "src/auth/unreadable.py": "d",    # exists but the scan skipped it
+        }
+        service.create_files_batch.side_effect = lambda repo_id, files, batch_size=None, on_batch=None: {
+            "success": True, "files_processed": len(list(files)), "batches": [], "failed_batches": []
+        }
+        service.delete_files.return_value = {"success": True}
+
+        result = CodeIngestor(service).ingest_files(
+            "repo", sample_files, delete_missing=True, repo_path=str(tmp_path),
+            include_globs=["**/*.py", "**/*.ts"], exclude_globs=["**/vendor/**"]
+        )
+
+        assert result["files_deleted"] == 1
+        service.delete_files.assert_called_once_with("repo", ["src/old/removed.py"], None)
+
+
+class TestGitIncremental:
+    """Test git-driven incremental ingestion"""
+
+    @pytest.mark.unit
+    def test_parse_name_status_renames(self):
+        """Rename lines carry both old and new paths"""
+        from src.codebase_rag.services.utils import GitUtils
+
+        changes = GitUtils._parse_name_status("M\ta.py\nR087\told/b.py\tnew/b.py\nD\tc.py\n")
+
+        assert changes[0] == {"path": "a.py", "status": "M", "action": "modified"}
+        assert changes[1] == {
+            "path": "new/b.py", "status": "R", "action": "renamed", "old_path": "old/b.py"
+        }
+        assert changes[2]["action"] == "deleted"
+
+    @pytest.mark.unit
+    def test_ingest_changes_reads_only_changed_paths(self, test_repo_path):
+        """Deletes and renames go straight to the graph; only changed files are read"""
+        service = MagicMock()
+        service.get_file_shas.return_value = {}
+        service.delete_files.return_value = {"success": True}
+        service.rename_files.return_value = {"success": True, "renamed": 1}
+        written = []
+
+        def create_files_batch(repo_id, files, batch_size=None, on_batch=None):
+            rows = list(files)
+            written.extend(f["path"] for f in rows)
+            return {"success": True, "files_processed": len(rows), "batches": [], "failed_batches": []}
+
+        service.create_files_batch.side_effect = create_files_batch
+
+        result = CodeIngestor(service).ingest_changes(
+            repo_id="repo",
+            repo_path=test_repo_path,
+            changed_files=[
+                {"path": "main.py", "status": "M"},
+                {"path": "utils/helpers.py", "status": "R", "old_path": "helpers.py"},
+                {"path": "gone.py", "status": "D"},
+                {"path": "README.md", "status": "A"},
+            ],
+            include_globs=["**/*.py"],
+            exclude_globs=[]
+        )
+
+        assert sorted(written) == ["main.py", "utils/helpers.py"]
+        assert result["files_deleted"] == 1
+        assert result["files_renamed"] == 1
+        service.rename_files.assert_called_once_with(
+            "repo", [{"old_path": "helpers.py", "path": "utils/helpers.py"}]
+        )
+        service.get_file_shas.assert_not_called()
+
+    @pytest.mark.unit
+    def test_failed_batches_keep_last_commit(self, test_repo_path, monkeypatch):
+        """A run with failed batches is partial and does not advance last_commit"""
+        from src.codebase_rag.services.code import code_ingestor as module
+
+        monkeypatch.setattr(module.git_utils, "get_last_commit_hash", lambda path: "new-head")
+        service = MagicMock()
+        service.get_file_shas.return_value = {}
+        service.create_files_batch.side_effect = lambda repo_id, files, batch_size=None, on_batch=None: {
+            "success": True, "files_processed": len(list(files)) - 1, "batches": [], "failed_batches": [1]
+        }
+
+        result = CodeIngestor(service).ingest_repository(
+            local_path=test_repo_path, include_globs=["**/*.py"], exclude_globs=[]
+        )
+
+        assert result["success"] and result["status"] == "partial"
+        assert result["last_commit"] is None
+        assert all("last_commit" not in call.args[1] for call in service.create_repo.call_args_list)
+
+    @pytest.mark.unit
+    def test_incremental_on_fresh_repo_ingests_all_files(self, test_repo_path, monkeypatch):
+        """Without a recorded commit, incremental mode ingests the whole tree"""
+        from src.codebase_rag.services.code import code_ingestor as module
+
+        monkeypatch.setattr(module.git_utils, "is_git_repo", lambda path: True)
+        monkeypatch.setattr(module.git_utils, "get_last_commit_hash", lambda path: "head")
+        get_changed_files = MagicMock()
+        monkeypatch.setattr(module.git_utils, "get_changed_files", get_changed_files)
+        service = MagicMock()
+        service.get_repo_last_commit.return_value = None
+        service.get_file_shas.return_value = {}
+        written = []
+
+        def create_files_batch(repo_id, files, batch_size=None, on_batch=None):
+            rows = list(files)
+            written.extend(f["path"] for f in rows)
+            return {"success": True, "files_processed": len(rows), "batches": [], "failed_batches": []}
+
+        service.create_files_batch.side_effect = create_files_batch
+
+        result = CodeIngestor(service).ingest_repository(
+            local_path=test_repo_path, mode="incremental", include_globs=["**/*.py"], exclude_globs=[]
+        )
+
+        get_changed_files.assert_not_called()
+        assert result["success"] and result["mode"] == "full"
+        assert sorted(written) == sorted(
+            f["path"] for f in CodeIngestor(service).scan_files(test_repo_path, ["**/*.py"], [])
+        )
+        assert result["last_commit"] == "head"
+
+    @pytest.mark.unit
+    def test_all_files_removed_prunes_graph(self, tmp_path, monkeypatch):
+        """A full run over a repo with no matching files left deletes the stale File nodes"""
+        from src.codebase_rag.services.code import code_ingestor as module
+
+        monkeypatch.setattr(module.git_utils, "get_last_commit_hash", lambda path: "head")
+        (tmp_path / "README.md").write_text("nothing to ingest\n")
+        service = MagicMock()
+        service.get_file_shas.return_value = {"main.py": "abc", "lib/util.py": "def"}
+        service.create_files_batch.side_effect = lambda repo_id, files, batch_size=None, on_batch=None: {
+            "success": True, "files_processed": len(list(files)), "batches": [], "failed_batches": []
+        }
+        service.delete_files.return_value = {"success": True}
+        repo_id = module.git_utils.get_repo_id_from_path(str(tmp_path))
+        generation = module.query_cache.generation(repo_id)
+
+        result = CodeIngestor(service).ingest_repository(
+            local_path=str(tmp_path), include_globs=["**/*.py"], exclude_globs=[]
+        )
+
+        assert result["success"] and result["files_deleted"] == 2
+        assert sorted(service.delete_files.call_args.args[1]) == ["lib/util.py", "main.py"]
+        service.create_repo.assert_any_call(repo_id, {"last_commit": "head"})
+        assert module.query_cache.generation(repo_id) != generation
+
+    @pytest.mark.unit
+    def test_unchanged_repo_skips_centrality(self, test_repo_path, monkeypatch):
+        """Centrality is only recomputed when the run changed the graph"""
+        from src.codebase_rag.services.code import code_ingestor as module
+
+        monkeypatch.setattr(module.git_utils, "is_git_repo", lambda path: True)
+        monkeypatch.setattr(module.git_utils, "get_changed_files", lambda **kwargs: {
+            "success": True, "changed_files": []
+        })
+        service = MagicMock()
+        service.update_centrality.return_value = {"success": True}
+
+        result = CodeIngestor(service).ingest_repository(local_path=test_repo_path, mode="incremental")
+
+        assert result["success"] and result["files_processed"] == 0
+        service.update_centrality.assert_not_called()
+
+        service.get_file_shas.return_value = {}
+        service.create_files_batch.side_effect = lambda repo_id, files, batch_size=None, on_batch=None: {
+            "success": True, "files_processed": len(list(files)), "batches": [], "failed_batches": []
+        }
+        CodeIngestor(service).ingest_repository(local_path=test_repo_path, include_globs=["**/*.py"], exclude_globs=[])
+
+        service.update_centrality.assert_called_once()
+
+
+class TestBlobStore:
+    """Test content-addressed storage of file bodies"""
+
+    @pytest.mark.unit
+    def test_file_bodies_stored_once_by_sha(self, tmp_path):
+        """Identical files share one blob and the graph keeps only the sha"""
+        from src.codebase_rag.services.code import BlobStore
+
+        repo = tmp_path / "repo"
+        (repo / "a").mkdir(parents=True)
+        (repo / "a" / "one.py").write_text("x = 1\ny = 2\n")
+        (repo / "two.py").write_text("x = 1\ny = 2\n")
+
+        ingestor = CodeIngestor(MagicMock())
+        ingestor.blob_store = BlobStore(str(tmp_path / "blobs"))
+        files = ingestor.scan_files(str(repo), ["**/*.py"], [])
+
+        assert {f["content"] for f in files} == {None}
+        assert len({f["sha"] for f in files}) == 1
+        assert len([p for p in (tmp_path / "blobs").rglob("*") if p.is_file()]) == 1
+
+    @pytest.mark.unit
+    def test_read_line_ranges(self, tmp_path):
+        """Line ranges are inclusive and 1-based"""
+        from src.codebase_rag.services.code import BlobStore
+
+        store = BlobStore(str(tmp_path))
+        store.put("abcdef0123456789", b"l1\nl2\nl3\nl4")
+
+        assert store.read_lines("abcdef0123456789", 2, 3) == "l2\nl3\n"
+        assert store.read_lines("abcdef0123456789", 3) == "l3\nl4"
+        assert store.read_lines("abcdef0123456789", 1, 1000) == "l1\nl2\nl3\nl4"
+        assert store.read_lines("0000000000000000") is None
+
+    @pytest.mark.unit
+    def test_parse_ref(self):
+        """ref:// handles produced by the ranker round-trip"""
+        from src.codebase_rag.services.code import BlobStore
+        from src.codebase_rag.services.utils import Ranker
+
+        ref = Ranker.generate_ref_handle("src/auth/token.py", 10, 20)
+        assert BlobStore.parse_ref(ref) == {"path": "src/auth/token.py", "start_line": 10, "end_line": 20}
+        assert BlobStore.parse_ref("file://nope") is None
+
+
+class TestEmbeddingBatching:
+    """Test cached, micro-batched embedding generation"""
+
+    class FakeGenerator:
+        model = "fake"
+
+        def __init__(self, fail_batches=False):
+            self.batches = []
+            self.fail_batches = fail_batches
+
+        async def generate_embedding(self, text):
+            return [float(len(text)), 0.5]
+
+        async def generate_embeddings(self, texts):
+            self.batches.append(list(texts))
+            if self.fail_batches:
+                raise Exception("batch endpoint unavailable")
+            return [[float(len(t)), 0.5] for t in texts]
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_batches_and_cache(self, tmp_path):
+        """Texts are deduplicated, split into micro-batches and never embedded twice"""
+        from src.codebase_rag.services.pipeline.embeddings import BatchingEmbeddingGenerator, EmbeddingCache
+
+        cache = EmbeddingCache(str(tmp_path / "embeddings.db"))
+        inner = self.FakeGenerator()
+        generator = BatchingEmbeddingGenerator(inner, batch_size=2, max_concurrency=2, cache=cache)
+        texts = ["a", "bb", "ccc", "a", "dddd"]
+
+        first = await generator.generate_embeddings(texts)
+        assert first == [[1.0, 0.5], [2.0, 0.5], [3.0, 0.5], [1.0, 0.5], [4.0, 0.5]]
+        assert sorted(len(b) for b in inner.batches) == [2, 2]
+
+        # a fresh generator over the same cache file makes no calls
+        again = self.FakeGenerator()
+        second = await BatchingEmbeddingGenerator(again, cache=EmbeddingCache(str(tmp_path / "embeddings.db"))).generate_embeddings(texts)
+        assert second == first
+        assert again.batches == []
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_cache_is_keyed_by_dimension(self, tmp_path):
+        """Changing the vector dimension never serves vectors cached at the old size"""
+        from src.codebase_rag.services.pipeline.embeddings import (
+            BatchingEmbeddingGenerator, EmbeddingCache, LocalEmbeddingGenerator
+        )
+
+        cache = EmbeddingCache(str(tmp_path / "embeddings.db"))
+        small = await BatchingEmbeddingGenerator(LocalEmbeddingGenerator(dimension=32), cache=cache).generate_embeddings(["a b"])
+        large = await BatchingEmbeddingGenerator(LocalEmbeddingGenerator(dimension=64), cache=cache).generate_embeddings(["a b"])
+
+        assert len(small[0]) == 32 and len(large[0]) == 64
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_failed_batch_falls_back_per_text(self):
+        """A failing batch request is retried one text at a time"""
+        from src.codebase_rag.services.pipeline.embeddings import BatchingEmbeddingGenerator
+
+        generator = BatchingEmbeddingGenerator(self.FakeGenerator(fail_batches=True), batch_size=8)
+
+        assert await generator.generate_embeddings(["x", "yy"]) == [[1.0, 0.5], [2.0, 0.5]]
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_close_reaches_the_http_session(self):
+        """Closing the wrapper, or the default generator on shutdown, closes the shared session"""
+        from src.codebase_rag.services.pipeline import embeddings
+
+        ollama = embeddings.OllamaEmbeddingGenerator()
+        session = await ollama._get_session()
+        await embeddings.BatchingEmbeddingGenerator(ollama).close()
+        assert session.closed
+
+        embeddings.set_default_embedding_generator(ollama)
+        session = await ollama._get_session()
+        try:
+            await embeddings.close_default_embedding_generator()
+        finally:
+            embeddings.set_default_embedding_generator(None)
+        assert session.closed
+
+        await embeddings.BatchingEmbeddingGenerator(self.FakeGenerator()).close()  # nothing to close
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_local_provider_is_deterministic(self):
+        """The local provider embeds offline at the configured dimension"""
+        import numpy as np
+        from src.codebase_rag.services.pipeline.embeddings import EmbeddingGeneratorFactory
+
+        generator = EmbeddingGeneratorFactory.create_generator({"provider": "local", "dimension": 64})
+        vectors = await generator.generate_embeddings(["parse the token", "parse the token", "render html"])
+
+        assert len(vectors[0]) == 64
+        assert vectors[0] == vectors[1]
+        assert np.linalg.norm(vectors[0]) == pytest.approx(1.0, abs=1e-5)
+        similar = np.dot(vectors[0], await generator.generate_embedding("parsing tokens"))
+        assert similar > np.dot(vectors[0], vectors[2])
+
+
+class TestAnnIndex:
+    """Test the local approximate nearest neighbour index"""
+
+    @pytest.mark.unit
+    def test_ann_index_search_and_reload(self, tmp_path):
+        """The local ANN index finds near neighbours before and after clustering and survives a reload"""
+        import numpy as np
+        from src.codebase_rag.services.utils import AnnIndex
+
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(20, 32))
+        vectors = np.repeat(centers, 100, axis=0) + 0.05 * rng.normal(size=(2000, 32))
+        ids = [f"n{i}" for i in range(len(vectors))]
+
+        index = AnnIndex(str(tmp_path / "ann"), nprobe=4)
+        index.add(ids[:500], vectors[:500], texts=ids[:500])
+        assert index.query(vectors[42], top_k=1)[0]["id"] == "n42"  # unclustered rows are scanned exactly
+
+        index.add(ids[500:], vectors[500:], texts=ids[500:])  # large enough to trigger clustering
+        reloaded = AnnIndex(str(tmp_path / "ann"), nprobe=4)
+        assert len(reloaded) == 2000
+        for i in (7, 1234, 1999):
+            hit = reloaded.query(vectors[i], top_k=1)[0]
+            assert hit["id"] == f"n{i}" and hit["text"] == f"n{i}"
+            assert hit["score"] == pytest.approx(1.0, abs=1e-5)
+
+    @pytest.mark.unit
+    def test_upsert_replaces_rows_and_complete_flag(self, tmp_path):
+        """Re-adding an id serves its latest text only, before and after a build and a reload"""
+        import numpy as np
+        from src.codebase_rag.services.utils import AnnIndex
+
+        index = AnnIndex(str(tmp_path / "ann"))
+        assert not index.complete
+        index.add(["a", "b"], [[1.0, 0.0], [0.0, 1.0]], texts=["old a", "b"])
+        index.add(["a"], [[0.9, 0.1]], texts=["new a"])
+        assert [(hit["id"], hit["text"]) for hit in index.query([1.0, 0.0], top_k=2)] == [("a", "new a"), ("b", "b")]
+
+        index.build()
+        index.mark_complete()
+        assert len(index) == 2  # the superseded row is dropped
+
+        reloaded = AnnIndex(str(tmp_path / "ann"))
+        assert reloaded.complete
+        reloaded.add(["b"], [[0.0, 1.0]], texts=["new b"])
+        assert [hit["text"] for hit in reloaded.query(np.array([0.0, 1.0]), top_k=2)] == ["new b", "new a"]
+
+        reloaded.clear()
+        assert not reloaded.complete and reloaded.query([1.0, 0.0]) == []
+
+    @pytest.mark.unit
+    def test_search_results_survive_rebuild(self, tmp_path):
+        """Hits found before a build() still resolve to their own payloads after it"""
+        import numpy as np
+        from src.codebase_rag.services.utils import AnnIndex
+
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(200, 16))
+        ids = [f"n{i}" for i in range(len(vectors))]
+        index = AnnIndex(str(tmp_path / "ann"))
+        index.add(ids, vectors)
+
+        hits = index.search(vectors[150], top_k=3)
+        index.build(n_clusters=8)  # regroups rows by cluster
+
+        assert index.get_payload(hits[0][0])["id"] == "n150"
+
+def _parse_or_exit(items):
+    """Parse worker that kills its process on sources containing CRASH"""
+    import os
+    from src.codebase_rag.services.pipeline.base import DataSource, DataSourceType
+    from src.codebase_rag.services.pipeline.transformers import CodeTransformer, _result_record
+
+    if any("CRASH" in content for _, content in items):
+        os._exit(1)
+    return [
+        _result_record(CodeTransformer().parse(
+            DataSource(id=source_id, name=name, type=DataSourceType.CODE, source_path=path, metadata={"language": language}),
+            content
+        ))
+        for (source_id, name, path, language), content in items
+    ]
+
+
+class TestCodeParsePool:
+    """Test code parsing in worker processes"""
+
+    SOURCE = (
+        "import os\n"
+        "from auth.tokens import parse\n\n"
+        "class Reader(Base):\n"
+        "    def read(self, path):\n"
+        "        return parse(open(path))\n"
+    )
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("workers", [2, 0])
+    async def test_pool_matches_in_process_parsing(self, workers):
+        """Pooled parsing returns the same chunks and relations as parsing in-process"""
+        from src.codebase_rag.services.pipeline.base import DataSource, DataSourceType
+        from src.codebase_rag.services.pipeline.transformers import CodeParsePool, CodeTransformer
+
+        sources = [
+            DataSource(name=f"m{i}.py", type=DataSourceType.CODE, source_path=f"m{i}.py", metadata={"language": "python"})
+            for i in range(5)
+        ]
+        pool = CodeParsePool(max_workers=workers, chunk_size=2)
+        try:
+            results = await asyncio.gather(*(pool.parse(source, self.SOURCE) for source in sources))
+        finally:
+            pool.close()
+
+        for source, result in zip(sources, results):
+            expected = CodeTransformer().parse(source, self.SOURCE)
+            assert result.success and result.source_id == source.id
+            assert [c.title for c in result.chunks] == [c.title for c in expected.chunks]
+            assert {c.source_id for c in result.chunks} == {source.id}
+            assert [(r.from_entity, r.to_entity, r.relation_type) for r in result.relations] == \
+                [(r.from_entity, r.to_entity, r.relation_type) for r in expected.relations]
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_syntax_error_falls_back_to_generic_chunks(self):
+        """A file that does not parse is still chunked by the worker"""
+        from src.codebase_rag.services.pipeline.base import DataSource, DataSourceType
+        from src.codebase_rag.services.pipeline.transformers import CodeParsePool
+
+        source = DataSource(name="bad.py", type=DataSourceType.CODE, metadata={"language": "python"})
+        pool = CodeParsePool(max_workers=1)
+        try:
+            result = await pool.parse(source, "def broken(:\n    pass\n")
+        finally:
+            pool.close()
+
+        assert result.success and result.metadata["method"] == "generic"
+        assert result.chunks[0].chunk_type.value == "code_module"
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_dead_worker_fails_only_its_source(self, monkeypatch):
+        """Chunks in flight when a worker dies are re-parsed; only the crashing source fails"""
+        from concurrent.futures.process import BrokenProcessPool
+        from src.codebase_rag.services.pipeline import transformers
+        from src.codebase_rag.services.pipeline.base import DataSource, DataSourceType
+
+        monkeypatch.setattr(transformers, "_parse_code_chunk", _parse_or_exit)
+        sources = [
+            DataSource(name=f"m{i}.py", type=DataSourceType.CODE, metadata={"language": "python"})
+            for i in range(8)
+        ]
+        contents = [self.SOURCE] * 8
+        contents[3] = "CRASH = 1\n"
+        pool = transformers.CodeParsePool(max_workers=2, chunk_size=2)
+        try:
+            results = await asyncio.gather(
+                *(pool.parse(source, content) for source, content in zip(sources, contents)),
+                return_exceptions=True
+            )
+        finally:
+            pool.close()
+
+        assert isinstance(results[3], BrokenProcessPool)
+        assert all(result.success for i, result in enumerate(results) if i != 3)
+
+
+class TestPythonParsing:
+    """Test single-pass Python AST parsing"""
+
+    @pytest.mark.unit
+    def test_python_scopes_and_call_attribution(self):
+        """Definitions get qualified names and each call belongs to its innermost function"""
+        from src.codebase_rag.services.pipeline.base import DataSource, DataSourceType
+        from src.codebase_rag.services.pipeline.transformers import CodeTransformer
+
+        content = TestCodeParsePool.SOURCE + (
+            "        def inner():\n"
+            "            return helper(helper())\n"
+            "        return inner()\n\n"
+            "async def fetch():\n"
+            "    import json\n"
+            "    return load()\n"
+        )
+        source = DataSource(name="m.py", type=DataSourceType.CODE, metadata={"language": "python"})
+        result = CodeTransformer().parse(source, content)
+
+        assert [c.metadata["qualified_name"] for c in result.chunks] == ["Reader", "Reader.read", "Reader.read.inner", "fetch"]
+        assert result.chunks[-1].metadata["is_async"]
+        assert result.chunks[2].content.splitlines()[0].strip() == "def inner():"
+        calls = [(r.properties["from_qualified_name"], r.to_entity) for r in result.relations if r.relation_type == "CALLS"]
+        assert calls == [("Reader.read", "parse"), ("Reader.read", "open"), ("Reader.read.inner", "helper"),
+                         ("Reader.read", "inner"), ("fetch", "load")]
+        assert [r.to_entity for r in result.relations if r.relation_type == "IMPORTS"] == ["os", "auth.tokens", "json"]
+        assert [r.to_entity for r in result.relations if r.relation_type == "INHERITS"] == ["Base"]
+
+
+class TestResumableIngestion:
+    """Test background repository ingestion resume support"""
+
+    @pytest.mark.unit
+    def test_resume_skips_committed_files(self, test_repo_path):
+        """A resumed run skips files already written, even when forced"""
+        ingestor = CodeIngestor(MagicMock())
+        files = ingestor.scan_files(test_repo_path, ["**/*.py"], [])
+        service = MagicMock()
+        service.get_file_shas.return_value = {f["path"]: f["sha"] for f in files}
+        service.create_files_batch.side_effect = lambda repo_id, files, batch_size=None, on_batch=None: {
+            "success": True, "files_processed": len(list(files)), "batches": [], "failed_batches": []
+        }
+
+        result = CodeIngestor(service).ingest_repository(
+            local_path=test_repo_path, include_globs=["**/*.py"], exclude_globs=[],
+            force=True, resume=True
+        )
+
+        assert result["status"] == "done"
+        assert result["files_processed"] == 0
+        assert result["files_skipped"] == len(files)
+        service.get_snapshot.assert_called_once()
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_interrupted_task_requeued_with_checkpoint(self, tmp_path):
+        """Checkpoints are stored in the payload and requeue resets the lock"""
+        from src.codebase_rag.services.tasks.task_storage import TaskStorage, TaskType, TaskStatus
+
+        storage = TaskStorage(str(tmp_path / "tasks.db"))
+        task = await storage.create_task(TaskType.REPO_INGESTION, {"kwargs": {"local_path": "/repo"}})
+        await storage.acquire_task_lock(task.id, "worker-1")
+        await storage.update_task_status(task.id, TaskStatus.PROCESSING)
+
+        task.payload["checkpoint"] = {"batches_committed": 3}
+        assert await storage.update_task_payload(task.id, task.payload)
+        assert await storage.requeue_task(task.id)
+
+        restored = await storage.get_task(task.id)
+        assert restored.status == TaskStatus.PENDING
+        assert restored.lock_id is None
+        assert restored.payload["checkpoint"] == {"batches_committed": 3}
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_checkpoint_saves_are_serialized(self):
+        """One save runs at a time and checkpoints queued meanwhile collapse into the newest"""
+        from src.codebase_rag.services.tasks.task_processors import CheckpointWriter
+
+        saved, running = [], []
+        release = asyncio.Event()
+
+        class Queue:
+            async def save_task_checkpoint(self, task_id, checkpoint):
+                running.append(checkpoint)
+                assert len(running) == 1
+                if checkpoint["batches_committed"] == 1:
+                    await release.wait()
+                running.pop()
+                if checkpoint["batches_committed"] == 6:
+                    raise RuntimeError("storage unavailable")
+                saved.append(checkpoint["batches_committed"])
+
+        writer = CheckpointWriter("task-1", Queue())
+        writer.submit({"batches_committed": 1})
+        await asyncio.sleep(0)
+        for batch in range(2, 6):
+            writer.submit({"batches_committed": batch})
+        release.set()
+        await writer.flush()
+        assert saved == [1, 5]
+
+        # a failed save is logged and does not stop later ones
+        writer.submit({"batches_committed": 6})
+        await writer.flush()
+        writer.submit({"batches_committed": 7})
+        await writer.flush()
+        assert saved == [1, 5, 7]
+
+
+class TestDirectoryTask:
+    """Test directory tasks running through the knowledge ingestion pipeline"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_document_progress_reaches_task(self, tmp_path):
+        """Progress reported from the ingestion thread is applied on the event loop"""
+        import threading
+        from src.codebase_rag.services.tasks.task_processors import BatchProcessingProcessor
+        from datetime import datetime
+        from src.codebase_rag.services.tasks.task_storage import Task, TaskType, TaskStatus
+
+        class KnowledgeService:
+            async def add_directory(self, directory_path, recursive=True, file_extensions=None, progress_callback=None):
+                def run():
+                    progress_callback(50.0, "Processed 1/2 documents")
+                    progress_callback(None, "Processed 2 documents")
+                await asyncio.to_thread(run)
+                return {"success": True, "documents_count": 2, "extensions": file_extensions}
+
+        updates = []
+        loop_thread = threading.get_ident()
+
+        def progress_callback(progress, message=""):
+            updates.append((progress, message, threading.get_ident() == loop_thread))
+
+        task = Task(
+            id="t1", type=TaskType.BATCH_PROCESSING, status=TaskStatus.PROCESSING, created_at=datetime.now(),
+            payload={"kwargs": {"directory_path": str(tmp_path), "file_patterns": ["*.md"]}}
+        )
+        result = await BatchProcessingProcessor(KnowledgeService()).process(task, progress_callback)
+        await asyncio.sleep(0)
+
+        assert result["files_processed"] == 2
+        assert result["result"]["extensions"] == [".md"]
+        assert (57.5, "Processed 1/2 documents", True) in updates
+        assert (57.5, "Processed 2 documents", True) in updates
+        assert all(on_loop for _, _, on_loop in updates)
+        assert updates[-1][0] == 100
+
 
 class TestIngestAPI:
     """Test ingestion API endpoints"""
@@ -142,6 +924,7 @@ class TestIngestIntegration:
         # Ingest repository
         response = test_client.post("/api/v1/ingest/repo", json={
             "local_path": test_repo_path,
+            "wait": True,
             "include_globs": ["**/*.py", "**/*.ts"],
             "exclude_globs": []
         })
@@ -80,7 +80,8 @@ class TestKnowledgeHandlers:
         assert len(result["source_nodes"]) == 1
         mock_knowledge_service.query.assert_called_once_with(
             question="test question",
-            mode="hybrid"
+            mode="hybrid",
+            retrieve_only=False
         )
 
     @pytest.mark.asyncio
@@ -99,9 +100,59 @@ class TestKnowledgeHandlers:
         assert result["success"] is True
         mock_knowledge_service.query.assert_called_once_with(
             question="test",
-            mode="hybrid"
+            mode="hybrid",
+            retrieve_only=False
         )
 
+    @pytest.mark.asyncio
+    async def test_handle_query_knowledge_retrieve_only(self, mock_knowledge_service):
+        """Test retrieval-only query returns source nodes without an answer"""
+        mock_knowledge_service.query.return_value = {
+            "success": True,
+            "answer": None,
+            "source_nodes": [{"text": "source 1", "score": 0.03}]
+        }
+
+        result = await handle_query_knowledge(
+            args={"question": "test", "retrieve_only": True},
+            knowledge_service=mock_knowledge_service
+        )
+
+        assert result["answer"] is None
+        assert len(result["source_nodes"]) == 1
+        mock_knowledge_service.query.assert_called_once_with(
+            question="test",
+            mode="hybrid",
+            retrieve_only=True
+        )
+
+    @pytest.mark.asyncio
+    async def test_handle_query_knowledge_stream(self, mock_knowledge_service):
+        """Test streamed query sends sources then tokens as progress notifications"""
+        async def stream_query(question, mode):
+            yield {"type": "sources", "source_nodes": [{"text": "source 1"}], "pipeline_steps": []}
+            yield {"type": "token", "delta": "Hel"}
+            yield {"type": "token", "delta": "lo"}
+            yield {"type": "done", "answer": "Hello", "query_mode": mode}
+
+        mock_knowledge_service.stream_query = stream_query
+        notifications = []
+
+        async def progress(step, message):
+            notifications.append((step, message))
+
+        result = await handle_query_knowledge(
+            args={"question": "test", "stream": True},
+            knowledge_service=mock_knowledge_service,
+            progress=progress
+        )
+
+        assert result["answer"] == "Hello"
+        assert result["source_nodes"] == [{"text": "source 1"}]
+        assert [step for step, _ in notifications] == [1, 2, 3]
+        assert '"sources"' in notifications[0][1]
+        mock_knowledge_service.query.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_handle_search_similar_nodes_success(self, mock_knowledge_service):
         """Test successful similar nodes search"""
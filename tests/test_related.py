@@ -43,6 +43,34 @@ class TestRanker:
         assert token_file is not None
         assert token_file["score"] > 1.0  # Should have boosted score
 
+    @pytest.mark.unit
+    def test_rank_top_k_matches_full_sort(self):
+        """Partial selection returns the same order as sorting every candidate"""
+        files = [
+            {"path": f"src/mod{i % 7}/auth_{i}.py", "lang": "python", "score": (i * 37 % 11) / 10}
+            for i in range(200)
+        ]
+        ranker = Ranker()
+
+        top = ranker.rank_files(files, "auth", limit=20)
+        full = ranker.rank_files(files, "auth", limit=len(files))
+
+        assert top == full[:20]
+        assert "score" in files[0] and files[0]["score"] == 0.0  # inputs are not mutated
+
+    @pytest.mark.unit
+    def test_rank_uses_stored_path_tokens(self):
+        """Tokens stored at ingestion are used instead of re-tokenizing"""
+        path = "src/auth/token.py"
+        assert Ranker.tokenize_path(path) == ["auth", "py", "src", "token"]
+
+        ranked = Ranker().rank_files(
+            [{"path": path, "lang": "python", "score": 1.0, "path_tokens": ["auth"]}],
+            query="token",
+        )
+        # 'token' is still an exact path match, but not a stored token
+        assert ranked[0]["score"] == pytest.approx(1.0 * 1.2 * 2.0)
+
     @pytest.mark.unit
     def test_generate_file_summary(self):
         """Test rule-based summary generation"""
@@ -179,6 +207,7 @@ class TestFulltextSearch:
         # First ingest some data
         ingest_response = test_client.post("/api/v1/ingest/repo", json={
             "local_path": test_repo_path,
+            "wait": True,
             "include_globs": ["**/*.py", "**/*.ts"],
             "exclude_globs": []
         })
@@ -197,3 +226,535 @@ class TestFulltextSearch:
         if len(data["nodes"]) > 0:
             helper_files = [n for n in data["nodes"] if "helper" in n["path"].lower()]
             assert len(helper_files) > 0
+
+    @pytest.mark.unit
+    def test_fulltext_queries_content_index(self):
+        """Search merges path matches with weighted content index matches"""
+        from unittest.mock import MagicMock
+        from src.codebase_rag.services.code import Neo4jGraphService
+
+        service = Neo4jGraphService()
+        service.driver = MagicMock()
+        session = service.driver.session.return_value.__enter__.return_value
+        session.run.return_value = [{"path": "src/auth/token.py", "content_score": 2.0, "score": 1.0}]
+        service._connected = True
+
+        results = service.fulltext_search("validate_token", repo_id="repo")
+
+        query, params = session.run.call_args[0]
+        assert "'file_text'" in query and "'file_content'" in query
+        assert "content_weight" in params
+        assert results[0]["content_score"] == 2.0
+
+
+class TestGraphQueryPool:
+    """Test that graph queries are offloaded from the event loop"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_fulltext_search_runs_on_pool(self):
+        """Blocking driver calls run on the bounded neo4j worker pool"""
+        import threading
+        from unittest.mock import MagicMock
+        from src.codebase_rag.services.code import Neo4jGraphService
+
+        threads = []
+
+        def run(query, params):
+            threads.append(threading.current_thread().name)
+            return [{"path": "src/auth/token.py", "score": 1.0}]
+
+        service = Neo4jGraphService()
+        service.driver = MagicMock()
+        service.driver.session.return_value.__enter__.return_value.run.side_effect = run
+        service._connected = True
+
+        results = await service.fulltext_search_async("token", repo_id="repo")
+
+        assert results == [{"path": "src/auth/token.py", "score": 1.0}]
+        assert threads[0].startswith("neo4j")
+        assert (service._running, service._waiting) == (0, 0)
+        await service.close()
+
+
+class TestCypherStreaming:
+    """Test streamed and paged Cypher results"""
+
+    def _make_service(self, rows):
+        from unittest.mock import MagicMock
+        from src.codebase_rag.services.code import Neo4jGraphService
+
+        def run(query, params):
+            skip, limit = params.get("__skip", 0), params.get("__limit", len(rows))
+            after = params.get("__after")
+            selected = [row for row in rows if after is None or [row["n"]] > after]
+            return iter(selected[skip:skip + limit])
+
+        service = Neo4jGraphService()
+        service.driver = MagicMock()
+        session = service.driver.session.return_value.__enter__.return_value
+        session.run.side_effect = run
+        service._connected = True
+        return service, session
+
+    @pytest.mark.unit
+    def test_iter_cypher_is_lazy(self):
+        """Rows are pulled only while the caller iterates"""
+        service, session = self._make_service([{"n": i} for i in range(5)])
+
+        rows = service.iter_cypher("MATCH (n) RETURN n", fetch_size=2)
+        assert session.run.call_count == 0
+        assert next(rows) == {"n": 0}
+        assert service.driver.session.call_args.kwargs["fetch_size"] == 2
+        assert list(rows) == [{"n": i} for i in range(1, 5)]
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_stream_cypher_holds_a_query_worker(self):
+        """Streams run on the bounded query pool with a timeout, and stop when the consumer does"""
+        import asyncio
+
+        service, session = self._make_service([{"n": i} for i in range(5)])
+
+        rows = []
+        async for row in service.stream_cypher("MATCH (n) RETURN n", fetch_size=2, timeout=5):
+            rows.append(row)
+            if row["n"] < 2:  # at most two rows wait, so the producer is still fetching
+                assert service._running == 1
+        assert rows == [{"n": i} for i in range(5)]
+        assert service._running == 0
+        assert session.run.call_args.args[0].timeout == 5
+
+        stream = service.stream_cypher("MATCH (n) RETURN n", fetch_size=1)
+        assert await stream.__anext__() == {"n": 0}
+        await stream.aclose()
+        for _ in range(50):
+            if service._running == 0:
+                break
+            await asyncio.sleep(0.1)
+        assert service._running == 0
+
+    @pytest.mark.unit
+    def test_execute_cypher_page_cursor(self):
+        """Ordered queries are paged with SKIP/LIMIT and chained with opaque cursors"""
+        service, session = self._make_service([{"n": i} for i in range(5)])
+        query = "MATCH (n) RETURN n.id AS n ORDER BY n"
+
+        first = service.execute_cypher_page(query, page_size=2)
+        second = service.execute_cypher_page(query, page_size=2, cursor=first["next_cursor"])
+        last = service.execute_cypher_page(query, page_size=2, cursor=second["next_cursor"])
+
+        assert [r["n"] for r in first["rows"] + second["rows"] + last["rows"]] == [0, 1, 2, 3, 4]
+        assert last["next_cursor"] is None
+        assert session.run.call_args.args[0].endswith("ORDER BY n\nSKIP $__skip LIMIT $__limit")
+
+        with pytest.raises(ValueError):
+            service.execute_cypher_page("MATCH (m) RETURN m ORDER BY m", cursor=first["next_cursor"])
+
+    @pytest.mark.unit
+    def test_execute_cypher_page_needs_stable_order(self):
+        """Unordered or self-limited queries are rejected instead of paged"""
+        service, session = self._make_service([{"n": i} for i in range(5)])
+
+        with pytest.raises(ValueError):
+            service.execute_cypher_page("MATCH (n) RETURN n")
+        with pytest.raises(ValueError):
+            service.execute_cypher_page("MATCH (n) RETURN n ORDER BY n.id LIMIT 3")
+        with pytest.raises(ValueError):
+            service.execute_cypher_page("MATCH (n) WITH n ORDER BY n.name RETURN n.name AS name")
+        with pytest.raises(ValueError):
+            service.execute_cypher_page("MATCH (n) RETURN n.id AS id UNION MATCH (m) RETURN m.id AS id ORDER BY id")
+        with pytest.raises(ValueError):
+            service.execute_cypher_page("CALL { MATCH (n) RETURN n ORDER BY n.id }")
+        assert session.run.call_count == 0
+
+        service.execute_cypher_page("MATCH (n) WITH n ORDER BY n.name RETURN n {.name} AS n ORDER BY n.name")
+        assert session.run.call_count == 1
+
+    @pytest.mark.unit
+    def test_execute_cypher_page_keyset(self):
+        """With order_by each page continues after the last key instead of skipping"""
+        service, session = self._make_service([{"n": i} for i in range(5)])
+        query = "MATCH (x) RETURN x.id AS n"
+
+        pages, cursor = [], None
+        while True:
+            page = service.execute_cypher_page(query, page_size=2, cursor=cursor, order_by=["n"])
+            pages.append(page["rows"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert pages == [[{"n": 0}, {"n": 1}], [{"n": 2}, {"n": 3}], [{"n": 4}]]
+        paged_query, params = session.run.call_args.args
+        assert "[`n`] > $__after" in paged_query and "ORDER BY `n` LIMIT $__limit" in paged_query
+        assert params["__after"] == [3] and "__skip" not in params
+
+        first = service.execute_cypher_page(query, page_size=2, order_by=["n"])
+        with pytest.raises(ValueError):
+            service.execute_cypher_page(query, page_size=2, cursor=first["next_cursor"], order_by=["m"])
+
+
+class TestBatchWriter:
+    """Test grouped UNWIND writes of nodes and relationships"""
+
+    @pytest.mark.unit
+    def test_groups_by_label_and_type(self):
+        """One UNWIND per label set / relationship type, seeking endpoints by label"""
+        from unittest.mock import MagicMock
+        from src.codebase_rag.services.code.graph_service import (
+            Neo4jGraphService, GraphNode, GraphRelationship
+        )
+
+        queries = []
+
+        def run(query, params):
+            queries.append((query, params["rows"]))
+            result = MagicMock()
+            result.single.return_value = {"written": len(params["rows"])}
+            return result
+
+        tx = MagicMock()
+        tx.run.side_effect = run
+        service = Neo4jGraphService()
+        service.driver = MagicMock()
+        session = service.driver.session.return_value.__enter__.return_value
+        session.execute_write.side_effect = lambda fn, *args: fn(tx, *args)
+        service._connected = True
+
+        nodes = [GraphNode(id=f"f{i}", labels=["CodeEntity", "Function"]) for i in range(5)]
+        nodes += [GraphNode(id="t1", labels=["Table"], properties={"name": "users"})]
+        rels = [
+            GraphRelationship(start_node=f"f{i}", end_node="t1", type="READS",
+                              start_label="Function", end_label="Table")
+            for i in range(5)
+        ]
+
+        result = service._batch_write_sync(nodes, rels, batch_size=2)
+
+        assert result["success"] is True
+        assert (result["created_count"], result["relationships_created"]) == (6, 5)
+        # 3 function batches + 1 table batch + 3 relationship batches
+        assert len(queries) == 7
+        assert "MERGE (n:`CodeEntity` {id: row.id})" in queries[0][0]
+        assert "SET n:`Function`" in queries[0][0]
+        assert "MATCH (a:`Function` {id: row.start})" in queries[-1][0]
+        assert "MATCH (b:`Table` {id: row.end})" in queries[-1][0]
+        assert "apoc" not in " ".join(q for q, _ in queries)
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_storer_output_is_labeled(self):
+        """Chunks and relations from the knowledge pipeline never fall back to unlabeled matches"""
+        import re
+        from unittest.mock import MagicMock
+        from src.codebase_rag.services.code.graph_service import Neo4jGraphService
+        from src.codebase_rag.services.pipeline.base import DataSource, DataSourceType
+        from src.codebase_rag.services.pipeline.storers import Neo4jRelationStorer
+        from src.codebase_rag.services.pipeline.transformers import CodeTransformer
+
+        queries = []
+        tx = MagicMock()
+        tx.run.side_effect = lambda query, params: queries.append(query) or MagicMock(
+            single=MagicMock(return_value={"written": len(params["rows"])})
+        )
+        service = Neo4jGraphService()
+        service.driver = MagicMock()
+        session = service.driver.session.return_value.__enter__.return_value
+        session.execute_write.side_effect = lambda fn, *args: fn(tx, *args)
+
+        class GraphService:
+            async def batch_create_nodes(self, nodes):
+                return service._batch_write_sync(nodes, [])
+
+            async def batch_create_relationships(self, relationships):
+                return service._batch_write_sync([], relationships)
+
+        source = DataSource(name="m.py", type=DataSourceType.CODE, metadata={"language": "python"})
+        parsed = CodeTransformer().parse(
+            source, "import os\n\nclass A(B):\n    def run(self):\n        return go()\n"
+        )
+        storer = Neo4jRelationStorer(GraphService())
+        assert (await storer.store_chunks(parsed.chunks))["success"]
+        assert (await storer.store_relations(parsed.relations))["success"]
+
+        assert queries and not [q for q in queries if re.search(r"(MERGE|MATCH) \(\w+ \{id:", q)]
+        assert any("MATCH (a:`Function` {id: row.start})" in q for q in queries)
+        assert any("MATCH (a:`Module` {id: row.start})" in q for q in queries)
+        assert Neo4jGraphService._node_batch_query(("Module",)).count("MERGE (n:`Module` {id: row.id})") == 1
+
+
+class TestQueryCache:
+    """Test query result caching and per-repo invalidation"""
+
+    @pytest.mark.unit
+    def test_normalized_queries_share_entry(self):
+        """Whitespace and case variants hit the same cache entry"""
+        from src.codebase_rag.services.utils import QueryCache
+
+        cache = QueryCache()
+        key = cache.make_key("related", "repo", {"query": cache.normalize_query("Auth  Token"), "limit": 10})
+        assert cache.get("related", key) is None
+        cache.set(key, {"nodes": []})
+
+        same = cache.make_key("related", "repo", {"query": cache.normalize_query(" auth token "), "limit": 10})
+        assert cache.get("related", same) == {"nodes": []}
+
+    @pytest.mark.unit
+    def test_bump_generation_invalidates_repo(self):
+        """Re-ingesting a repo invalidates only that repo's entries"""
+        from src.codebase_rag.services.utils import QueryCache
+
+        cache = QueryCache()
+        key_a = cache.make_key("related", "a", {"query": "x"})
+        key_b = cache.make_key("related", "b", {"query": "x"})
+        cache.set(key_a, 1)
+        cache.set(key_b, 2)
+
+        cache.bump_generation("a")
+
+        assert cache.get("related", cache.make_key("related", "a", {"query": "x"})) is None
+        assert cache.get("related", cache.make_key("related", "b", {"query": "x"})) == 2
+
+    @pytest.mark.unit
+    def test_semantic_answer_cache(self):
+        """Near-identical questions reuse an answer until the knowledge base changes"""
+        from src.codebase_rag.services.utils import QueryCache, SemanticQueryCache
+
+        cache = SemanticQueryCache(QueryCache(), threshold=0.9)
+        params = {"mode": "hybrid", "top_k": 5}
+        key = cache.make_key("How is the token parsed?", params)
+        assert cache.get(key) is None
+        cache.set(key, {"answer": "with jwt"}, params, embedding=[1.0, 0.0, 0.1])
+
+        assert cache.get(cache.make_key("  how is the TOKEN parsed? ", params)) == {"answer": "with jwt"}
+        assert cache.get_similar([0.95, 0.05, 0.1], params) == {"answer": "with jwt"}
+        assert cache.get_similar([0.0, 1.0, 0.0], params) is None
+        assert cache.get_similar([0.95, 0.05, 0.1], {"mode": "vector_only", "top_k": 5}) is None
+
+        cache.invalidate()
+        assert cache.get(cache.make_key("How is the token parsed?", params)) is None
+        assert cache.get_similar([1.0, 0.0, 0.1], params) is None
+
+        # an exact miss is counted by the semantic lookup that follows it
+        stats = cache.stats()
+        assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 3)
+        assert stats["hit_rate"] == pytest.approx(2 / 5)
+
+    @pytest.mark.unit
+    def test_semantic_cache_drops_answers_of_invalidated_queries(self):
+        """An answer computed across an invalidate() is not cached under the new generation"""
+        from src.codebase_rag.services.utils import QueryCache, SemanticQueryCache
+
+        cache = SemanticQueryCache(QueryCache(), threshold=0.9)
+        params = {"mode": "hybrid", "top_k": 5}
+        key = cache.make_key("How is the token parsed?", params)
+        cache.get_similar([1.0, 0.0, 0.0], params)
+
+        cache.invalidate()  # ingestion finished while the query was running
+        cache.set(key, {"answer": "stale"}, params, embedding=[1.0, 0.0, 0.0])
+
+        assert cache.get_similar([1.0, 0.0, 0.0], params) is None
+        assert cache.get(key) is None
+        assert cache.stats()["semantic_entries"] == 0
+
+    @pytest.mark.unit
+    def test_ingestion_bumps_generation(self, sample_files):
+        """CodeIngestor invalidates cached results after writing a repo"""
+        from unittest.mock import MagicMock
+        from src.codebase_rag.services.code import CodeIngestor
+        from src.codebase_rag.services.code.code_ingestor import query_cache
+
+        service = MagicMock()
+        service.create_files_batch.return_value = {
+            "success": True, "files_processed": 3, "batches": [], "failed_batches": []
+        }
+        before = query_cache.generation("cached-repo")
+
+        CodeIngestor(service).ingest_files("cached-repo", sample_files)
+
+        assert query_cache.generation("cached-repo") != before
+
+
+class TestImpactAnalysis:
+    """Test level-by-level reverse dependency traversal"""
+
+    CALLS = {"s1": [("s2", "a.py")], "s2": [("s3", "b.py"), ("s1", "t.py")], "s3": [("s2", "a.py")]}
+    IMPORTS = {"t.py": ["c.py", "a.py"], "c.py": ["d.py", "t.py"], "d.py": ["e.py"]}
+
+    def _make_service(self):
+        from unittest.mock import MagicMock
+        from src.codebase_rag.services.code import Neo4jGraphService
+
+        def run(query, params):
+            if "DEFINED_IN]-(s:Symbol)" in query:
+                return [{"id": "s1"}]
+            if "$ids" in query:
+                return [
+                    {"id": caller, "path": path, "lang": "python", "repoId": "repo"}
+                    for sid in params["ids"] for caller, path in self.CALLS.get(sid, [])
+                ]
+            return [
+                {"path": importer, "lang": "python", "repoId": "repo"}
+                for path in params["paths"] for importer in self.IMPORTS.get(path, [])
+            ]
+
+        service = Neo4jGraphService()
+        service.driver = MagicMock()
+        session = service.driver.session.return_value.__enter__.return_value
+        session.run.side_effect = run
+        service._connected = True
+        # exercise the Neo4j walk rather than the in-memory snapshot
+        service.get_snapshot = MagicMock(return_value=None)
+        return service, session
+
+    @pytest.mark.unit
+    def test_shortest_depth_and_dedup(self):
+        """Each dependent is reported once, at its shortest depth"""
+        service, _ = self._make_service()
+
+        results = service.impact_analysis("repo", "t.py", depth=3)
+        by_path = {r["path"]: r for r in results}
+
+        assert set(by_path) == {"a.py", "b.py", "c.py", "d.py", "e.py"}
+        assert by_path["a.py"]["relationship"] == "CALLS" and by_path["a.py"]["depth"] == 1
+        assert by_path["c.py"]["depth"] == 1 and by_path["d.py"]["depth"] == 2
+        assert by_path["e.py"]["depth"] == 3
+        assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+    @pytest.mark.unit
+    def test_depth_bounds_queries(self):
+        """One query per relationship and level, stopping at the depth limit"""
+        service, session = self._make_service()
+
+        results = service.impact_analysis("repo", "t.py", depth=1)
+
+        assert {r["path"] for r in results} == {"a.py", "c.py"}
+        assert session.run.call_count == 3  # seed symbols + callers + importers
+
+
+class TestGraphSnapshot:
+    """Test the in-memory CSR graph snapshot"""
+
+    SYMBOLS = {"s1": "t.py", "s2": "a.py", "s3": "b.py"}
+
+    def _make_snapshot(self):
+        from src.codebase_rag.services.code.graph_snapshot import GraphSnapshot, FILE, SYMBOL
+
+        files = [{"path": p, "lang": "python"} for p in ["t.py", "a.py", "b.py", "c.py", "d.py", "e.py"]]
+        symbols = [{"id": sid, "name": sid, "path": path} for sid, path in self.SYMBOLS.items()]
+        edges = [((SYMBOL, sid), "DEFINED_IN", (FILE, path)) for sid, path in self.SYMBOLS.items()]
+        edges += [
+            ((SYMBOL, caller), "CALLS", (SYMBOL, sid))
+            for sid, callers in TestImpactAnalysis.CALLS.items() for caller, _ in callers
+        ]
+        edges += [
+            ((FILE, importer), "IMPORTS", (FILE, path))
+            for path, importers in TestImpactAnalysis.IMPORTS.items() for importer in importers
+        ]
+        edges.append(((SYMBOL, "s1"), "CALLS", (SYMBOL, "external")))  # outside the repo, dropped
+        return GraphSnapshot("repo", files, symbols, edges, generation=7)
+
+    @pytest.mark.unit
+    def test_degree_and_paths(self):
+        """Degree, neighbourhood and shortest path are answered from the CSR arrays"""
+        from src.codebase_rag.services.code.graph_snapshot import SYMBOL
+
+        snapshot = self._make_snapshot()
+        s1, s3 = snapshot.node_id(SYMBOL, "s1"), snapshot.node_id(SYMBOL, "s3")
+
+        assert snapshot.degree(s1) == {"out_degree": 2, "in_degree": 1, "total_degree": 3}
+        assert {snapshot.keys[n] for n in snapshot.connected(s1, depth=1)} == {"s2", "t.py"}
+        assert [snapshot.keys[n] for n in snapshot.shortest_path(s1, s3)] == ["s1", "s2", "s3"]
+
+    @pytest.mark.unit
+    def test_impact_matches_neo4j_walk(self):
+        """impact_analysis returns the same result from the snapshot as from Neo4j"""
+        from unittest.mock import MagicMock
+
+        expected = TestImpactAnalysis()._make_service()[0].impact_analysis("repo", "t.py", depth=3)
+
+        service = TestImpactAnalysis()._make_service()[0]
+        service.get_snapshot = MagicMock(return_value=self._make_snapshot())
+        service.driver.session.side_effect = AssertionError("snapshot should not query Neo4j")
+
+        assert service.impact_analysis("repo", "t.py", depth=3) == expected
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_fallback_keeps_to_snapshot_subgraph(self):
+        """Without a snapshot, Neo4j queries count only the File/Symbol edges a snapshot holds"""
+        from unittest.mock import AsyncMock
+        from src.codebase_rag.services.code.graph_service import Neo4jGraphService, GraphQueryResult
+
+        service = Neo4jGraphService()
+        service.execute_cypher = AsyncMock(return_value=GraphQueryResult(raw_result=[{"out_degree": 2, "in_degree": 1}]))
+
+        assert (await service.get_node_degree("s1"))["total_degree"] == 3
+        await service.find_connected_nodes("s1", depth=2)
+        await service.find_shortest_path("s1", "s3")
+
+        for call in service.execute_cypher.call_args_list:
+            query = call.args[0]
+            assert "(start)-[:DEFINED_IN]->(home:File)" in query
+            assert "AND EXISTS {" in query and ".repoId = repo" in query
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_disabled_snapshots_query_whole_graph(self, monkeypatch):
+        """With snapshots disabled, Neo4j queries are not limited to a repository"""
+        from unittest.mock import AsyncMock
+        from src.codebase_rag.services.code import graph_service
+        from src.codebase_rag.services.code.graph_service import Neo4jGraphService, GraphQueryResult
+
+        monkeypatch.setattr(graph_service.settings, "graph_snapshot_enabled", False)
+        service = Neo4jGraphService()
+        service.execute_cypher = AsyncMock(return_value=GraphQueryResult(raw_result=[{"out_degree": 2, "in_degree": 1}]))
+
+        assert (await service.get_node_degree("s1"))["total_degree"] == 3
+        await service.find_connected_nodes("s1", depth=2)
+        await service.find_shortest_path("s1", "s3")
+
+        for call in service.execute_cypher.call_args_list:
+            query = call.args[0]
+            assert "DEFINED_IN" not in query and "repo" not in query
+
+    @pytest.mark.unit
+    def test_compute_centrality(self):
+        """PageRank and transitive dependents follow imports and calls"""
+        from src.codebase_rag.services.code.graph_snapshot import FILE, SYMBOL
+
+        snapshot = self._make_snapshot()
+        scores = snapshot.compute_centrality()
+
+        def file_score(key, path):
+            return scores[key][snapshot.node_id(FILE, path)]
+
+        assert scores["pagerank"].sum() == pytest.approx(1.0)
+        assert file_score("dependents", "t.py") == 5
+        assert file_score("dependents", "d.py") == 1
+        assert file_score("dependents", "e.py") == 0
+        assert scores["dependents"][snapshot.node_id(SYMBOL, "s1")] == 2
+        assert file_score("in_degree", "t.py") == 2  # a.py both imports and calls it: one edge
+        assert max(file_score("centrality", p) for p in snapshot.file_index) == 1.0
+        assert file_score("centrality", "e.py") < file_score("centrality", "t.py")
+
+    @pytest.mark.unit
+    def test_update_centrality_writes_in_bulk(self):
+        """Scores are written back with one UNWIND per label and batch"""
+        from unittest.mock import MagicMock
+        from src.codebase_rag.services.code import Neo4jGraphService
+
+        service = Neo4jGraphService()
+        service.driver = MagicMock()
+        session = service.driver.session.return_value.__enter__.return_value
+        service._connected = True
+        service.get_snapshot = MagicMock(return_value=self._make_snapshot())
+
+        result = service.update_centrality("repo")
+
+        assert result["success"] is True
+        assert result["files_updated"] == 6 and result["symbols_updated"] == 3
+        assert session.run.call_count == 2
+        rows = session.run.call_args_list[0].args[1]["rows"]
+        assert {"pagerank", "centrality", "inDegree", "outDegree", "dependents"} == set(rows[0]["props"])